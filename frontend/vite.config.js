@@ -15,6 +15,10 @@ export default defineConfig({
         target: 'http://search-movies-service:8005',
         changeOrigin: true
       },
+      '/suggest': {
+        target: 'http://search-movies-service:8005',
+        changeOrigin: true
+      },
       '/login': {
         target: 'http://auth-service:8002',
         changeOrigin: true
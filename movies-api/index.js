@@ -1,5 +1,6 @@
 const express = require('express');
 const { MongoClient } = require('mongodb');
+const crypto = require('crypto');
 
 const app = express();
 const PORT = 8000;
@@ -63,6 +64,61 @@ app.get('/movies/search/:query', async (req, res) => {
   }
 });
 
+// Catálogo compacto (campos de tarjeta) para los servicios que lo cachean en memoria.
+// La respuesta serializada y su ETag (hash del contenido) quedan en memoria. Cada pedido calcula
+// primero una versión barata (cantidad estimada y último _id, que cubren altas y bajas): si no cambió,
+// responde 304 o el cuerpo guardado sin leer los documentos. Las ediciones no mueven esa versión, así
+// que el cuerpo se rearma igual cada CATALOG_MAX_AGE_MS.
+const CATALOG_PROJECTION = {
+  title: 1, poster: 1, plot: 1, genres: 1, imdb: 1, year: 1, runtime: 1, cast: 1, directors: 1
+};
+const CATALOG_MAX_AGE_MS = parseInt(process.env.CATALOG_MAX_AGE_MS) || 5 * 60 * 1000;
+
+let catalogCache = null; // { version, etag, body, builtAt }
+
+async function catalogVersion() {
+  const collection = db.collection('movies');
+  const [count, last] = await Promise.all([
+    collection.estimatedDocumentCount(),
+    collection.find({}, { projection: { _id: 1 } }).sort({ _id: -1 }).limit(1).next()
+  ]);
+  return `${count}-${last ? last._id : ''}`;
+}
+
+async function buildCatalog(version) {
+  const movies = await db.collection('movies')
+    .find({}, { projection: CATALOG_PROJECTION })
+    .sort({ _id: 1 })
+    .toArray();
+
+  const body = JSON.stringify({
+    count: movies.length,
+    movies: movies
+  });
+  const etag = `W/"catalog-${crypto.createHash('sha1').update(body).digest('hex')}"`;
+  return { version, etag, body, builtAt: Date.now() };
+}
+
+app.get('/movies/catalog', async (req, res) => {
+  try {
+    const version = await catalogVersion();
+    const cached = catalogCache;
+    if (!cached || cached.version !== version || Date.now() - cached.builtAt >= CATALOG_MAX_AGE_MS) {
+      catalogCache = await buildCatalog(version);
+    }
+
+    const { etag, body } = catalogCache;
+    res.set('ETag', etag);
+    if (req.fresh) {
+      return res.status(304).end();
+    }
+    res.type('application/json').send(body);
+  } catch (error) {
+    console.error('Error obteniendo catálogo:', error);
+    res.status(500).json({ error: 'Error obteniendo catálogo' });
+  }
+});
+
 // Obtener película por ID
 app.get('/movies/:id', async (req, res) => {
   try {
@@ -0,0 +1,108 @@
+import random
+import threading
+import time
+
+import requests
+
+import metrics
+
+class CatalogCache:
+    """Catálogo compacto en memoria (campos de tarjeta), refrescado en segundo plano.
+
+    El refresco es un GET condicional con If-None-Match: si el catálogo no cambió,
+    movies-api responde 304 y no se transfiere nada. Las películas se guardan en
+    una lista y por género se guardan índices, así que muestrear k películas es O(k).
+    """
+
+    def __init__(self, url, session=None, refresh_seconds=300.0, retry_seconds=5.0, timeout=30.0):
+        self.url = url
+        self.session = session or requests.Session()
+        self.refresh_seconds = refresh_seconds
+        self.retry_seconds = retry_seconds
+        self.timeout = timeout
+        # (películas, índices por género, nombres de género) se reemplaza de una sola vez en cada refresco
+        self._data = ([], {}, [])
+        self.etag = None
+        self.loaded_at = None
+        self.checked_at = None
+        self.refreshes = 0
+        self.not_modified = 0
+        self.errors = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def loaded(self):
+        return self.loaded_at is not None
+
+    def refresh(self):
+        """Trae el catálogo si cambió; devuelve True si se reemplazó"""
+        headers = {"If-None-Match": self.etag} if self.etag else {}
+        response = metrics.timed_get(self.session, "catalog", self.url, headers=headers, timeout=self.timeout)
+        self.checked_at = time.time()
+        if response.status_code == 304:
+            self.not_modified += 1
+            return False
+        response.raise_for_status()
+
+        data = response.json()
+        movies = data.get("movies", []) if isinstance(data, dict) else data
+        by_genre, names = {}, {}
+        for i, movie in enumerate(movies):
+            for genre in movie.get("genres") or []:
+                key = str(genre).strip().lower()
+                by_genre.setdefault(key, []).append(i)
+                names.setdefault(key, str(genre).strip())
+        self._data = (movies, by_genre, sorted(names.values()))
+        self.etag = response.headers.get("ETag")
+        self.loaded_at = self.checked_at
+        self.refreshes += 1
+        print(f"📚 Catálogo en memoria: {len(movies)} películas, {len(by_genre)} géneros")
+        return True
+
+    def sample(self, n, genre=None):
+        """Hasta `n` películas al azar, opcionalmente de un género (sin reemplazo)"""
+        movies, by_genre, _ = self._data
+        if genre:
+            rows = by_genre.get(genre.strip().lower(), [])
+            return [movies[i] for i in random.sample(rows, min(n, len(rows)))]
+        return random.sample(movies, min(n, len(movies)))
+
+    def genres(self):
+        return self._data[2]
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+                wait = self.refresh_seconds
+            except Exception as e:
+                self.errors += 1
+                print(f"❌ No se pudo refrescar el catálogo: {e}")
+                # Hasta tener la primera copia se reintenta seguido
+                wait = self.refresh_seconds if self.loaded else self.retry_seconds
+            self._stop.wait(wait)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="catalog-refresh", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        movies, by_genre, _ = self._data
+        now = time.time()
+        return {
+            "loaded": self.loaded,
+            "movies": len(movies),
+            "genres": len(by_genre),
+            "etag": self.etag,
+            "age_seconds": round(now - self.loaded_at, 1) if self.loaded else None,
+            "last_check_seconds": round(now - self.checked_at, 1) if self.checked_at else None,
+            "refreshes": self.refreshes,
+            "not_modified": self.not_modified,
+            "errors": self.errors,
+        }
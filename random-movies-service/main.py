@@ -1,8 +1,15 @@
+import os
 import random
+import time
+from typing import Optional
+
 import requests
-from fastapi import FastAPI
+from fastapi import FastAPI, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
 
+import metrics
+from catalog import CatalogCache
+
 app = FastAPI()
 
 # Configurar CORS (Buenas prácticas para microservicios)
@@ -16,42 +23,52 @@ app.add_middleware(
 
 # URL del servicio Movies dentro de la red de Docker
 MOVIES_SERVICE_URL = "http://movies-api:8000/movies"
+MOVIES_CATALOG_URL = os.getenv("MOVIES_CATALOG_URL", f"{MOVIES_SERVICE_URL}/catalog")
+
+# Conexiones HTTP reutilizadas para los refrescos y el fallback
+session = requests.Session()
+
+# Catálogo en memoria: /random se sirve sin consultar a movies-api en cada request
+catalog = CatalogCache(
+    MOVIES_CATALOG_URL,
+    session=session,
+    refresh_seconds=float(os.getenv("CATALOG_REFRESH_SECONDS", "300")),
+)
+metrics.watch_catalog(catalog)
+
+@app.on_event("startup")
+def start_catalog():
+    catalog.start()
+
+@app.on_event("shutdown")
+def stop_catalog():
+    catalog.stop()
 
 @app.get("/random")
-def get_random_movies():
+def get_random_movies(n: int = Query(12, ge=1, le=100), genre: Optional[str] = Query(None)):
+    start = time.perf_counter()
+    source = "catalog" if catalog.loaded else "upstream"
     try:
-        print(f"🎲 Consultando catálogo completo en: {MOVIES_SERVICE_URL}")
-        
-        # 1. Pedir todas las películas al servicio Movies
-        response = requests.get(MOVIES_SERVICE_URL, timeout=10)
-        response.raise_for_status()
-        
-        # Extraer la lista de películas de la respuesta JSON
-        # Manejamos ambos casos: si devuelve lista directa o dict con key "movies"
-        data = response.json()
-        movies = data.get("movies", []) if isinstance(data, dict) else data
-        
-        if not movies:
-            return []
-            
-        print(f"📚 Catálogo recibido: {len(movies)} películas.")
-
-        # 2. ESTRATEGIA DE POOL ALEATORIO (Doble Randomización)
-        
-        # Paso A: Mezclar la lista completa para romper el orden por defecto de Mongo
-        random.shuffle(movies)
-        
-        # Paso B: Crear un "Pool de Candidatos" (ej: 50 películas)
-        # Esto asegura que seleccionamos de un grupo variado, no siempre del principio
-        pool_size = min(len(movies), 50)
-        pool = movies[:pool_size]
-        
-        # Paso C: Muestreo final del Pool
-        # Elegimos 12 películas (divisible por 2, 3, 4 para que la grilla del frontend quede bonita)
-        sample_size = min(len(pool), 12)
-        final_selection = random.sample(pool, sample_size)
-        
+        if catalog.loaded:
+            # Muestreo O(n) sobre el catálogo (o los índices del género) en memoria
+            final_selection = catalog.sample(n, genre)
+        else:
+            # Todavía no hay catálogo: se pide una muestra a movies-api como antes
+            print(f"🎲 Catálogo no disponible, consultando muestra en: {MOVIES_SERVICE_URL}")
+            params = {"size": n if not genre else max(n * 10, 100)}
+            response = metrics.timed_get(session, "sample", MOVIES_SERVICE_URL, params=params, timeout=10)
+            response.raise_for_status()
+
+            # Manejamos ambos casos: si devuelve lista directa o dict con key "movies"
+            data = response.json()
+            movies = data.get("movies", []) if isinstance(data, dict) else data
+            if genre:
+                wanted = genre.strip().lower()
+                movies = [m for m in movies if wanted in [str(g).strip().lower() for g in m.get("genres") or []]]
+            final_selection = random.sample(movies, min(n, len(movies)))
+
         print(f"✅ Retornando {len(final_selection)} películas aleatorias.")
+        metrics.REQUEST_SECONDS.labels("random", source).observe(time.perf_counter() - start)
         return final_selection
 
     except requests.exceptions.RequestException as e:
@@ -62,6 +79,20 @@ def get_random_movies():
         print(f"❌ Error inesperado: {e}")
         return {"error": f"Ocurrió un error interno: {str(e)}"}
 
+@app.get("/genres")
+def get_genres():
+    return catalog.genres()
+
+@app.get("/admin/catalog")
+def catalog_status():
+    return catalog.stats()
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """Métricas en formato Prometheus: latencia de /random, llamadas a movies-api y tamaño del catálogo"""
+    body, content_type = metrics.render()
+    return Response(content=body, headers={"Content-Type": content_type})
+
 @app.get("/")
 def root():
     return {"service": "Random Movies Service", "status": "active"}
\ No newline at end of file
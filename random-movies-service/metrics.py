@@ -0,0 +1,39 @@
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+REQUEST_SECONDS = Histogram(
+    "random_movies_request_seconds", "Duración de /random según de dónde salió la muestra", ["endpoint", "source"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+UPSTREAM_SECONDS = Histogram(
+    "random_movies_upstream_seconds", "Duración de las llamadas a movies-api", ["call"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+UPSTREAM_RESPONSES = Counter(
+    "random_movies_upstream_responses_total", "Respuestas de movies-api por código (error = sin respuesta)", ["call", "status"],
+)
+CATALOG_SIZE = Gauge("random_movies_catalog_size", "Tamaño del catálogo en memoria", ["kind"])
+CATALOG_AGE = Gauge("random_movies_catalog_age_seconds", "Segundos desde que se cargó la copia actual del catálogo")
+
+def timed_get(session, call, url, **kwargs):
+    """`session.get` registrando duración y código de respuesta de la llamada a movies-api"""
+    start = time.perf_counter()
+    status = "error"
+    try:
+        response = session.get(url, **kwargs)
+        status = str(response.status_code)
+        return response
+    finally:
+        UPSTREAM_SECONDS.labels(call).observe(time.perf_counter() - start)
+        UPSTREAM_RESPONSES.labels(call, status).inc()
+
+def watch_catalog(catalog):
+    """Tamaños del catálogo, leídos al momento de cada scrape"""
+    CATALOG_SIZE.labels("movies").set_function(lambda: catalog.stats()["movies"])
+    CATALOG_SIZE.labels("genres").set_function(lambda: catalog.stats()["genres"])
+    CATALOG_AGE.set_function(lambda: time.time() - catalog.loaded_at if catalog.loaded else 0.0)
+
+def render():
+    """(cuerpo, content type) para el endpoint /metrics"""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""Índice aproximado de vecinos (IVF) sobre embeddings de películas, en NumPy.
+
+Cada película se representa con la trama (TF-IDF reducido con SVD) y sus
+géneros, normalizado a norma 1. Un k-means agrupa el catálogo en listas
+invertidas; una consulta sólo recorre las `nprobe` listas con centroide más
+cercano. Todo se guarda en disco como `.npy` para abrirlo con mmap.
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+import scipy.sparse as sp
+
+from plot_index import plot_hash
+
+def item_embeddings(features, plot_index=None, dim=64, plot_weight=0.5, genre_weight=0.5):
+    """Embeddings float32 alineados con las filas de `features` (orden del catálogo)"""
+    from sklearn.decomposition import TruncatedSVD
+    from sklearn.preprocessing import normalize
+    parts = []
+    if plot_index is not None and len(plot_index) > 0 and plot_index.matrix.shape[1] > 1:
+        rows = plot_index.rows_for(features.titles)
+        n_components = max(1, min(dim, plot_index.matrix.shape[1] - 1))
+        reduced = TruncatedSVD(n_components=n_components, random_state=0).fit_transform(plot_index.matrix)
+        plot = np.zeros((len(features), n_components), dtype=np.float32)
+        plot[rows >= 0] = reduced[rows[rows >= 0]]
+        parts.append(normalize(plot) * plot_weight)
+    if features.genres.shape[1] > 0:
+        parts.append(normalize(features.genres.toarray()) * genre_weight)
+    if not parts:
+        return np.zeros((len(features), 1), dtype=np.float32)
+    return normalize(np.hstack(parts)).astype(np.float32)
+
+def _kmeans(vectors, n_lists, iterations, seed):
+    """k-means esférico simple (producto punto sobre vectores normalizados)"""
+    from sklearn.preprocessing import normalize
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        membership = sp.csr_matrix((np.ones(len(vectors), dtype=np.float32), (assign, np.arange(len(vectors)))), shape=(n_lists, len(vectors)))
+        sums = membership @ vectors
+        # Una lista vacía conserva su centroide anterior
+        empty = np.asarray(membership.sum(axis=1)).ravel() == 0
+        sums[empty] = centroids[empty]
+        centroids = normalize(sums).astype(np.float32)
+    return centroids, np.argmax(vectors @ centroids.T, axis=1)
+
+class IVFIndex:
+    def __init__(self, embeddings, centroids, list_offsets, list_items, quality, quality_rank):
+        self.embeddings = embeddings
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_items = list_items
+        # Rating IMDb / 10 y filas ordenadas por él: evita perder títulos que suben sólo por calidad
+        self.quality = quality
+        self.quality_rank = quality_rank
+
+    @classmethod
+    def build(cls, embeddings, quality, n_lists=None, iterations=10, seed=0):
+        n = len(embeddings)
+        n_lists = max(1, min(n, n_lists or int(np.sqrt(n))))
+        centroids, assign = _kmeans(embeddings, n_lists, iterations, seed)
+        order = np.argsort(assign, kind='stable')
+        offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(assign, minlength=n_lists))
+        quality = (np.asarray(quality, dtype=np.float32) / np.float32(10.0))
+        quality_rank = np.argsort(-quality, kind='stable').astype(np.int64)
+        return cls(embeddings, centroids, offsets, order.astype(np.int64), quality, quality_rank)
+
+    def __len__(self):
+        return len(self.embeddings)
+
+    def profile(self, rows, weights=None):
+        """Vector consulta: promedio (ponderado) de los embeddings de las películas que gustaron"""
+        if len(rows) == 0: return None
+        vector = np.average(self.embeddings[rows], axis=0, weights=weights)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else None
+
+    def search(self, query, k=300, nprobe=8, quality_weight=0.0):
+        """Filas de las `k` películas más parecidas a `query` dentro de las `nprobe` listas más cercanas.
+
+        `quality_weight` suma el rating normalizado al parecido, imitando el peso de la calidad en la fórmula final.
+        """
+        nprobe = min(nprobe, len(self.centroids))
+        lists = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        starts = self.list_offsets[lists]
+        ends = self.list_offsets[lists + 1]
+        rows = np.concatenate([self.list_items[s:e] for s, e in zip(starts, ends)])
+        if len(rows) <= k: return rows
+        sims = self.embeddings[rows] @ query + quality_weight * self.quality[rows]
+        return rows[np.argpartition(-sims, k - 1)[:k]]
+
+    def candidates(self, query, k=300, nprobe=8, quality_weight=0.0, extra_quality=100):
+        """Filas a puntuar: resultado ANN más los mejores por calidad global"""
+        rows = self.search(query, k, nprobe, quality_weight) if query is not None else np.empty(0, dtype=np.int64)
+        return np.union1d(rows, self.quality_rank[:extra_quality])
+
+    # --- PERSISTENCIA ---
+
+    _ARRAYS = ('embeddings', 'centroids', 'list_offsets', 'list_items', 'quality', 'quality_rank')
+
+    def save(self, directory, meta=None):
+        tmp = f"{directory}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for name in self._ARRAYS:
+            np.save(os.path.join(tmp, f'{name}.npy'), getattr(self, name))
+        with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta or {}, f)
+        old = f"{directory}.old-{os.getpid()}"
+        if os.path.exists(directory): os.rename(directory, old)
+        os.rename(tmp, directory)
+        shutil.rmtree(old, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        mode = 'r' if mmap else None
+        arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mode) for name in cls._ARRAYS}
+        with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        return cls(**arrays), meta
+
+class AnnIndexStore:
+    """Reconstruye el índice IVF cuando cambia el catálogo y lo deja persistido en disco"""
+
+    def __init__(self, directory, plot_index_store, dim=64):
+        self.directory = directory
+        self.plot_index_store = plot_index_store
+        self.dim = dim
+        self.index = None
+        self._built_for = None
+
+    def sync(self, features):
+        if features is None or len(features) == 0: return self.index
+        # Huella: mismos títulos en el mismo orden y mismo índice de tramas -> mismo índice ANN
+        titles_hash = _titles_hash(features.titles)
+        fingerprint = (titles_hash, _plot_stamp(self.plot_index_store.index))
+        if self._built_for == fingerprint: return self.index
+
+        if self.index is None and self.directory and os.path.exists(os.path.join(self.directory, 'meta.json')):
+            try:
+                index, meta = IVFIndex.load(self.directory)
+                if meta.get('rows') == len(features) and meta.get('titles_hash') == titles_hash \
+                        and meta.get('plot_stamp') == fingerprint[1]:
+                    print(f"📂 Índice ANN cargado de disco: {len(index)} películas")
+                    self.index, self._built_for = index, fingerprint
+                    return index
+            except Exception as e:
+                print(f"⚠️ No se pudo leer el índice ANN: {e}")
+
+        embeddings = item_embeddings(features, self.plot_index_store.index, dim=self.dim)
+        index = IVFIndex.build(embeddings, features.imdb_rating)
+        print(f"🧭 Índice ANN construido: {len(index)} películas en {len(index.centroids)} listas")
+        if self.directory:
+            try:
+                index.save(self.directory, {'rows': len(features), 'titles_hash': titles_hash, 'plot_stamp': fingerprint[1]})
+            except Exception as e:
+                print(f"⚠️ No se pudo guardar el índice ANN: {e}")
+        self.index, self._built_for = index, fingerprint
+        return index
+
+    def adopt(self, index, features):
+        """Toma un índice ya construido para `features` (el del artefacto precalculado)"""
+        self.index, self._built_for = index, (_titles_hash(features.titles), _plot_stamp(self.plot_index_store.index))
+
+    def on_snapshot(self, state):
+        self.sync(state.features)
+
+def _plot_stamp(plot_index):
+    return plot_index.stamp if plot_index is not None else None
+
+def _titles_hash(titles):
+    return str(plot_hash("\n".join(titles)))
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""Puntaje batch: pools de recomendaciones para muchos perfiles sobre una sola carga de datos.
+
+Los perfiles de un bloque se codifican como matrices (géneros x perfiles,
+directores x perfiles, TF-IDF de tramas x perfiles) y los scores de contenido de
+todo el catálogo salen de tres productos dispersos por bloque. Los vecinos
+sociales se buscan por perfil sobre la matriz de calificaciones del snapshot y,
+sin vecinos, el término social sale de los factores latentes (factors.py).
+La fórmula y los umbrales son los de rank_movies (ver scoring.py); el batch
+recorre siempre el catálogo completo, sin el filtro de candidatos del modo ANN.
+"""
+
+import numpy as np
+import scipy.sparse as sp
+
+from data import clean_float_values
+from plot_index import PlotIndex
+from scoring import (FINAL_COLUMNS, COLD_START_MIN_RATINGS, NEIGHBORS_MIN_RATINGS, POOL_SIZE, MIN_PLOT_CORPUS,
+                     build_taste_profile, mode_weights, blend, match_reasons, top_k)
+
+def profile_histories(table):
+    """Posiciones de las filas de cada perfil en el table: {(user_id, profile_name): arreglo}"""
+    if table.empty: return {}
+    return table.groupby(['user_id', 'profile_name'], sort=False, observed=True).indices
+
+def _indicator_matrix(vocabulary, item_lists):
+    """Matriz vocabulario x perfiles con 1.0 en los ítems de cada perfil"""
+    rows, cols = [], []
+    for j, items in enumerate(item_lists):
+        for item in set(items):
+            if item in vocabulary:
+                rows.append(vocabulary[item])
+                cols.append(j)
+    return sp.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+        shape=(len(vocabulary), len(item_lists)),
+    )
+
+def _final_columns(pool):
+    return pool[[c for c in FINAL_COLUMNS if c in pool.columns]]
+
+class BatchScorer:
+    def __init__(self, state, plot_index=None, chunk_size=128, factors=None, use_neighbors=True):
+        self.state = state
+        self.features = state.features
+        self.chunk_size = chunk_size
+        self.use_neighbors = use_neighbors
+        self.factors = factors if factors is not None and len(factors) == len(self.features) else None
+        self.histories = profile_histories(state.table)
+
+        movies = state.movies
+        if plot_index is None:
+            try:
+                plot_index = PlotIndex.fit(movies['title_norm'].tolist(), movies['plot'].tolist())
+            except ValueError:
+                # Catálogo sin tramas (vocabulario vacío): el término de trama queda en 0, como en el online
+                plot_index = None
+        self.plot_index = plot_index
+        # Fila del índice de tramas para cada fila del catálogo (una vez por catálogo)
+        self.plot_rows = plot_index.catalog_rows(self.features) if plot_index is not None else None
+
+        self.movies = movies
+        self.quality = self.features.quality()
+
+    def rank(self, profiles):
+        """Genera (email, profile_name, pool de 50, etiqueta del modo) para cada perfil"""
+        warm = []
+        for email, profile_name in profiles:
+            positions = self.histories.get((email, profile_name))
+            history = self.state.table.iloc[positions] if positions is not None else self.state.table.iloc[:0]
+            if len(history) < COLD_START_MIN_RATINGS:
+                yield email, profile_name, self._cold_start(history), "Cold Start"
+            else:
+                warm.append((email, profile_name, history))
+            if len(warm) >= self.chunk_size:
+                yield from self._rank_chunk(warm)
+                warm = []
+        if warm:
+            yield from self._rank_chunk(warm)
+
+    def _seen_rows(self, history):
+        rows = self.features.rows_for(history['title_norm'].dropna().unique()) if not history.empty else np.empty(0, dtype=np.int64)
+        return rows[rows >= 0]
+
+    def _rows(self, rows):
+        """Copia sólo de las filas elegidas del catálogo, con los mismos rellenos que rank_movies"""
+        pool = self.movies.iloc[rows].copy()
+        pool['imdb_rating'] = pool['imdb_rating'].fillna(5.0)
+        pool['formatted_genres'] = pool['formatted_genres'].fillna('')
+        return pool
+
+    def _cold_start(self, history):
+        # Orden global por rating del catálogo: alcanza con los primeros 50 + vistas
+        seen = self._seen_rows(history)
+        head = self.features.quality_rank()[:POOL_SIZE + len(seen)]
+        top = head[~np.isin(head, seen)][:POOL_SIZE]
+        pool = self._rows(top)
+        pool['predicted_score'] = (pool['imdb_rating'] / 10.0).fillna(0.5)
+        pool['match_reason'] = 'Tendencia Global'
+        return _final_columns(pool)
+
+    def _rank_chunk(self, chunk):
+        features, plot_index = self.features, self.plot_index
+        tastes = [build_taste_profile(history) for _, _, history in chunk]
+
+        # Contenido de todo el catálogo para todos los perfiles del bloque: (películas x perfiles)
+        genre_sizes = np.array([max(len(set(t.top_genres)), 1) for t in tastes], dtype=np.float32)
+        genre = np.asarray((features.genres @ _indicator_matrix(features.genre_vocab, [t.top_genres for t in tastes])).todense())
+        genre = genre / genre_sizes
+        director = (np.asarray((features.directors @ _indicator_matrix(features.director_vocab, [t.top_directors for t in tastes])).todense()) > 0).astype(np.float32)
+
+        plot = np.zeros((len(features), len(chunk)))
+        with_plot = [j for j, t in enumerate(tastes) if t.plot_corpus and len(t.plot_corpus) > MIN_PLOT_CORPUS]
+        if with_plot and plot_index is not None:
+            queries = plot_index.transform([tastes[j].plot_corpus for j in with_plot])
+            sims = np.asarray((plot_index.matrix @ queries.T).todense())
+            indexed = self.plot_rows >= 0
+            plot[np.ix_(indexed, with_plot)] = sims[self.plot_rows[indexed]]
+
+        ratings = self.state.ratings
+        for j, (email, profile_name, history) in enumerate(chunk):
+            social_raw = None
+            if self.use_neighbors and ratings is not None and len(history) >= NEIGHBORS_MIN_RATINGS:
+                neighbor_rows = ratings.neighbors(email, profile_name, tolerance=1, min_shared=5)
+                if len(neighbor_rows) > 0:
+                    social_scores = ratings.social_scores(neighbor_rows, min_score=6)
+                    rows = features.rows_for(social_scores.index)
+                    social_raw = np.full(len(features), np.nan)
+                    social_raw[rows[rows >= 0]] = social_scores.to_numpy()[rows >= 0]
+            has_neighbors = social_raw is not None
+            has_factors = not has_neighbors and self.factors is not None
+            if has_neighbors:
+                social = np.nan_to_num(social_raw, nan=0.0) / 10.0
+            elif has_factors:
+                vector = self.factors.fold_in(features.rows_for(history['title_norm'].tolist()),
+                                              history['user_score'].to_numpy(dtype=np.float32, na_value=np.nan))
+                social = self.factors.scores(vector)
+            else:
+                social = np.zeros(len(features))
+
+            predicted = np.asarray(blend(social, genre[:, j], director[:, j], plot[:, j], self.quality, has_neighbors, has_factors), dtype=np.float64)
+            predicted[self._seen_rows(history)] = -np.inf
+            mode_label = mode_weights(has_neighbors, has_factors)[3]
+            yield email, profile_name, self._pool(predicted, social, social_raw, genre[:, j], director[:, j], plot[:, j], mode_label), mode_label
+
+    def _pool(self, predicted, social, social_raw, genre, director, plot, mode_label):
+        top = top_k(predicted, min(POOL_SIZE, int(np.isfinite(predicted).sum())))
+        if len(top) == 0: return _final_columns(self.movies.iloc[:0])
+
+        pool = self._rows(top)
+        pool['predicted_score'] = predicted[top]
+        pool['match_reason'] = match_reasons(social[top], director[top], plot[top], genre[top], mode_label)
+        if social_raw is not None: pool['social_score_A'] = social_raw[top]
+        return _final_columns(clean_float_values(pool))
+
+def rank_profiles(state, profiles, plot_index=None, chunk_size=128, factors=None, use_neighbors=True):
+    """Lista de (email, profile_name, pool, modo) para los perfiles pedidos"""
+    return list(BatchScorer(state, plot_index=plot_index, chunk_size=chunk_size,
+                            factors=factors, use_neighbors=use_neighbors).rank(profiles))
+
+def all_profiles(state):
+    """Todos los perfiles (user_id, profile_name) que tienen interacciones en el snapshot"""
+    return list(profile_histories(state.table).keys())
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""Benchmark recall vs. latencia: modo ANN (IVF) contra la búsqueda exhaustiva.
+
+Para cada perfil compara el pool de los 50 mejores del modo ANN con el del
+recorrido exhaustivo (recall@50) y mide la latencia de rank_movies.
+
+Uso (desde recommendation-service/):
+    python benchmarks/bench_ann.py --movies 20000 --profiles 40
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from snapshot import CatalogSnapshot, MemorySource
+from plot_index import PlotIndexStore
+from ann import AnnIndexStore
+
+GENRES = ["Drama", "Comedy", "Action", "Thriller", "Romance", "Horror", "Sci-Fi", "Crime",
+          "Animation", "Documentary", "Family", "Fantasy", "Mystery", "War", "Western", "Music"]
+
+def synthetic(n_movies, n_profiles, seed=7):
+    rng = random.Random(seed)
+    # Temas: cada uno con su propio vocabulario para que la trama tenga estructura
+    topics = [[f"w{t}_{i}" for i in range(40)] for t in range(30)]
+    movies, topic_of = [], {}
+    for i in range(n_movies):
+        topic = rng.randrange(len(topics))
+        words = [rng.choice(topics[topic]) for _ in range(25)] + [f"common{rng.randrange(200)}" for _ in range(10)]
+        movies.append({
+            '_id': i + 1, 'title': f"Movie {i}", 'plot': " ".join(words),
+            'genres': rng.sample(GENRES[topic % 8: topic % 8 + 6], rng.randint(1, 3)),
+            'directors': [f"Director {rng.randrange(n_movies // 4)}"],
+            'imdb': {'rating': round(rng.uniform(2, 9.5), 1)},
+            'poster': None, 'fullplot': None, 'cast': [], 'writers': [],
+        })
+        topic_of[i + 1] = topic
+    interactions = []
+    t0 = datetime(2024, 1, 1)
+    for p in range(n_profiles):
+        favourite = rng.randrange(len(topics))
+        for m in rng.sample(movies, rng.randint(12, 29)):
+            in_topic = topic_of[m['_id']] == favourite
+            interactions.append({
+                'user_id': f"user{p}@bench", 'profile_name': 'main', 'movie_title': m['title'],
+                'score': rng.randint(7, 10) if in_topic else rng.randint(1, 8),
+                'timestamp': t0 + timedelta(seconds=len(interactions)),
+            })
+    return movies, interactions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--movies', type=int, default=20000)
+    parser.add_argument('--profiles', type=int, default=40)
+    parser.add_argument('--candidates', type=int, nargs='+', default=[300, 500, 1000])
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[8, 16, 32])
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import main as service
+
+    movies, interactions = synthetic(args.movies, args.profiles)
+    state = CatalogSnapshot(MemorySource(movies, interactions)).load()
+    plot_store = PlotIndexStore(None)
+    ann_store = AnnIndexStore(None, plot_store)
+    with contextlib.redirect_stdout(io.StringIO()):
+        plot_store.sync(state.movies)
+        start = time.perf_counter()
+        ann_store.sync(state.features)
+        build_time = time.perf_counter() - start
+
+    profiles = [f"user{p}@bench" for p in range(args.profiles)]
+    kwargs = dict(plot_index=plot_store.index, features=state.features, ratings=state.ratings)
+
+    def run(ann_index, candidates=None, nprobe=None):
+        if candidates: service.ANN_CANDIDATES, service.ANN_NPROBE = candidates, nprobe
+        pools, times = [], []
+        for email in profiles:
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                pool, _ = service.rank_movies(state.table, state.movies, email, 'main', ann_index=ann_index, **kwargs)
+            times.append(time.perf_counter() - start)
+            pools.append(set(pool['movie_id_str']))
+        return pools, np.array(times) * 1000
+
+    exact, exact_ms = run(None)
+    print(f"Catálogo: {args.movies} películas | perfiles: {args.profiles} | construcción IVF: {build_time:.2f}s")
+    print(f"{'modo':<22}{'recall@50':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    print(f"{'exhaustivo':<22}{1.0:>10.3f}{np.percentile(exact_ms, 50):>10.1f}{np.percentile(exact_ms, 95):>10.1f}")
+    for candidates in args.candidates:
+        for nprobe in args.nprobe:
+            pools, ms = run(ann_store.index, candidates, nprobe)
+            recall = np.mean([len(a & b) / max(len(b), 1) for a, b in zip(pools, exact)])
+            label = f"ann k={candidates} p={nprobe}"
+            print(f"{label:<22}{recall:>10.3f}{np.percentile(ms, 50):>10.1f}{np.percentile(ms, 95):>10.1f}")
+
+if __name__ == '__main__':
+    main()
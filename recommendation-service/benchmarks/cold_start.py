@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""Arranque en frío del recomendador: con artefacto precalculado vs. leyendo la fuente completa.
+
+Genera datos sintéticos (benchmarks/synthetic.py), publica el artefacto de
+arranque como lo haría build_artifact.py y lanza un proceso nuevo por corrida.
+Cada proceso mide desde antes de `import main` hasta que /health/ready responde
+200, y después la latencia del primer /recommendations. Sin artefacto la carga
+sale de MemorySource (proyección + DataFrames), que es una cota inferior de
+leer Mongo por red.
+
+Uso (desde recommendation-service/):
+    python benchmarks/cold_start.py
+    python benchmarks/cold_start.py --interactions 1000000 --runs 3
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import pickle
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SERVICE = os.path.dirname(HERE)
+
+def child(mode, workdir):
+    """Un arranque medido (corre en un proceso nuevo)"""
+    with open(os.path.join(workdir, 'docs.pkl'), 'rb') as f:
+        movies, docs, user = pickle.load(f)
+    os.environ.update(RECS_STORE_PATH='', PLOT_INDEX_DIR='', ANN_INDEX_DIR='', RECS_CACHE_TTL_SECONDS='0',
+                      CATALOG_ARTIFACT_DIR=os.path.join(workdir, 'catalog') if mode == 'artifact' else '',
+                      MONGO_URI='mongodb://127.0.0.1:1')
+    sys.path[:0] = [SERVICE]
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        import main
+        from snapshot import MemorySource
+        imported = time.perf_counter() - start
+        # Armar la fuente en memoria equivale a tener los datos en Mongo: no cuenta para el arranque
+        source_start = time.perf_counter()
+        main.snapshot.source = MemorySource(movies, docs)
+        start += time.perf_counter() - source_start
+        from fastapi.testclient import TestClient
+        with TestClient(main.app) as client:
+            accepting = time.perf_counter() - start
+            while client.get('/health/ready').status_code != 200:
+                time.sleep(0.01)
+            ready = time.perf_counter() - start
+            first = time.perf_counter()
+            response = client.get('/recommendations', params={'email': user[0], 'profile_name': user[1]})
+            first_request = time.perf_counter() - first
+            assert response.status_code == 200, response.text
+    print(json.dumps({'import_s': imported, 'accepting_s': accepting, 'ready_s': ready, 'first_request_ms': first_request * 1000}))
+
+def run(mode, workdir, runs):
+    results = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, __file__, '--child', mode, '--workdir', workdir],
+                             capture_output=True, text=True, check=True, cwd=SERVICE)
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return {key: statistics.median(r[key] for r in results) for key in results[0]}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--interactions', type=int, default=1_000_000)
+    parser.add_argument('--runs', type=int, default=3, help='arranques por modo (se reporta la mediana)')
+    parser.add_argument('--child', choices=('artifact', 'source'))
+    parser.add_argument('--workdir')
+    args = parser.parse_args()
+    if args.child: return child(args.child, args.workdir)
+
+    sys.path[:0] = [SERVICE, HERE]
+    for name in ('RECS_STORE_PATH', 'PLOT_INDEX_DIR', 'ANN_INDEX_DIR', 'FACTORS_DIR'):
+        os.environ.setdefault(name, '')
+    from plot_index import PlotIndexStore
+    from shared import SharedCatalog
+    from snapshot import CatalogSnapshot, MemorySource
+    from synthetic import generate
+
+    movies, docs, profiles = generate(args.interactions)
+    workdir = tempfile.mkdtemp(prefix='cold_start_')
+    try:
+        with open(os.path.join(workdir, 'docs.pkl'), 'wb') as f:
+            pickle.dump((movies, docs, profiles['content'][0]), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        # Lo mismo que build_artifact.py, con la fuente en memoria
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            state = CatalogSnapshot(MemorySource(movies, docs)).load()
+            plot_store = PlotIndexStore(None)
+            plot_store.sync(state.movies)
+            SharedCatalog(os.path.join(workdir, 'catalog'), keep=1).publish(state, plot_store.index)
+        print(f"🏗️ Artefacto: {len(state.movies)} películas, {len(state.interactions)} interacciones "
+              f"({time.perf_counter() - start:.1f}s)")
+        del state, plot_store, movies, docs
+
+        for mode in ('source', 'artifact'):
+            r = run(mode, workdir, args.runs)
+            print(f"{mode:>9}: import {r['import_s']:.2f}s | acepta conexiones {r['accepting_s']:.2f}s | "
+                  f"listo {r['ready_s']:.2f}s | primer request {r['first_request_ms']:.0f} ms")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""Prueba de carga de GET /recommendations con usuarios concurrentes.
+
+Cada usuario virtual pide recomendaciones para perfiles distintos (para no medir
+sólo aciertos de cache) y se reportan p50/p95/p99, throughput y códigos HTTP.
+
+Uso:
+    python benchmarks/load_test.py --url http://localhost:8006 --users 32 --requests 400 \\
+        --emails-file perfiles.txt
+El archivo de perfiles tiene una línea 'email,profile_name' por perfil; sin él se
+usan perfiles sintéticos user{i}@bench / main.
+"""
+
+import argparse
+import collections
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+def load_profiles(path, count):
+    if path:
+        with open(path, encoding='utf-8') as f:
+            return [tuple(line.strip().split(',', 1)) for line in f if ',' in line]
+    return [(f"user{i}@bench", "main") for i in range(count)]
+
+def percentile(values, q):
+    if not values: return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:8006')
+    parser.add_argument('--users', type=int, default=32, help='usuarios concurrentes')
+    parser.add_argument('--requests', type=int, default=400, help='requests totales')
+    parser.add_argument('--profiles', type=int, default=1000, help='perfiles sintéticos si no hay archivo')
+    parser.add_argument('--emails-file')
+    parser.add_argument('--timeout', type=float, default=30.0)
+    args = parser.parse_args()
+
+    profiles = load_profiles(args.emails_file, args.profiles)
+    latencies = []
+    statuses = collections.Counter()
+    lock = threading.Lock()
+    counter = iter(range(args.requests))
+
+    def worker(_):
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None: return
+            email, profile = profiles[i % len(profiles)]
+            query = urllib.parse.urlencode({'email': email, 'profile_name': profile})
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(f"{args.url}/recommendations?{query}", timeout=args.timeout) as response:
+                    response.read()
+                    status = response.status
+            except urllib.error.HTTPError as e:
+                status = e.code
+            except Exception:
+                status = 'error'
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                statuses[status] += 1
+                if status == 200: latencies.append(elapsed)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.users) as pool:
+        list(pool.map(worker, range(args.users)))
+    total = time.perf_counter() - start
+
+    print(f"{args.requests} requests | {args.users} usuarios concurrentes | {total:.1f}s")
+    print(f"  throughput: {statuses[200] / total:.1f} req/s (200 OK)")
+    print(f"  latencia ms  p50={percentile(latencies, 50):.0f}  p95={percentile(latencies, 95):.0f}  p99={percentile(latencies, 99):.0f}")
+    print(f"  códigos: {dict(statuses)}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""Suite de benchmarks del recomendador sobre datos sintéticos (sin MongoDB).
+
+Para cada escala genera catálogo e interacciones (benchmarks/synthetic.py), los
+carga con MemorySource por el mismo camino que el snapshot de producción y corre
+recommend_movies para perfiles de cada modo: cold start (<10 calificaciones),
+contenido (10-29) y comunidad (>=30). Reporta latencia p50/p95, throughput y pico
+de memoria asignada por request (tracemalloc, mediana y máximo sobre los mismos
+perfiles, en una pasada aparte para no inflar las latencias).
+
+Uso (desde recommendation-service/):
+    python benchmarks/run_suite.py
+    python benchmarks/run_suite.py --scales 1000 10000 100000 1000000 --profiles 10
+    python benchmarks/run_suite.py --json actual.json --baseline base.json
+Con --baseline sale con código 1 si alguna latencia empeora más de --max-regression.
+"""
+
+import argparse
+import collections
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Sin artefactos en disco: cada corrida arranca de cero
+for name in ('RECS_STORE_PATH', 'PLOT_INDEX_DIR', 'ANN_INDEX_DIR', 'FACTORS_DIR'):
+    os.environ.setdefault(name, '')
+
+import metrics
+from plot_index import PlotIndexStore
+from snapshot import CatalogSnapshot, MemorySource
+from synthetic import HISTORY_LENGTHS, generate
+
+@contextlib.contextmanager
+def quiet():
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+def peak_mb(fn):
+    """Pico de memoria asignada (MB) durante `fn`"""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+def bench_scale(service, interactions, n_profiles, measure_memory):
+    movies, docs, profiles = generate(interactions)
+    source = MemorySource(movies, docs)
+    result = {'movies': len(movies), 'interactions': len(docs),
+              'profiles': {mode: len(p) for mode, p in profiles.items()}}
+
+    # Carga: documentos -> DataFrames, prepare_data, features y matriz de calificaciones
+    snapshot = CatalogSnapshot(source)
+    start = time.perf_counter()
+    state, spans = metrics.traced('load', snapshot.load)
+    result['load_s'] = time.perf_counter() - start
+    result['load_phases_s'] = {phase: seconds for phase, seconds in spans}
+    if measure_memory:
+        result['load_peak_mb'] = peak_mb(lambda: CatalogSnapshot(source).load())
+
+    plot_store = PlotIndexStore(None)
+    start = time.perf_counter()
+    with quiet(): plot_store.sync(state.movies)
+    result['plot_index_s'] = time.perf_counter() - start
+
+    kwargs = dict(plot_index=plot_store.index, features=state.features, ratings=state.ratings)
+
+    def recommend(email, profile_name):
+        # Lo mismo que recommend_movies, conservando el modo aplicado
+        with quiet():
+            history = snapshot.user_history(email, profile_name, state)
+            pool, label = service.rank_movies(state.table, state.movies, email, profile_name, user_history=history, **kwargs)
+            service.sample_recommendations(pool)
+        return label
+
+    result['modes'] = {}
+    for mode, chosen in profiles.items():
+        chosen = chosen[:n_profiles]
+        if not chosen: continue
+        latencies, labels = [], collections.Counter()
+        start = time.perf_counter()
+        for email, profile_name in chosen:
+            t = time.perf_counter()
+            labels[recommend(email, profile_name)] += 1
+            latencies.append((time.perf_counter() - t) * 1000)
+        elapsed = time.perf_counter() - start
+        row = {
+            'p50_ms': float(np.percentile(latencies, 50)), 'p95_ms': float(np.percentile(latencies, 95)),
+            'per_second': len(chosen) / elapsed, 'labels': dict(labels),
+        }
+        if measure_memory:
+            peaks = [peak_mb(lambda: recommend(email, profile_name)) for email, profile_name in chosen]
+            row['peak_mb'] = float(np.median(peaks))
+            row['peak_max_mb'] = float(max(peaks))
+        result['modes'][mode] = row
+    return result
+
+def report(scale, result):
+    print(f"\n== {result['interactions']:,} interacciones | {result['movies']:,} películas | "
+          f"perfiles {result['profiles']}")
+    phases = ", ".join(f"{p} {s:.2f}s" for p, s in result['load_phases_s'].items())
+    memory = f" | pico {result['load_peak_mb']:.0f}MB" if 'load_peak_mb' in result else ""
+    print(f"carga {result['load_s']:.2f}s ({phases}){memory} | índice TF-IDF {result['plot_index_s']:.2f}s")
+    print(f"{'modo':<12}{'p50 ms':>10}{'p95 ms':>10}{'perfiles/s':>12}{'pico/req MB':>14}{'máx MB':>9}  modos obtenidos")
+    for mode, row in result['modes'].items():
+        peak = f"{row['peak_mb']:.1f}" if 'peak_mb' in row else "-"
+        peak_max = f"{row['peak_max_mb']:.1f}" if 'peak_max_mb' in row else "-"
+        print(f"{mode:<12}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['per_second']:>12.1f}{peak:>14}{peak_max:>9}  {row['labels']}")
+
+def regressions(results, baseline, tolerance):
+    """Latencias que empeoraron más que `tolerance` (proporción) respecto de la línea base"""
+    found = []
+    for scale, result in results.items():
+        base = baseline.get(scale)
+        if not base: continue
+        pairs = [('carga', base['load_s'], result['load_s'])]
+        pairs += [(f"{mode} p50", base['modes'][mode]['p50_ms'], row['p50_ms'])
+                  for mode, row in result['modes'].items() if mode in base.get('modes', {})]
+        for label, before, after in pairs:
+            if before > 0 and after > before * (1 + tolerance):
+                found.append(f"{scale} {label}: {before:.1f} -> {after:.1f} (+{(after / before - 1) * 100:.0f}%)")
+    return found
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1000, 10000, 100000], help='interacciones por escala')
+    parser.add_argument('--profiles', type=int, default=20, help='perfiles medidos por modo')
+    parser.add_argument('--no-memory', action='store_true', help='no medir picos de memoria (más rápido)')
+    parser.add_argument('--json', help='guardar los resultados en este archivo')
+    parser.add_argument('--baseline', help='resultados previos (--json) contra los que comparar')
+    parser.add_argument('--max-regression', type=float, default=0.25, help='empeoramiento tolerado (0.25 = 25%%)')
+    args = parser.parse_args()
+
+    print("Importando el servicio...")
+    with quiet():
+        import main as service
+
+    print(f"Modos por largo de historial: {HISTORY_LENGTHS}")
+    results = {}
+    for scale in args.scales:
+        results[str(scale)] = bench_scale(service, scale, args.profiles, not args.no_memory)
+        report(scale, results[str(scale)])
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            found = regressions(results, json.load(f), args.max_regression)
+        if found:
+            print("\n❌ Regresiones:\n  " + "\n  ".join(found))
+            sys.exit(1)
+        print("\n✅ Sin regresiones respecto de la línea base")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""Catálogos e historiales sintéticos con la forma de las colecciones de Mongo.
+
+Los documentos sirven tal cual para `snapshot.MemorySource`, así que el
+benchmark recorre el mismo camino que producción (build_*_frame, prepare_data,
+CatalogFeatures, RatingMatrix) sin un MongoDB sembrado.
+
+- Popularidad sesgada: cada perfil elige títulos con probabilidad Zipf, así que
+  pocas películas concentran la mayoría de las calificaciones.
+- Largo del historial según el modo que se quiere ejercitar: cold start (<10),
+  contenido (10-29) y comunidad (>=30).
+- Los perfiles pertenecen a grupos con gustos parecidos (nota base por grupo y
+  película, ±1 de ruido) para que los de comunidad encuentren vecinos.
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+
+GENRES = ["Drama", "Comedy", "Action", "Thriller", "Romance", "Horror", "Sci-Fi", "Crime",
+          "Animation", "Documentary", "Family", "Fantasy", "Mystery", "War", "Western", "Music"]
+WORDS = ("love war family crime space robot detective murder journey friendship secret island city police "
+         "ghost dream king queen heist revenge school music ocean alien storm prison desert train doctor").split()
+
+# Largo del historial (mínimo, máximo) de los perfiles de cada modo
+HISTORY_LENGTHS = {"cold_start": (1, 9), "content": (10, 29), "community": (30, 150)}
+
+def catalog(n_movies, seed=42):
+    """Documentos de películas; el _id es la posición + 1 y los más bajos son los más populares"""
+    rng = random.Random(seed)
+    movies = []
+    for i in range(n_movies):
+        genres = rng.sample(GENRES, rng.randint(1, 3))
+        movies.append({
+            '_id': i + 1, 'title': f"Movie {i} {rng.choice(WORDS)}",
+            'plot': " ".join(rng.choice(WORDS) for _ in range(30)),
+            'fullplot': None, 'genres': genres,
+            'directors': [f"Director {rng.randrange(max(n_movies // 5, 1))}"],
+            'cast': [f"Actor {rng.randrange(max(n_movies, 1))}" for _ in range(3)], 'writers': [],
+            'imdb': {'rating': round(rng.uniform(2, 9.5), 1), 'votes': int(1e6 / (i + 1))},
+            'year': rng.randint(1930, 2024), 'runtime': rng.randint(70, 180), 'poster': None,
+        })
+    return movies
+
+def generate(interactions, movies=None, mix=(0.2, 0.4, 0.4), groups=8, zipf=1.0, seed=42):
+    """(películas, interacciones, perfiles por modo) con unas `interactions` calificaciones.
+
+    `mix` es la proporción de perfiles cold start / contenido / comunidad. Sin
+    `movies`, el catálogo crece con la escala (una película cada 20 calificaciones,
+    entre 500 y 50.000).
+    """
+    n_movies = movies or min(max(interactions // 20, 500), 50000)
+    movie_docs = catalog(n_movies, seed)
+    rng = np.random.default_rng(seed)
+
+    # Popularidad Zipf: muestreo por búsqueda binaria sobre la acumulada (O(k log n) por perfil)
+    weights = 1.0 / np.arange(1, n_movies + 1) ** zipf
+    cumulative = np.cumsum(weights / weights.sum())
+    # Nota base de cada grupo para cada película
+    taste = rng.integers(1, 11, size=(groups, n_movies), dtype=np.int8)
+
+    def draw(count):
+        return np.searchsorted(cumulative, rng.random(count), side='right').clip(0, n_movies - 1)
+
+    modes = list(HISTORY_LENGTHS)
+    profiles = {mode: [] for mode in modes}
+    interaction_docs = []
+    t0 = datetime(2024, 1, 1)
+    user = 0
+    while len(interaction_docs) < interactions:
+        mode = modes[rng.choice(len(modes), p=np.asarray(mix) / sum(mix))]
+        low, high = HISTORY_LENGTHS[mode]
+        length = min(int(rng.integers(low, high + 1)), n_movies, interactions - len(interaction_docs))
+        if mode != "cold_start" and length < low: break
+        rows = np.unique(draw(length * 2))
+        while len(rows) < length: rows = np.union1d(rows, draw(length))
+        rows = rng.permutation(rows)[:length]
+        email, group = f"user{user}@bench", user % groups
+        scores = np.clip(taste[group, rows] + rng.integers(-1, 2, size=len(rows)), 1, 10)
+        for row, score in zip(rows.tolist(), scores.tolist()):
+            interaction_docs.append({
+                '_id': len(interaction_docs) + 1, 'user_id': email, 'profile_name': 'main',
+                'movie_title': movie_docs[row]['title'], 'score': score,
+                'timestamp': t0 + timedelta(seconds=len(interaction_docs)),
+            })
+        profiles[mode].append((email, 'main'))
+        user += 1
+    return movie_docs, interaction_docs, profiles
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""Job offline: arma el artefacto de arranque del recomendador.
+
+Carga el snapshot completo de Mongo, sincroniza el índice de tramas (y el ANN si
+se pide) y publica todo en CATALOG_ARTIFACT_DIR con el formato del catálogo
+compartido (shared.py). Al iniciar, el servicio restaura esa versión en lugar de
+leer Mongo entero y reajustar los índices; el refresco incremental sigue desde
+el cursor guardado. En docker compose lo corre el servicio recommendation-artifact
+(una vez por `up`); conviene repetirlo tras una recarga grande:
+
+    docker compose run --rm recommendation-artifact
+    docker compose exec recommendation-service python build_artifact.py
+    python build_artifact.py --out ./artifacts/catalog --ann
+"""
+
+import argparse
+import os
+import time
+
+from pymongo import MongoClient
+
+from ann import AnnIndexStore
+from plot_index import PlotIndexStore
+from shared import SharedCatalog
+from snapshot import CatalogSnapshot, MongoSource
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mongo-uri', default=os.getenv("MONGO_URI", "mongodb://mongodb:27017"))
+    parser.add_argument('--out', default=os.getenv("CATALOG_ARTIFACT_DIR", "/app/artifacts/catalog"))
+    parser.add_argument('--plot-index-dir', default=os.getenv("PLOT_INDEX_DIR", "/app/artifacts/plot_index"))
+    parser.add_argument('--ann', action='store_true', default=os.getenv("ANN_MODE", "0") == "1",
+                        help='incluir el índice ANN (para servicios con ANN_MODE=1)')
+    parser.add_argument('--keep', type=int, default=2, help='versiones que se conservan')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    state = CatalogSnapshot(MongoSource(MongoClient(args.mongo_uri, serverSelectionTimeoutMS=5000))).load()
+    print(f"📦 Snapshot: {len(state.movies)} películas, {len(state.interactions)} interacciones "
+          f"({time.perf_counter() - start:.1f}s)")
+
+    plot_index_store = PlotIndexStore(args.plot_index_dir, max_features=int(os.getenv("PLOT_INDEX_MAX_FEATURES", "2000")))
+    plot_index_store.sync(state.movies)
+    ann_index = None
+    if args.ann:
+        ann_index = AnnIndexStore(os.getenv("ANN_INDEX_DIR", "/app/artifacts/ann_index"), plot_index_store).sync(state.features)
+
+    name = SharedCatalog(args.out, keep=args.keep, clear=False).publish(state, plot_index_store.index, ann_index)
+    if name is None:
+        print("❌ El snapshot está vacío: no se publicó ningún artefacto")
+        raise SystemExit(1)
+    print(f"✅ Artefacto {name} listo en {args.out} ({time.perf_counter() - start:.1f}s en total)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""Cache LRU/TTL del pool de 50 recomendaciones por perfil.
+
+El pool puntuado se guarda por (email, profile_name) y en cada request sólo se
+vuelven a sortear las 12 películas. Las entradas vencen por TTL, se desalojan
+por LRU cuando se supera el presupuesto de memoria y se invalidan cuando el
+perfil califica algo nuevo.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+class RecommendationCache:
+    def __init__(self, ttl_seconds=300.0, max_bytes=64 * 1024 * 1024, max_entries=10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _size(pool):
+        return int(pool.memory_usage(deep=True).sum())
+
+    def get(self, email, profile_name):
+        """Devuelve (pool, modo) si hay una entrada vigente; None si no"""
+        key = (email, profile_name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[3] > self.ttl_seconds:
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1]
+
+    def put(self, email, profile_name, pool, mode_label):
+        key = (email, profile_name)
+        size = self._size(pool)
+        if size > self.max_bytes: return
+        with self._lock:
+            if key in self._entries: self._drop(key)
+            self._entries[key] = (pool, mode_label, size, time.time())
+            self._bytes += size
+            while self._entries and (self._bytes > self.max_bytes or len(self._entries) > self.max_entries):
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry[2]
+
+    def invalidate(self, email, profile_name=None):
+        """Invalida un perfil (o todos los perfiles de la cuenta si profile_name es None)"""
+        with self._lock:
+            if profile_name is not None:
+                keys = [(email, profile_name)] if (email, profile_name) in self._entries else []
+            else:
+                keys = [k for k in self._entries if k[0] == email]
+            for key in keys: self._drop(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+
+    def on_snapshot(self, state):
+        """Polling de interacciones: el snapshot informa qué perfiles calificaron desde el último refresco"""
+        if state.changed_profiles is None:
+            # Recarga completa o catálogo nuevo: cualquier pool puede cambiar
+            self.clear()
+            return
+        for email, profile_name in state.changed_profiles:
+            self.invalidate(email, profile_name)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
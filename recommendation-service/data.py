@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""Transformaciones de datos del recomendador (documentos Mongo -> DataFrames)"""
+
+import pandas as pd
+import numpy as np
+
+# Proyecciones de Mongo: sólo los campos que usa el puntaje. Lo que se muestra en la
+# tarjeta (DISPLAY_FIELDS) se pide aparte y sólo para las películas devueltas
+MOVIE_FIELDS = {'_id': 1, 'title': 1, 'genres': 1, 'directors': 1, 'plot': 1, 'imdb.rating': 1}
+INTERACTION_FIELDS = {'_id': 1, 'user_id': 1, 'profile_name': 1, 'movie_title': 1, 'title': 1, 'score': 1, 'timestamp': 1}
+DISPLAY_FIELDS = ('poster', 'fullplot', 'cast', 'writers', 'year', 'runtime', 'imdb')
+
+# Columnas de la tabla de interacciones con pocos valores distintos y muchas repeticiones
+CATEGORY_COLUMNS = ('user_id', 'profile_name', 'title_norm', 'movie_title')
+
+# Índices de opiniones_db.interactions que asegura el recomendador al arrancar (clave, nombre):
+# historial de un perfil por fecha y última calificación de un título (title_norm la guarda el opinion-service)
+INTERACTION_INDEXES = (
+    ([('user_id', 1), ('profile_name', 1), ('timestamp', -1)], 'user_profile_timestamp'),
+    ([('user_id', 1), ('profile_name', 1), ('title_norm', 1), ('timestamp', -1)], 'user_profile_title_timestamp'),
+)
+
+def history_pipeline(user_id, profile_name):
+    """Agregación con el historial de un perfil: la calificación más reciente de cada título.
+
+    El $match y el $sort usan el índice user_profile_timestamp, así que Mongo sólo
+    recorre los documentos del perfil. Los documentos viejos sin title_norm se
+    agrupan por el título en minúsculas; dedupe_interactions termina de unificar
+    con la normalización de Python.
+    """
+    title = {'$ifNull': ['$movie_title', {'$ifNull': ['$title', '']}]}
+    return [
+        {'$match': {'user_id': user_id, 'profile_name': profile_name}},
+        {'$sort': {'timestamp': -1}},
+        {'$group': {
+            '_id': {'$ifNull': ['$title_norm', {'$toLower': {'$trim': {'input': title}}}]},
+            'doc': {'$first': '$$ROOT'},
+        }},
+        {'$replaceRoot': {'newRoot': '$doc'}},
+        {'$project': INTERACTION_FIELDS},
+    ]
+
+def normalize_text(text):
+    """Función auxiliar para normalizar títulos"""
+    if pd.isna(text): return ""
+    return str(text).lower().strip()
+
+def build_movies_frame(movies_data):
+    """Convierte documentos de películas en un DataFrame deduplicado por título normalizado"""
+    df = pd.DataFrame(movies_data)
+
+    if not df.empty and 'title' in df.columns:
+        # Estandarizamos: 'title_norm'
+        df['title_norm'] = df['title'].apply(normalize_text)
+        df = df.drop_duplicates(subset=['title_norm'], keep='first').reset_index(drop=True)
+
+    return df
+
+def build_interactions_frame(interactions_data):
+    """Convierte documentos de interacciones en un DataFrame con la última nota por título"""
+    df = pd.DataFrame(interactions_data)
+
+    # Normalizar título en interacciones
+    if not df.empty:
+        # Buscamos la columna de título disponible
+        col_title = 'movie_title' if 'movie_title' in df.columns else 'title'
+
+        if col_title in df.columns:
+            # CAMBIO: Usamos el mismo nombre 'title_norm' que en movies
+            df['title_norm'] = df[col_title].apply(normalize_text)
+
+    return dedupe_interactions(df)
+
+def dedupe_interactions(df):
+    """Se queda con la calificación más reciente de cada (usuario, perfil, título)"""
+    if not df.empty and 'user_id' in df.columns and 'profile_name' in df.columns and 'title_norm' in df.columns:
+        if 'timestamp' in df.columns:
+            df = df.sort_values('timestamp', ascending=False)
+        # Deduplicar usando el título normalizado
+        df = df.drop_duplicates(subset=['user_id', 'profile_name', 'title_norm'], keep='first')
+    return df
+
+def extract_rating_value(rating_data):
+    if isinstance(rating_data, dict):
+        if '$numberDouble' in rating_data:
+            try: return float(rating_data['$numberDouble'])
+            except: return None
+    elif isinstance(rating_data, (int, float)): return float(rating_data)
+    elif isinstance(rating_data, str):
+        try: return float(rating_data)
+        except: return None
+    return None
+
+def format_genres(genres_data):
+    if isinstance(genres_data, list): return ', '.join(g for g in genres_data if g)
+    elif isinstance(genres_data, str): return genres_data
+    return None
+
+def clean_float_values(df):
+    df_clean = df.copy()
+    for col in df_clean.columns:
+        if df_clean[col].dtype in ['float64', 'float32']:
+            df_clean[col] = df_clean[col].replace([np.inf, -np.inf], np.nan).fillna(0.0)
+    return df_clean
+
+def parse_movie_ids(ids):
+    """ObjectId, {'$oid': ...} o cualquier otro valor -> string"""
+    oid = ids.str.get('$oid') if ids.dtype == object else None
+    if oid is not None and oid.notna().any():
+        return oid.where(oid.notna(), ids.astype(str)).astype(str)
+    return ids.astype(str)
+
+def parse_imdb_ratings(imdb):
+    """Extrae imdb.rating como float (admite números, strings y {'$numberDouble': ...})"""
+    rating = imdb.str.get('rating') if imdb.dtype == object else pd.Series(np.nan, index=imdb.index)
+    wrapped = rating.str.get('$numberDouble') if rating.dtype == object else None
+    if wrapped is not None:
+        rating = rating.where(wrapped.isna(), wrapped)
+    return pd.to_numeric(rating, errors='coerce')
+
+def prepare_movies(dfmovies):
+    """Calcula las columnas derivadas del catálogo (id, rating, géneros, trama, directores)"""
+    dfmovies['movie_id_str'] = parse_movie_ids(dfmovies['_id'])
+    dfmovies['imdb_rating'] = parse_imdb_ratings(dfmovies['imdb']) if 'imdb' in dfmovies.columns else np.nan
+    genres = dfmovies['genres'] if 'genres' in dfmovies.columns else pd.Series(None, index=dfmovies.index, dtype=object)
+    kinds = genres.map(type)
+    formatted = genres.where(kinds == str, None)
+    formatted[kinds == list] = genres[kinds == list].str.join(', ')
+    dfmovies['formatted_genres'] = formatted
+    dfmovies['plot'] = dfmovies['plot'].fillna('') if 'plot' in dfmovies.columns else ''
+    directors = dfmovies['directors'] if 'directors' in dfmovies.columns else pd.Series(None, index=dfmovies.index, dtype=object)
+    dfmovies['directors'] = directors.where(directors.map(type) == list, pd.Series([[]] * len(dfmovies), index=dfmovies.index))
+
+    if 'title_norm' not in dfmovies.columns:
+        dfmovies['title_norm'] = dfmovies['title'].apply(normalize_text)
+    return dfmovies
+
+def prepare_data(dfmovies, dfopiniones):
+    # Preparar Movies
+    if 'movie_id_str' not in dfmovies.columns:
+        prepare_movies(dfmovies)
+
+    if dfopiniones.empty:
+        return pd.DataFrame(columns=['user_id', 'profile_name', 'movie_title', 'user_score', 'average_imdb_rating', 'movie_id_str', 'genres', 'poster', 'plot', 'fullplot', 'cast', 'directors', 'writers'])
+
+    # Asegurar title_norm en opiniones
+    if 'title_norm' not in dfopiniones.columns:
+        col_title = 'movie_title' if 'movie_title' in dfopiniones.columns else 'title'
+        if col_title in dfopiniones.columns:
+            dfopiniones['title_norm'] = dfopiniones[col_title].apply(normalize_text)
+        else:
+            return pd.DataFrame()
+
+    movie_columns = ['title_norm', 'title', 'movie_id_str', 'imdb_rating', 'formatted_genres', 'poster', 'plot', 'fullplot', 'cast', 'directors', 'writers']
+    merged = pd.merge(
+        dfopiniones,
+        dfmovies[[c for c in movie_columns if c in dfmovies.columns]],
+        on='title_norm',
+        how='inner',
+        suffixes=('_opin', '')
+    )
+
+    merged['movie_title'] = merged['title']
+    merged = merged.rename(columns={'score': 'user_score', 'formatted_genres': 'genres'})
+    merged = merged.loc[:, ~merged.columns.duplicated()]
+
+    return merged
+
+def compact_movies(dfmovies):
+    """Quita del catálogo los campos de presentación (se piden después, sólo para las 12 elegidas)"""
+    return dfmovies.drop(columns=[c for c in DISPLAY_FIELDS if c in dfmovies.columns])
+
+def compact_table(table):
+    """Tabla de interacciones con ids y títulos como categorías y la nota en float32"""
+    if table.empty: return table
+    table = table.astype({c: 'category' for c in CATEGORY_COLUMNS if c in table.columns and table[c].dtype != 'category'})
+    if 'user_score' in table.columns:
+        table['user_score'] = pd.to_numeric(table['user_score'], errors='coerce').astype(np.float32)
+    return table
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""Campos de presentación de las películas recomendadas, pedidos bajo demanda.
+
+El snapshot sólo carga lo que usa el puntaje (título, géneros, directores, trama
+y rating). Poster, sinopsis completa, elenco, guionistas, año, duración e imdb
+se piden a la fuente del snapshot sólo para las películas que se devuelven y se cachean por
+id; el cache se vacía cuando el catálogo se recarga o cambia.
+
+Si la fuente no responde (Mongo caído) la recomendación se sirve igual: con los
+últimos valores conocidos de cada película (los del cache anterior a la última
+recarga) o, si no los hay, sin esos campos.
+"""
+
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from data import DISPLAY_FIELDS, parse_movie_ids
+from scoring import FINAL_COLUMNS
+
+class DisplayFields:
+    def __init__(self, snapshot, max_entries=20000):
+        self.snapshot = snapshot
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # movie_id_str -> {campo: valor}
+        self._stale = {}                # entradas de antes de la última recarga, para cuando la fuente falla
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def fetch(self, movie_ids):
+        """{movie_id_str: campos de presentación} de las películas pedidas"""
+        found, missing = {}, []
+        with self._lock:
+            for movie_id in movie_ids:
+                entry = self._entries.get(movie_id)
+                if entry is None:
+                    missing.append(movie_id)
+                else:
+                    self._entries.move_to_end(movie_id)
+                    found[movie_id] = entry
+            self.hits += len(found)
+            self.misses += len(missing)
+        if not missing: return found
+
+        try:
+            docs = self.snapshot.source.fetch_display(missing)
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+                stale = {movie_id: self._stale[movie_id] for movie_id in missing if movie_id in self._stale}
+            print(f"⚠️ No se pudieron leer los campos de presentación de {len(missing)} películas ({len(stale)} con valores anteriores): {e}")
+            found.update(stale)
+            return found
+        ids = parse_movie_ids(pd.Series([d.get('_id') for d in docs])) if docs else []
+        fetched = {movie_id: {f: doc.get(f) for f in DISPLAY_FIELDS} for movie_id, doc in zip(ids, docs)}
+        with self._lock:
+            for movie_id, entry in fetched.items():
+                self._entries[movie_id] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        found.update(fetched)
+        return found
+
+    def attach(self, frame, fields=None):
+        """Agrega a `frame` (las películas elegidas) los campos de presentación pedidos"""
+        wanted = [f for f in DISPLAY_FIELDS if fields is None or f in fields]
+        if not wanted or frame.empty or 'movie_id_str' not in frame.columns: return frame
+        ids = frame['movie_id_str'].tolist()
+        docs = self.fetch(ids)
+        frame = frame.copy()
+        for field in wanted:
+            frame[field] = pd.Series([docs.get(movie_id, {}).get(field) for movie_id in ids], index=frame.index, dtype=object)
+        # Mismo orden de columnas que cuando el pool traía todos los campos
+        ordered = [c for c in FINAL_COLUMNS if c in frame.columns]
+        return frame[ordered + [c for c in frame.columns if c not in ordered]]
+
+    def clear(self):
+        with self._lock:
+            self._stale = self._entries
+            self._entries = OrderedDict()
+
+    def on_snapshot(self, state):
+        """Listener del snapshot: las películas pueden haber cambiado tras una recarga completa"""
+        if state.changed_profiles is None: self.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "stale_entries": len(self._stale),
+            "hit_ratio": round(self.hits / total, 4) if total else None,
+        }
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""Factorización matricial implícita (ALS) de la matriz perfil x título.
+
+Cada calificación se toma como feedback implícito (Hu, Koren y Volinsky): la
+preferencia es 1 si la nota es de LIKE_SCORE para arriba y 0 si no, con una
+confianza que crece cuanto más lejos está la nota del medio. Los títulos que
+el perfil no calificó cuentan como preferencia 0 con confianza 1. El modelo se
+entrena offline (train_factors.py) sobre la RatingMatrix del snapshot y sólo se
+guardan los factores de los títulos, como `.npy` que se abren con mmap.
+
+En línea el perfil no necesita estar en el modelo: su vector sale de su propio
+historial ("fold-in", un sistema k x k) y el término colaborativo de todos los
+candidatos es un producto matriz-vector contra los factores de los títulos.
+"""
+
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import scipy.sparse as sp
+
+# Desde esta nota el título cuenta como "le gustó" (el mismo corte que el puntaje social)
+LIKE_SCORE = 6
+# Presupuesto de calificaciones por bloque del ALS (cada una ocupa k x k floats durante el bloque)
+CHUNK_NNZ = 16384
+
+def preference_confidence(scores, alpha):
+    """(preferencia 0/1, confianza) de cada nota 1-10"""
+    scores = np.asarray(scores, dtype=np.float32)
+    liked = scores >= LIKE_SCORE
+    strength = np.where(liked, scores - (LIKE_SCORE - 1), LIKE_SCORE - scores) / (10 - LIKE_SCORE + 1)
+    return liked.astype(np.float32), 1.0 + alpha * strength.astype(np.float32)
+
+def _solve_side(matrix, other, regularization, alpha):
+    """Un medio paso de ALS: los factores de las filas de `matrix` (CSR) con los de las columnas fijos"""
+    k = other.shape[1]
+    base = other.T.astype(np.float64) @ other + regularization * np.eye(k)
+    preference, confidence = preference_confidence(matrix.data, alpha)
+    result = np.zeros((matrix.shape[0], k), dtype=np.float32)
+    indptr = matrix.indptr
+    start = 0
+    while start < matrix.shape[0]:
+        # Filas hasta completar el presupuesto de calificaciones (al menos una)
+        end = max(int(np.searchsorted(indptr, indptr[start] + CHUNK_NNZ, side='right')) - 1, start + 1)
+        end = min(end, matrix.shape[0])
+        lo, hi = indptr[start], indptr[end]
+        y = other[matrix.indices[lo:hi]]
+        # Suma por fila de (c - 1) y yᵀ y de las calificaciones de cada fila, con una matriz de segmentos
+        segments = sp.csr_matrix((np.ones(hi - lo, dtype=np.float32), np.arange(hi - lo), indptr[start:end + 1] - lo),
+                                 shape=(end - start, hi - lo))
+        weighted = (confidence[lo:hi] - 1.0)[:, None] * y
+        outer = (weighted[:, :, None] * y[:, None, :]).reshape(hi - lo, k * k)
+        a = (segments @ outer).reshape(end - start, k, k) + base
+        b = segments @ ((confidence[lo:hi] * preference[lo:hi])[:, None] * y)
+        result[start:end] = np.linalg.solve(a, b[:, :, None])[:, :, 0]
+        start = end
+    return result
+
+class FactorModel:
+    def __init__(self, titles, item_factors, regularization, alpha, gram=None):
+        self.titles = np.asarray(titles, dtype=object)
+        self.item_factors = item_factors
+        self.regularization = regularization
+        self.alpha = alpha
+        # Yᵀ Y + λI de los títulos entrenados (no cambia al reordenarlos para el catálogo)
+        self.gram = gram if gram is not None else (
+            item_factors.T.astype(np.float64) @ item_factors + regularization * np.eye(item_factors.shape[1]))
+        self.row_of = {t: i for i, t in enumerate(self.titles)}
+
+    @classmethod
+    def train(cls, ratings, factors=16, regularization=1.0, alpha=20.0, iterations=10, seed=42):
+        """ALS sobre la matriz de calificaciones (CSR por perfil, CSC por título)"""
+        rng = np.random.default_rng(seed)
+        profiles, items = ratings.csr.shape
+        user_factors = rng.normal(0, 0.01, (profiles, factors)).astype(np.float32)
+        item_factors = rng.normal(0, 0.01, (items, factors)).astype(np.float32)
+        # La CSC de perfiles x títulos traspuesta es la CSR de títulos x perfiles, sin copiar
+        by_item = ratings.csc.T
+        for iteration in range(iterations):
+            start = time.perf_counter()
+            user_factors = _solve_side(ratings.csr, item_factors, regularization, alpha)
+            item_factors = _solve_side(by_item, user_factors, regularization, alpha)
+            print(f"🔁 ALS iteración {iteration + 1}/{iterations}: {time.perf_counter() - start:.1f}s")
+        return cls(ratings.item_titles, item_factors, regularization, alpha)
+
+    def __len__(self):
+        return len(self.titles)
+
+    @property
+    def dim(self):
+        return self.item_factors.shape[1]
+
+    def rows_for(self, titles):
+        """Posiciones en el modelo para cada título (-1 si no tiene factores)"""
+        return np.fromiter((self.row_of.get(t, -1) for t in titles), dtype=np.int64, count=len(titles))
+
+    def align(self, titles):
+        """Modelo con las filas en el orden de `titles` (el catálogo); ceros para los títulos sin factores"""
+        rows = self.rows_for(titles)
+        known = rows >= 0
+        aligned = np.zeros((len(titles), self.dim), dtype=np.float32)
+        aligned[known] = self.item_factors[rows[known]]
+        return FactorModel(titles, aligned, self.regularization, self.alpha, gram=self.gram)
+
+    def fold_in(self, rows, scores):
+        """Vector del perfil a partir de sus calificaciones (filas del modelo y notas), sin reentrenar"""
+        rows, scores = np.asarray(rows, dtype=np.int64), np.asarray(scores, dtype=np.float32)
+        keep = (rows >= 0) & np.isfinite(scores)
+        y = self.item_factors[rows[keep]]
+        preference, confidence = preference_confidence(scores[keep], self.alpha)
+        a = self.gram + (y.T * (confidence - 1.0)) @ y
+        b = y.T @ (confidence * preference)
+        return np.linalg.solve(a, b)
+
+    def scores(self, vector, rows=None):
+        """Preferencia estimada (0-1) de cada fila, o de las filas pedidas"""
+        factors = self.item_factors if rows is None else self.item_factors[rows]
+        return np.clip(factors @ vector.astype(np.float32), 0.0, 1.0)
+
+    # --- PERSISTENCIA ---
+
+    def save(self, directory, meta=None):
+        tmp = f"{directory}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        np.save(os.path.join(tmp, 'item_factors.npy'), self.item_factors)
+        np.save(os.path.join(tmp, 'gram.npy'), self.gram)
+        with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({**(meta or {}), 'titles': list(self.titles),
+                       'regularization': self.regularization, 'alpha': self.alpha}, f)
+        old = f"{directory}.old-{os.getpid()}"
+        if os.path.exists(directory): os.rename(directory, old)
+        os.rename(tmp, directory)
+        shutil.rmtree(old, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        mode = 'r' if mmap else None
+        with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        model = cls(meta.pop('titles'), np.load(os.path.join(directory, 'item_factors.npy'), mmap_mode=mode),
+                    meta['regularization'], meta['alpha'], gram=np.load(os.path.join(directory, 'gram.npy')))
+        return model, meta
+
+class FactorModelStore:
+    """Sigue el modelo que deja train_factors.py en disco, alineado con el catálogo del snapshot"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.trained = None
+        self.model = None
+        self.meta = {}
+        self._loaded_stamp = None
+        self._aligned_for = None
+
+    def _stamp(self):
+        try:
+            return os.stat(os.path.join(self.directory, 'meta.json')).st_mtime_ns
+        except (OSError, TypeError):
+            return None
+
+    def sync(self, features):
+        """Modelo alineado con `features`; recarga si train_factors.py dejó uno nuevo. None si no hay"""
+        if features is None or len(features) == 0: return self.model
+        stamp = self._stamp()
+        if stamp is not None and stamp != self._loaded_stamp:
+            try:
+                self.trained, self.meta = FactorModel.load(self.directory)
+                print(f"📂 Factores cargados de disco: {len(self.trained)} títulos x {self.trained.dim}")
+            except Exception as e:
+                print(f"⚠️ No se pudo leer el modelo de factores: {e}")
+            # Un archivo ilegible no se reintenta hasta que cambie
+            self._loaded_stamp = stamp
+        if self.trained is None: return None
+        if self._aligned_for is None or self._aligned_for[0] is not features or self._aligned_for[1] is not self.trained:
+            self.model = self.trained.align(features.titles)
+            self._aligned_for = (features, self.trained)
+        return self.model
+
+    def on_snapshot(self, state):
+        self.sync(state.features)
+
+    def stats(self):
+        model = self.trained
+        return {
+            "directory": self.directory,
+            "loaded": model is not None,
+            "titles": len(model) if model is not None else 0,
+            "dim": model.dim if model is not None else None,
+            "aligned_rows": int(np.any(self.model.item_factors != 0, axis=1).sum()) if self.model is not None else 0,
+            "trained_at": self.meta.get('trained_at'),
+        }
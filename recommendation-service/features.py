@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""Codificación numérica del catálogo para puntuar contenido con operaciones vectorizadas.
+
+Géneros y directores se guardan como matrices multi-hot dispersas (películas x
+vocabulario) y el rating IMDb como un arreglo float32. Las filas siguen el orden
+del DataFrame de películas del snapshot.
+"""
+
+import numpy as np
+import scipy.sparse as sp
+
+def _multi_hot(lists):
+    """Convierte una secuencia de listas de etiquetas en (matriz CSR, vocabulario)"""
+    vocabulary = {}
+    indptr = [0]
+    indices = []
+    for items in lists:
+        row = set()
+        if isinstance(items, (list, tuple, np.ndarray)):
+            for item in items:
+                if item:
+                    row.add(vocabulary.setdefault(str(item).strip(), len(vocabulary)))
+        indices.extend(sorted(row))
+        indptr.append(len(indices))
+    matrix = sp.csr_matrix(
+        (np.ones(len(indices), dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+        shape=(len(lists), len(vocabulary)),
+    )
+    return matrix, vocabulary
+
+def _genre_lists(genres):
+    """Acepta la lista original de Mongo o el string 'A, B, C' ya formateado"""
+    return [g if isinstance(g, list) else (str(g).split(',') if isinstance(g, str) else []) for g in genres]
+
+class CatalogFeatures:
+    def __init__(self, titles, genres, genre_vocab, directors, director_vocab, imdb_rating):
+        self.titles = titles
+        self.genres = genres
+        self.genre_vocab = genre_vocab
+        self.directors = directors
+        self.director_vocab = director_vocab
+        self.imdb_rating = imdb_rating
+        self.row_of = {t: i for i, t in enumerate(titles)}
+        self._quality_rank = None
+
+    @classmethod
+    def from_movies(cls, movies):
+        genres, genre_vocab = _multi_hot(_genre_lists(movies['genres'] if 'genres' in movies.columns else [None] * len(movies)))
+        directors, director_vocab = _multi_hot(movies['directors'].tolist() if 'directors' in movies.columns else [None] * len(movies))
+        rating = movies['imdb_rating'].to_numpy(dtype=np.float32, na_value=np.nan) if 'imdb_rating' in movies.columns else np.full(len(movies), np.nan, dtype=np.float32)
+        return cls(
+            titles=movies['title_norm'].to_numpy(dtype=object),
+            genres=genres, genre_vocab=genre_vocab,
+            directors=directors, director_vocab=director_vocab,
+            imdb_rating=np.nan_to_num(rating, nan=5.0).astype(np.float32),
+        )
+
+    def __len__(self):
+        return len(self.titles)
+
+    def rows_for(self, titles):
+        """Fila de cada título normalizado (-1 si no está en el catálogo)"""
+        return np.fromiter((self.row_of.get(t, -1) for t in titles), dtype=np.int64, count=len(titles))
+
+    def _indicator(self, vocabulary, items):
+        vector = np.zeros(len(vocabulary), dtype=np.float32)
+        cols = [vocabulary[i] for i in items if i in vocabulary]
+        vector[cols] = 1.0
+        return vector
+
+    def genre_overlap(self, top_genres, rows=None):
+        """|géneros(película) ∩ top_genres| / |top_genres| para cada fila"""
+        matrix = self.genres if rows is None else self.genres[rows]
+        if not top_genres: return np.zeros(matrix.shape[0], dtype=np.float32)
+        return (matrix @ self._indicator(self.genre_vocab, top_genres)) / len(set(top_genres))
+
+    def director_match(self, top_directors, rows=None):
+        """1.0 si algún director de la película está en top_directors"""
+        matrix = self.directors if rows is None else self.directors[rows]
+        if not top_directors: return np.zeros(matrix.shape[0], dtype=np.float32)
+        return ((matrix @ self._indicator(self.director_vocab, top_directors)) > 0).astype(np.float32)
+
+    def quality(self, rows=None):
+        rating = self.imdb_rating if rows is None else self.imdb_rating[rows]
+        return rating / np.float32(10.0)
+
+    def quality_rank(self):
+        """Filas de mayor a menor rating, calculado una vez por catálogo (el cold start sólo lee el principio)"""
+        if self._quality_rank is None:
+            self._quality_rank = np.argsort(-self.imdb_rating, kind='stable')
+        return self._quality_rank
@@ -1,428 +1,725 @@
 # -*- coding: utf-8 -*-
 """Sistema de Recomendación - Microservicio FastAPI"""
 
+import time
+# Inicio del proceso, para medir el arranque en frío (imports incluidos)
+STARTED_AT = time.time()
+
 import pandas as pd
 import numpy as np
-from collections import Counter
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import linear_kernel
 from pymongo import MongoClient
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Response
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime, timezone
+import asyncio
 import json
 import os
+import threading
+from data import clean_float_values, prepare_movies, normalize_text
+from features import CatalogFeatures
+from social import RatingMatrix
+from scoring import (FINAL_COLUMNS, COLD_START_MIN_RATINGS, NEIGHBORS_MIN_RATINGS, POOL_SIZE, MIN_PLOT_CORPUS,
+                     build_taste_profile, mode_weights, blend, match_reasons, top_k)
+from ann import AnnIndexStore
+from factors import FactorModelStore
+from profiles import ProfileStore, event_stamp
+from cache import RecommendationCache
+from display import DisplayFields
+import metrics
+from metrics import span
+from store import PoolStore
+from batch import rank_profiles
+from serialization import RESPONSE_FORMATS, frame_to_records, parse_fields
+from workers import ScoringPool, QueueFullError
+from snapshot import CatalogSnapshot, MongoSource, EMPTY_STATE
+from shared import SharedCatalog, SharedCatalogReader, SharedState, StaleVersionError, load_artifact
+from plot_index import PlotIndex, PlotIndexStore
 import warnings
 warnings.filterwarnings('ignore')
 
 app = FastAPI()
+# Respuestas comprimidas para los clientes que envían Accept-Encoding: gzip
+app.add_middleware(GZipMiddleware, minimum_size=1000)
 
 # Configuración MongoDB
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://mongodb:27017")
-MONGO_DB = "movies_db"
-MONGO_INTERACTIONS_DB = "opiniones_db"
-
-try:
-    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
-    client.admin.command('ping')
-    print("✅ Conexión a MongoDB exitosa")
-except Exception as e:
-    print(f"❌ Error al conectar con MongoDB: {e}")
-
-# --- FUNCIONES DE CARGA DE DATOS ---
-
-def normalize_text(text):
-    """Función auxiliar para normalizar títulos"""
-    if pd.isna(text): return ""
-    return str(text).lower().strip()
-
-def load_movies_from_mongodb():
-    try:
-        db = client[MONGO_DB]
-        movies_collection = db['movies']
-        movies_data = list(movies_collection.find({}))
-        df = pd.DataFrame(movies_data)
-        
-        if not df.empty and 'title' in df.columns:
-            # Estandarizamos: 'title_norm'
-            df['title_norm'] = df['title'].apply(normalize_text)
-            df = df.drop_duplicates(subset=['title_norm'], keep='first')
-        
-        return df
-    except Exception as e:
-        print(f"Error al cargar películas: {e}")
-        return pd.DataFrame()
-
-def load_interactions_from_mongodb():
-    try:
-        db = client[MONGO_INTERACTIONS_DB]
-        interactions_collection = db['interactions']
-        interactions_data = list(interactions_collection.find({}))
-        df = pd.DataFrame(interactions_data)
-        
-        # Normalizar título en interacciones
-        if not df.empty:
-            # Buscamos la columna de título disponible
-            col_title = 'movie_title' if 'movie_title' in df.columns else 'title'
-            
-            if col_title in df.columns:
-                # CAMBIO: Usamos el mismo nombre 'title_norm' que en movies
-                df['title_norm'] = df[col_title].apply(normalize_text)
-
-        if not df.empty and 'user_id' in df.columns and 'profile_name' in df.columns and 'title_norm' in df.columns:
-            if 'timestamp' in df.columns:
-                df = df.sort_values('timestamp', ascending=False)
-            # Deduplicar usando el título normalizado
-            df = df.drop_duplicates(subset=['user_id', 'profile_name', 'title_norm'], keep='first')
-        
-        return df
-    except Exception as e:
-        print(f"Error al cargar interacciones: {e}")
-        return pd.DataFrame()
-
-def extract_rating_value(rating_data):
-    if isinstance(rating_data, dict):
-        if '$numberDouble' in rating_data:
-            try: return float(rating_data['$numberDouble'])
-            except: return None
-    elif isinstance(rating_data, (int, float)): return float(rating_data)
-    elif isinstance(rating_data, str):
-        try: return float(rating_data)
-        except: return None
-    return None
-
-def format_genres(genres_data):
-    if isinstance(genres_data, list): return ', '.join(g for g in genres_data if g)
-    elif isinstance(genres_data, str): return genres_data
-    return None
-
-def clean_float_values(df):
-    df_clean = df.copy()
-    for col in df_clean.columns:
-        if df_clean[col].dtype in ['float64', 'float32']:
-            df_clean[col] = df_clean[col].replace([np.inf, -np.inf], np.nan).fillna(0.0)
-    return df_clean
-
-def prepare_data(dfmovies, dfopiniones):
-    # Preparar Movies
-    dfmovies['movie_id_str'] = dfmovies['_id'].apply(lambda x: str(x['$oid']) if isinstance(x, dict) and '$oid' in x else str(x))
-    dfmovies['imdb_rating'] = dfmovies['imdb'].apply(lambda x: extract_rating_value(x.get('rating')) if isinstance(x, dict) else None)
-    dfmovies['formatted_genres'] = dfmovies['genres'].apply(format_genres)
-    dfmovies['plot'] = dfmovies['plot'].fillna('')
-    dfmovies['directors'] = dfmovies['directors'].apply(lambda x: x if isinstance(x, list) else [])
-    
-    if 'title_norm' not in dfmovies.columns:
-        dfmovies['title_norm'] = dfmovies['title'].apply(normalize_text)
 
-    if dfopiniones.empty:
-        return pd.DataFrame(columns=['user_id', 'profile_name', 'movie_title', 'user_score', 'average_imdb_rating', 'movie_id_str', 'genres', 'poster', 'plot', 'fullplot', 'cast', 'directors', 'writers'])
-    
-    # Asegurar title_norm en opiniones
-    if 'title_norm' not in dfopiniones.columns:
-        col_title = 'movie_title' if 'movie_title' in dfopiniones.columns else 'title'
-        if col_title in dfopiniones.columns:
-            dfopiniones['title_norm'] = dfopiniones[col_title].apply(normalize_text)
-        else:
-            return pd.DataFrame()
-
-    merged = pd.merge(
-        dfopiniones,
-        dfmovies[['title_norm', 'title', 'movie_id_str', 'imdb_rating', 'formatted_genres', 'poster', 'plot', 'fullplot', 'cast', 'directors', 'writers']],
-        on='title_norm',
-        how='inner',
-        suffixes=('_opin', '')
+# El cliente conecta recién con la primera operación: el ping va en segundo plano (warm_up)
+client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+
+# --- SNAPSHOT DE DATOS ---
+# El catálogo y las interacciones se cargan una vez y se refrescan en segundo plano
+snapshot = CatalogSnapshot(
+    MongoSource(client),
+    refresh_interval=float(os.getenv("SNAPSHOT_REFRESH_SECONDS", "30")),
+    full_resync_interval=float(os.getenv("SNAPSHOT_FULL_RESYNC_SECONDS", "3600")),
+)
+metrics.watch_snapshot(snapshot)
+
+# Poster, elenco, sinopsis completa, etc.: se piden sólo para las películas devueltas
+display_fields = DisplayFields(snapshot, max_entries=int(os.getenv("DISPLAY_CACHE_ENTRIES", "20000")))
+snapshot.add_listener(display_fields.on_snapshot)
+
+# Índice TF-IDF de tramas: se ajusta una vez y sólo recalcula las filas que cambiaron
+plot_index_store = PlotIndexStore(
+    os.getenv("PLOT_INDEX_DIR", "/app/artifacts/plot_index"),
+    max_features=int(os.getenv("PLOT_INDEX_MAX_FEATURES", "2000")),
+)
+snapshot.add_listener(plot_index_store.on_snapshot)
+
+# Modo ANN (opcional): preselecciona candidatos con un índice IVF antes de la fórmula ponderada
+ANN_MODE = os.getenv("ANN_MODE", "0") == "1"
+ANN_CANDIDATES = int(os.getenv("ANN_CANDIDATES", "500"))
+ANN_NPROBE = int(os.getenv("ANN_NPROBE", "16"))
+ann_index_store = AnnIndexStore(os.getenv("ANN_INDEX_DIR", "/app/artifacts/ann_index"), plot_index_store)
+if ANN_MODE:
+    snapshot.add_listener(ann_index_store.on_snapshot)
+
+# Término colaborativo por factores latentes (modelo que entrena train_factors.py):
+# neighbors = sólo vecinos (comportamiento original), factors = sólo factores (sin búsqueda de vecinos),
+# hybrid = vecinos cuando los hay y factores para el resto de los perfiles con 10+ calificaciones
+COLLAB_MODEL = os.getenv("COLLAB_MODEL", "hybrid")
+factor_store = FactorModelStore(os.getenv("FACTORS_DIR", "/app/artifacts/factors"))
+snapshot.add_listener(factor_store.on_snapshot)
+
+# Cache del pool puntuado por perfil (se invalida con calificaciones nuevas vía hook o polling del snapshot)
+recommendation_cache = RecommendationCache(
+    ttl_seconds=float(os.getenv("RECS_CACHE_TTL_SECONDS", "300")),
+    max_bytes=int(os.getenv("RECS_CACHE_MAX_MB", "64")) * 1024 * 1024,
+)
+snapshot.add_listener(recommendation_cache.on_snapshot)
+
+# Pools precalculados (job precompute.py y endpoint batch) que el endpoint online sirve directo
+pool_store = PoolStore(
+    os.getenv("RECS_STORE_PATH", "/app/artifacts/recommendations.sqlite"),
+    max_age_seconds=float(os.getenv("RECS_STORE_MAX_AGE_SECONDS", "86400")),
+)
+snapshot.add_listener(pool_store.on_snapshot)
+BATCH_MAX_PROFILES = int(os.getenv("BATCH_MAX_PROFILES", "1000"))
+
+# Historial del perfil leído por agregación en Mongo (índice por perfil) en vez de filtrar la tabla completa;
+# con HISTORY_FROM_MONGO=0 se vuelve a filtrar el snapshot
+HISTORY_FROM_MONGO = os.getenv("HISTORY_FROM_MONGO", "1") == "1"
+
+def profile_history(email, profile_name, state):
+    """Historial del perfil cruzado con el catálogo: agregación en Mongo o, si no responde, filtro del snapshot"""
+    history = snapshot.user_history(email, profile_name, state) if HISTORY_FROM_MONGO else None
+    if history is None and not state.table.empty:
+        table = state.table
+        history = table[(table['user_id'] == email) & (table['profile_name'] == profile_name)]
+    return history
+
+# Perfiles de gusto incrementales (profiles.py): el request lee el perfil ya armado en vez de recorrer
+# el historial; se actualizan con cada calificación (refresco del snapshot y POST /interactions)
+INCREMENTAL_PROFILES = os.getenv("INCREMENTAL_PROFILES", "1") == "1"
+profile_store = ProfileStore(profile_history, max_profiles=int(os.getenv("PROFILE_STORE_MAX_PROFILES", "50000")))
+snapshot.add_listener(profile_store.on_snapshot)
+
+# Pool de puntaje: hilos por defecto, procesos con SCORING_EXECUTOR=process (cada worker arranca con la
+# copia del snapshot heredada del padre) o SCORING_EXECUTOR=shared (procesos creados antes de la carga).
+# En los dos modos de proceso sólo el padre sigue a Mongo y corre los listeners (caches, SQLite, perfiles,
+# índices en disco); los workers pasan a la versión que publica el padre en el catálogo compartido (mmap)
+SCORING_EXECUTOR = os.getenv("SCORING_EXECUTOR", "thread")
+SHARED_CATALOG = SCORING_EXECUTOR == "shared"
+PUBLISH_CATALOG = SCORING_EXECUTOR in ("process", "shared")
+shared_catalog = None
+shared_reader = None
+# Versión publicada cuando se creó el worker: es la misma que la copia heredada del snapshot
+inherited_catalog = None
+if PUBLISH_CATALOG:
+    shared_catalog = SharedCatalog(
+        os.getenv("SHARED_CATALOG_DIR", "/app/artifacts/shared_catalog"),
+        keep=int(os.getenv("SHARED_CATALOG_KEEP", "2")),
     )
-    
-    merged['movie_title'] = merged['title']
-    merged = merged.rename(columns={'score': 'user_score', 'formatted_genres': 'genres'})
-    merged = merged.loc[:, ~merged.columns.duplicated()]
-    
-    return merged
-
-def recommend_movies(df_interactions, df_movies_metadata, target_user_email, target_profile_name):
+    # Después de los índices de tramas y ANN, para publicarlos ya sincronizados con el estado
+    snapshot.add_listener(lambda state: shared_catalog.on_snapshot(
+        state, plot_index_store.index, ann_index_store.index if ANN_MODE else None))
+
+def warm_imports():
+    """scikit-learn (TF-IDF del perfil) se importa en segundo plano para que no lo pague el primer request"""
+    import sklearn.feature_extraction.text, sklearn.preprocessing  # noqa: F401
+
+def _init_scoring_worker():
+    """Cada worker de proceso sigue la versión del catálogo compartido que publica el padre.
+    No sondea Mongo ni corre listeners: eso lo hace sólo el padre"""
+    global shared_reader, inherited_catalog
+    threading.Thread(target=warm_imports, name="warm-imports", daemon=True).start()
+    shared_reader = SharedCatalogReader(shared_catalog.directory)
+    # Modo process: hasta que cambie la versión se puntúa con la copia heredada, sin leer disco
+    inherited_catalog = shared_catalog.version
+
+SCORING_WORKERS = int(os.getenv("SCORING_WORKERS", str(os.cpu_count() or 2)))
+scoring_pool = ScoringPool(
+    kind="process" if SHARED_CATALOG else SCORING_EXECUTOR,
+    workers=SCORING_WORKERS,
+    concurrency=int(os.getenv("SCORING_CONCURRENCY", str(SCORING_WORKERS))),
+    queue_limit=int(os.getenv("SCORING_QUEUE_LIMIT", "32")),
+    initializer=_init_scoring_worker,
+)
+
+def get_snapshot_state():
+    """Devuelve el estado actual del snapshot, cargándolo si todavía no existe"""
+    if shared_reader is not None:
+        # Worker de proceso: la versión vigente del catálogo compartido (la carga la hace el padre)
+        published = shared_reader.current()
+        if published is None or published.name == inherited_catalog: return snapshot.state
+        return published
+    state = snapshot.state
+    if not state.loaded:
+        try:
+            state = snapshot.ensure_loaded()
+        except Exception as e:
+            print(f"Error al cargar el snapshot: {e}")
+    return state
+
+def rank_movies(df_interactions, df_movies_metadata, target_user_email, target_profile_name, plot_index=None, features=None, ratings=None, ann_index=None, user_history=None, factors=None, use_neighbors=True, profile_view=None):
+    """Puntúa el catálogo para un perfil y devuelve (pool con los 50 mejores, etiqueta del modo).
+    Con `user_history` (ya cruzado con el catálogo) no se filtra `df_interactions` para buscarlo,
+    y con `profile_view` (perfil incremental, profiles.py) no se recorre ningún historial.
+    Con `factors` (modelo alineado con `features`) el término social de los perfiles sin vecinos
+    sale de los factores latentes; con use_neighbors=False no se buscan vecinos.
+
+    Los puntajes se calculan sobre arreglos indexados por fila del catálogo y sólo las 50
+    elegidas (np.argpartition) se copian del DataFrame de películas."""
     
     # 1. Preparar Metadata
-    movies_df_processed = df_movies_metadata.copy()
-    
-    if 'title_norm' not in movies_df_processed.columns:
-        movies_df_processed['title_norm'] = movies_df_processed['title'].apply(normalize_text)
-    
-    if 'movie_id_str' not in movies_df_processed.columns:
-        movies_df_processed['movie_id_str'] = movies_df_processed['_id'].apply(lambda x: str(x['$oid']) if isinstance(x, dict) and '$oid' in x else str(x))
-    
-    if 'imdb_rating' not in movies_df_processed.columns:
-        movies_df_processed['imdb_rating'] = movies_df_processed['imdb'].apply(lambda x: extract_rating_value(x.get('rating')) if isinstance(x, dict) else None)
-    movies_df_processed['imdb_rating'] = movies_df_processed['imdb_rating'].fillna(5.0)
+    movies = df_movies_metadata
+    if 'movie_id_str' not in movies.columns:
+        # DataFrame crudo (fuera del snapshot): se prepara una copia
+        movies = prepare_movies(movies.copy())
 
-    if 'formatted_genres' not in movies_df_processed.columns:
-        movies_df_processed['formatted_genres'] = movies_df_processed['genres'].apply(format_genres)
-        
-    movies_df_processed['plot'] = movies_df_processed['plot'].fillna('')
-    movies_df_processed['directors'] = movies_df_processed['directors'].apply(lambda x: x if isinstance(x, list) else [])
+    # Géneros, directores y rating codificados como arreglos (una vez por snapshot)
+    if features is None or len(features) != len(movies):
+        features = CatalogFeatures.from_movies(movies)
 
     # 2. Filtrar Historial Usuario
-    seen_titles_norm = set()
-    
-    if df_interactions.empty:
-        user_history = pd.DataFrame()
+    if profile_view is not None:
+        # Perfil ya armado: títulos vistos, notas y gustos sin pasar por un DataFrame
+        seen_titles_norm = set(profile_view.titles)
+        num_ratings = profile_view.num_ratings
     else:
-        user_id_col = 'user_id'
-        profile_col = 'profile_name'
-        
-        user_history = df_interactions[
-            (df_interactions[user_id_col] == target_user_email) &
-            (df_interactions[profile_col] == target_profile_name)
-        ].copy().reset_index(drop=True)
+        with span("history"):
+            seen_titles_norm = set()
         
-        if not user_history.empty:
-            # Si prepare_data funcionó, user_history ya tiene 'title_norm'
-            if 'title_norm' in user_history.columns:
-                seen_titles_norm = set(user_history['title_norm'].dropna().unique())
+            if user_history is not None:
+                user_history = user_history.reset_index(drop=True)
+            elif df_interactions.empty:
+                user_history = pd.DataFrame()
+            else:
+                user_id_col = 'user_id'
+                profile_col = 'profile_name'
             
-            print(f"🎬 Películas vistas (títulos normalizados): {len(seen_titles_norm)}")
-
-    final_columns = [
-        'movie_id_str', 'title', 'poster', 'plot', 'fullplot', 'cast', 'directors',
-        'writers', 'formatted_genres', 'imdb_rating', 'year', 'runtime', 'genres', 'imdb',
-        'predicted_score', 'match_reason', 'social_score_A', 'quality_score_B', 'bonus_score_C'
-    ]
+                user_history = df_interactions[
+                    (df_interactions[user_id_col] == target_user_email) &
+                    (df_interactions[profile_col] == target_profile_name)
+                ].reset_index(drop=True)
+            
+            if not user_history.empty:
+                # Si prepare_data funcionó, user_history ya tiene 'title_norm'
+                if 'title_norm' in user_history.columns:
+                    seen_titles_norm = set(user_history['title_norm'].dropna().unique())
+            
+                print(f"🎬 Películas vistas (títulos normalizados): {len(seen_titles_norm)}")
 
-    num_ratings = len(user_history)
+        num_ratings = len(user_history)
     print(f"📊 Usuario: {target_user_email} | Calificaciones: {num_ratings}")
 
+    seen_rows = features.rows_for(list(seen_titles_norm))
+    seen_rows = seen_rows[seen_rows >= 0]
+
     # --- FASE 1: COLD START ---
-    if num_ratings < 10:
+    if num_ratings < COLD_START_MIN_RATINGS:
         print(f"❄️ Modo Cold Start.")
         
-        unseen_movies_df = movies_df_processed[
-            ~movies_df_processed['title_norm'].isin(seen_titles_norm)
-        ].copy()
-        
-        unseen_movies_df['predicted_score'] = unseen_movies_df['imdb_rating'] / 10.0
-        unseen_movies_df['predicted_score'] = unseen_movies_df['predicted_score'].fillna(0.5)
-        unseen_movies_df['match_reason'] = 'Tendencia Global'
-        
-        recommendations = unseen_movies_df.sort_values(by='predicted_score', ascending=False)
-        
-        available_cols = [col for col in final_columns if col in recommendations.columns]
-        recommendations = recommendations.drop_duplicates(subset=['title_norm'], keep='first')
-        
-        top_50_pool = recommendations[available_cols].head(50)
-        result = top_50_pool.sample(n=min(12, len(top_50_pool))) if not top_50_pool.empty else top_50_pool
-        
-        result = clean_float_values(result)
-        if 'imdb' in result.columns: result['imdb'] = result['imdb'].apply(lambda x: str(x) if x is not None else None)
-        return result
+        with span("cold_start"):
+            # Ranking global por rating precalculado: alcanza con los primeros 50 + vistas
+            head = features.quality_rank()[:POOL_SIZE + len(seen_rows)]
+            top = head[~np.isin(head, seen_rows)][:POOL_SIZE]
+
+            pool = movies.iloc[top].copy()
+            pool['imdb_rating'] = pool['imdb_rating'].fillna(5.0)
+            pool['predicted_score'] = pool['imdb_rating'] / 10.0
+            pool['match_reason'] = 'Tendencia Global'
+            return pool[[c for c in FINAL_COLUMNS if c in pool.columns]], "Cold Start"
     
     # --- MODOS AVANZADOS ---
     
-    score_col = 'user_score' if 'user_score' in user_history.columns else 'score'
-    genres_col = 'genres' if 'genres' in user_history.columns else 'formatted_genres'
-    
-    # 1. Perfil Géneros
-    liked_movies = user_history[user_history[score_col] >= 7].copy()
-    favorite_genres_list = []
-    for genres_str in liked_movies[genres_col].dropna():
-        favorite_genres_list.extend([genre.strip() for genre in str(genres_str).split(',') if genre.strip()])
-    top_genres = [g[0] for g in Counter(favorite_genres_list).most_common(5)] if favorite_genres_list else []
+    with span("taste_profile"):
+        taste = profile_view.taste if profile_view is not None else build_taste_profile(user_history)
+        top_genres, top_directors, user_plot_corpus = taste.top_genres, taste.top_directors, taste.plot_corpus
     print(f"❤️ Géneros favoritos: {top_genres}")
-
-    # 2. Perfil Directores
-    directors_list = []
-    if 'directors' in liked_movies.columns:
-        for d_list in liked_movies['directors']:
-            if isinstance(d_list, list): directors_list.extend(d_list)
-    top_directors = [d[0] for d in Counter(directors_list).most_common(3)] if directors_list else []
     print(f"🎬 Directores favoritos: {top_directors}")
-
-    # 3. Perfil Trama
-    loved_movies = user_history[user_history[score_col] >= 8]
-    user_plot_corpus = " ".join(loved_movies['plot'].astype(str).tolist()) if 'plot' in loved_movies.columns else ""
-    
-    # --- CANDIDATOS ---
-    candidates = movies_df_processed[
-        ~movies_df_processed['title_norm'].isin(seen_titles_norm)
-    ].copy()
-    candidates['formatted_genres'] = candidates['formatted_genres'].fillna('')
     
     # --- BÚSQUEDA DE VECINOS ---
-    candidates['score_social'] = 0.0
+    social_scores = None
     has_enough_neighbors = False
     
-    if not df_interactions.empty and num_ratings >= 30:
-        if 'title_norm' in user_history.columns:
-            user_rated = user_history[['title_norm', score_col]].copy()
-            user_rated.columns = ['join_title', 'target_user_score']
-            
-            other_users = df_interactions[~((df_interactions['user_id'] == target_user_email) & (df_interactions['profile_name'] == target_profile_name))].copy()
-            
-            if not other_users.empty:
-                # Asegurar title_norm en others
-                if 'title_norm' not in other_users.columns:
-                     col_orig = 'movie_title' if 'movie_title' in other_users.columns else 'title'
-                     if col_orig in other_users.columns:
-                         other_users['title_norm'] = other_users[col_orig].apply(normalize_text)
-                
-                if 'title_norm' in other_users.columns:
-                    other_score_col = 'user_score' if 'user_score' in other_users.columns else 'score'
-                    
-                    # Merge limpio por 'title_norm'
-                    shared = pd.merge(
-                        user_rated,
-                        other_users[['title_norm', 'user_id', 'profile_name', other_score_col]],
-                        left_on='join_title', right_on='title_norm',
-                        how='inner'
-                    )
-                    
-                    if not shared.empty:
-                        shared['diff'] = abs(shared['target_user_score'] - shared[other_score_col])
-                        
-                        potential = shared[shared['diff'] <= 1]
-                        counts = potential.groupby(['user_id', 'profile_name']).size().reset_index(name='count')
-                        real_neighbors = counts[counts['count'] >= 5]
-                        
-                        if not real_neighbors.empty:
-                            has_enough_neighbors = True
-                            print(f"🤝 Vecinos encontrados: {len(real_neighbors)}")
-                            
-                            df_interactions['uid_pid'] = df_interactions['user_id'] + '_' + df_interactions['profile_name']
-                            real_neighbors['uid_pid'] = real_neighbors['user_id'] + '_' + real_neighbors['profile_name']
-                            
-                            neighbor_data = df_interactions[df_interactions['uid_pid'].isin(real_neighbors['uid_pid'])].copy()
-                            
-                            if 'title_norm' not in neighbor_data.columns:
-                                 # Regenerar si se perdió en la copia
-                                 col_orig = 'movie_title' if 'movie_title' in neighbor_data.columns else 'title'
-                                 neighbor_data['title_norm'] = neighbor_data[col_orig].apply(normalize_text)
-
-                            neighbor_good = neighbor_data[
-                                (~neighbor_data['title_norm'].isin(seen_titles_norm)) & 
-                                (neighbor_data[other_score_col] >= 6)
-                            ]
-                            
-                            # Groupby por title_norm
-                            social_scores = neighbor_good.groupby('title_norm')[other_score_col].mean().reset_index()
-                            social_scores.columns = ['title_norm', 'social_score_A']
-                            
-                            # Merge final con candidatos
-                            candidates = pd.merge(candidates, social_scores, on='title_norm', how='left')
-                            candidates['score_social'] = candidates['social_score_A'].fillna(0.0) / 10.0 
-
-    # --- SCORES CONTENIDO ---
+    if use_neighbors and (ratings is not None or not df_interactions.empty) and num_ratings >= NEIGHBORS_MIN_RATINGS:
+        with span("neighbors"):
+            if ratings is None:
+                ratings = RatingMatrix.from_table(df_interactions)
+        
+            # Vecinos: coinciden a ±1 punto en al menos 5 títulos (operaciones sobre la matriz dispersa)
+            neighbor_rows = ratings.neighbors(target_user_email, target_profile_name, tolerance=1, min_shared=5)
+        
+            if len(neighbor_rows) > 0:
+                has_enough_neighbors = True
+                print(f"🤝 Vecinos encontrados: {len(neighbor_rows)}")
+                social_scores = ratings.social_scores(neighbor_rows, min_score=6)
+
+    # --- FACTORES LATENTES ---
+    affinity = None
+    if factors is not None and not has_enough_neighbors and len(factors) == len(features):
+        with span("factors"):
+            # Vector del perfil desde su historial (fold-in): no hace falta que esté en el modelo
+            if profile_view is not None:
+                titles, scores = profile_view.titles, profile_view.scores
+            else:
+                score_col = 'user_score' if 'user_score' in user_history.columns else 'score'
+                titles = user_history['title_norm'].tolist()
+                scores = user_history[score_col].to_numpy(dtype=np.float32, na_value=np.nan)
+            profile_vector = factors.fold_in(features.rows_for(titles), scores)
+            # Preferencia estimada de todo el catálogo: un producto matriz-vector
+            affinity = factors.scores(profile_vector)
+            print(f"🧬 Término colaborativo por factores latentes ({factors.dim} dimensiones)")
+    has_factors = affinity is not None
+
+    # --- CANDIDATOS ---
+    unseen_mask = np.ones(len(features), dtype=bool)
+    unseen_mask[seen_rows] = False
+
+    social_raw = None
+    if social_scores is not None:
+        # Promedio de los vecinos por fila del catálogo (NaN donde ningún vecino la calificó)
+        social_rows = features.rows_for(social_scores.index)
+        social_raw = np.full(len(features), np.nan)
+        social_raw[social_rows[social_rows >= 0]] = social_scores.to_numpy()[social_rows >= 0]
+    
+    if ann_index is not None and len(ann_index) == len(features):
+        # Modo ANN: sólo se puntúan los vecinos aproximados del perfil, los mejores por calidad
+        # y los títulos que aportan los vecinos sociales
+        with span("ann_candidates"):
+            liked_rows = features.rows_for(taste.liked_titles)
+            query = ann_index.profile(liked_rows[liked_rows >= 0])
+            # Peso relativo calidad/contenido según el modo que se va a aplicar
+            _, w_content, w_quality, _ = mode_weights(has_enough_neighbors, has_factors)
+            quality_weight = w_quality / w_content
+            pool_rows = ann_index.candidates(query, k=ANN_CANDIDATES, nprobe=ANN_NPROBE, quality_weight=quality_weight)
+            if social_scores is not None:
+                pool_rows = np.union1d(pool_rows, social_rows[social_rows >= 0])
+            if has_factors:
+                # Los títulos que más le gustarían según los factores también entran como candidatos
+                pool_rows = np.union1d(pool_rows, top_k(affinity, ANN_CANDIDATES))
+            in_pool = np.zeros(len(unseen_mask), dtype=bool)
+            in_pool[pool_rows] = True
+            unseen_mask &= in_pool
     
-    # Género
-    def calc_genre_sim(g_str):
-        if not isinstance(g_str, str): return 0.0
-        movie_g = set([x.strip() for x in g_str.split(',')])
-        user_g = set(top_genres)
-        if not user_g: return 0.0
-        return len(movie_g.intersection(user_g)) / len(user_g)
-    candidates['score_genre'] = candidates['formatted_genres'].apply(calc_genre_sim)
-
-    # Director
-    candidates['score_director'] = candidates['directors'].apply(lambda x: 1.0 if any(d in top_directors for d in x) else 0.0)
+    with span("content_scores"):
+        candidate_rows = np.flatnonzero(unseen_mask)
+    
+        score_social = np.zeros(len(candidate_rows))
+        if social_raw is not None:
+            score_social = np.nan_to_num(social_raw[candidate_rows], nan=0.0) / 10.0
+        elif has_factors:
+            score_social = affinity[candidate_rows]
+
+        # --- SCORES CONTENIDO ---
+    
+        # Género y director: productos dispersos contra los vectores del perfil
+        score_genre = features.genre_overlap(top_genres, candidate_rows)
+        score_director = features.director_match(top_directors, candidate_rows)
 
     # Plot
-    candidates['score_plot'] = 0.0
-    if user_plot_corpus and len(user_plot_corpus) > 50:
-        try:
-            tfidf = TfidfVectorizer(stop_words='english', max_features=2000)
-            corpus = [user_plot_corpus] + candidates['plot'].tolist()
-            matrix = tfidf.fit_transform(corpus)
-            sims = linear_kernel(matrix[0:1], matrix[1:]).flatten()
-            candidates['score_plot'] = sims
-        except: pass
+    with span("tf_idf"):
+        score_plot = np.zeros(len(candidate_rows))
+        if user_plot_corpus and len(user_plot_corpus) > MIN_PLOT_CORPUS:
+            try:
+                if plot_index is None:
+                    # Sin índice precalculado se ajusta uno sobre los candidatos (comportamiento original)
+                    candidate_titles = features.titles[candidate_rows]
+                    plot_index = PlotIndex.fit(candidate_titles.tolist(), movies['plot'].to_numpy()[candidate_rows].tolist())
+                    rows = np.arange(len(candidate_rows))
+                else:
+                    rows = plot_index.catalog_rows(features)[candidate_rows]
+                sims = plot_index.scores(user_plot_corpus)
+                score_plot = np.where(rows >= 0, sims[rows], 0.0)
+            except: pass
 
     # Calidad
-    candidates['score_quality'] = candidates['imdb_rating'].fillna(5.0) / 10.0
+    score_quality = features.quality(candidate_rows)
 
     # --- FÓRMULA FINAL ---
     
-    if has_enough_neighbors:
-        w_social, w_content, w_quality = 0.8, 0.15, 0.05
-        mode_label = "Tu Comunidad"
-    else:
-        w_social, w_content, w_quality = 0.0, 0.7, 0.3
-        mode_label = "Tus Gustos"
-
-    w_gen, w_dir, w_plt = 0.3, 0.2, 0.5
-
-    candidates['content_score'] = (
-        (candidates['score_genre'] * w_gen) +
-        (candidates['score_director'] * w_dir) +
-        (candidates['score_plot'] * w_plt)
-    )
+    with span("scoring"):
+        _, _, _, mode_label = mode_weights(has_enough_neighbors, has_factors)
+        predicted = np.asarray(blend(score_social, score_genre, score_director, score_plot, score_quality,
+                                     has_enough_neighbors, has_factors), dtype=np.float64)
+        predicted[~np.isfinite(predicted)] = 0.0
+
+        # --- RETORNO ---
+        # Top 50 sin ordenar todos los candidatos; los motivos y la copia de filas, sólo para esos
+        top = top_k(predicted, POOL_SIZE)
+        rows = candidate_rows[top]
+        pool = movies.iloc[rows].copy()
+        pool['imdb_rating'] = pool['imdb_rating'].fillna(5.0)
+        pool['formatted_genres'] = pool['formatted_genres'].fillna('')
+        pool['predicted_score'] = predicted[top]
+        pool['match_reason'] = match_reasons(score_social[top], score_director[top], score_plot[top], score_genre[top], mode_label)
+        if social_raw is not None: pool['social_score_A'] = social_raw[rows]
+        pool = clean_float_values(pool)
     
-    candidates['predicted_score'] = (
-        (candidates['score_social'] * w_social) +
-        (candidates['content_score'] * w_content) +
-        (candidates['score_quality'] * w_quality)
-    )
+    top_50_pool = pool[[c for c in FINAL_COLUMNS if c in pool.columns]]
+    return top_50_pool, mode_label
 
-    conditions = [
-        (candidates['score_social'] > 0.7, 'Tu comunidad la recomienda'),
-        (candidates['score_director'] > 0, 'De tu director favorito'),
-        (candidates['score_plot'] > 0.15, 'Trama similar a lo que ves'),
-        (candidates['score_genre'] > 0.5, 'De tus géneros top')
-    ]
-    candidates['match_reason'] = np.select([c[0] for c in conditions], [c[1] for c in conditions], default=f'Basado en {mode_label}')
-
-    # --- RETORNO ---
-    candidates = clean_float_values(candidates)
-    recommendations = candidates.sort_values(by='predicted_score', ascending=False)
-    
-    available_cols = [c for c in final_columns if c in recommendations.columns]
-    
-    # Deduplicar por título normalizado
-    recommendations = recommendations.drop_duplicates(subset=['title_norm'], keep='first')
-    
-    top_50_pool = recommendations[available_cols].head(50)
-    result = top_50_pool.sample(n=min(12, len(top_50_pool))) if not top_50_pool.empty else top_50_pool
-    
-    if len(result) < 12:
-        remaining = recommendations[~recommendations['title_norm'].isin(result['title_norm'])][available_cols]
-        result = pd.concat([result, remaining.head(12 - len(result))], ignore_index=True)
-        
-    result = clean_float_values(result)
+def draw_sample(top_50_pool, n=12):
+    """Elige `n` películas al azar dentro del pool (dinamismo entre requests)"""
+    return top_50_pool.sample(n=min(n, len(top_50_pool))) if not top_50_pool.empty else top_50_pool
+
+def sample_recommendations(top_50_pool, n=12):
+    result = clean_float_values(draw_sample(top_50_pool, n))
     if 'imdb' in result.columns: result['imdb'] = result['imdb'].apply(lambda x: str(x) if x is not None else None)
-    
-    print(f"✅ Recomendaciones generadas. Modo: {mode_label}")
+    return result
+
+def recommend_movies(df_interactions, df_movies_metadata, target_user_email, target_profile_name, **indexes):
+    top_50_pool, mode_label = rank_movies(df_interactions, df_movies_metadata, target_user_email, target_profile_name, **indexes)
+    result = sample_recommendations(top_50_pool)
+    if mode_label != "Cold Start":
+        print(f"✅ Recomendaciones generadas. Modo: {mode_label}")
     return result
 
 # --- ENDPOINTS ---
 
+def scoring_indexes(state):
+    """(índice de tramas, índice ANN, factores alineados) con los que se puntúa `state`"""
+    # Los factores se abren con mmap del directorio del modelo: en modo shared todos los workers comparten las páginas
+    factors = factor_store.sync(state.features) if COLLAB_MODEL != "neighbors" else None
+    if isinstance(state, SharedState):
+        # Los de la versión publicada, abiertos con mmap junto con el resto del catálogo
+        return state.plot_index, state.ann_index if ANN_MODE else None, factors
+    return plot_index_store.index, ann_index_store.index if ANN_MODE else None, factors
+
+def rank_profile(state, email, profile_name, profile_view=None):
+    """rank_movies sobre el snapshot, con el perfil incremental o, sin él, con el historial
+    del perfil pedido a Mongo por agregación"""
+    user_history = None
+    if HISTORY_FROM_MONGO and profile_view is None:
+        with span("history_fetch"):
+            user_history = snapshot.user_history(email, profile_name, state)
+    plot_index, ann_index, factors = scoring_indexes(state)
+    # En modo shared la tabla sólo se lee si hace falta filtrar el historial
+    table = state.table if user_history is None and profile_view is None else pd.DataFrame()
+    return rank_movies(table, state.movies, email, profile_name,
+                       plot_index=plot_index, features=state.features, ratings=state.ratings,
+                       ann_index=ann_index, user_history=user_history,
+                       factors=factors, use_neighbors=COLLAB_MODEL != "factors", profile_view=profile_view)
+
+def on_current_state(score):
+    """Corre `score(state)` sobre el snapshot vigente. En un worker de proceso, si la versión publicada
+    se borró mientras se leía su tabla, reintenta una vez con la que apunta CURRENT ahora"""
+    state = get_snapshot_state()
+    if not state.loaded: return None, ()
+    try:
+        return score(state)
+    except StaleVersionError as e:
+        print(f"⚠️ {e}; se reintenta con la versión vigente")
+        return score(get_snapshot_state())
+
+def score_profile(email, profile_name, profile_view=None):
+    """Puntaje completo de un perfil; corre dentro del pool de trabajo (hilo o proceso).
+    Devuelve (pool y modo, tramos de tiempo por fase)"""
+    return on_current_state(lambda state: metrics.traced(
+        "recommendations", rank_profile, state, email, profile_name, profile_view))
+
+def score_batch(profiles):
+    """Puntaje de muchos perfiles sobre el mismo snapshot; corre dentro del pool de trabajo"""
+    def score(state):
+        plot_index, _, factors = scoring_indexes(state)
+        return metrics.traced("batch", rank_profiles, state, profiles, plot_index=plot_index,
+                              factors=factors, use_neighbors=COLLAB_MODEL != "factors")
+    return on_current_state(score)
+
+class ProfileRef(BaseModel):
+    email: str
+    profile_name: str
+
+class BatchRequest(BaseModel):
+    profiles: List[ProfileRef]
+
+class InteractionEvent(BaseModel):
+    user_id: str
+    profile_name: str
+    movie_title: Optional[str] = None
+    title_norm: Optional[str] = None
+    score: float
+    timestamp: Optional[datetime] = None
+
 @app.get("/recommendations")
-def get_recommendations(email: str = Query(...), profile_name: str = Query(...)):
+async def get_recommendations(
+    email: str = Query(...),
+    profile_name: str = Query(...),
+    fields: str = Query(None, description="Columnas a devolver separadas por coma (todas si se omite)"),
+    response_format: str = Query("json", alias="format", description="json o msgpack"),
+):
+    if response_format not in RESPONSE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Formato no soportado: {response_format}")
+    start = time.perf_counter()
     try:
-        dfmovies = load_movies_from_mongodb()
-        dfopiniones = load_interactions_from_mongodb()
-        
-        if dfmovies.empty: raise HTTPException(status_code=500, detail="No se pudieron cargar las películas")
-        
-        final_table = prepare_data(dfmovies, dfopiniones)
-        recs = recommend_movies(final_table, dfmovies, email, profile_name)
-        
-        result_list = []
-        for _, row in recs.iterrows():
-            row_dict = {}
-            for col in row.index:
-                val = row[col]
-                if isinstance(val, (list, np.ndarray)):
-                    if isinstance(val, np.ndarray): row_dict[col] = val.tolist()
-                    else: row_dict[col] = val
-                elif pd.isna(val) or val is None: row_dict[col] = None
-                elif isinstance(val, (np.floating, float)):
-                    row_dict[col] = float(val) if np.isfinite(val) else 0.0
-                elif isinstance(val, (np.integer, int)): row_dict[col] = int(val)
-                else: row_dict[col] = val
-            result_list.append(row_dict)
-
-        return JSONResponse(content={"email": email, "profile_name": profile_name, "recommendations": result_list})
+        # El pool de 50 se cachea por perfil; en cada request sólo se sortean las 12
+        source = "cache"
+        cached = recommendation_cache.get(email, profile_name)
+        if cached is None:
+            source = "store"
+            # SQLite, decodificación del pool y medición de memoria del cache: fuera del event loop
+            cached = await asyncio.to_thread(pool_store.get, email, profile_name)
+            if cached is not None: await asyncio.to_thread(recommendation_cache.put, email, profile_name, *cached)
+        if cached is not None:
+            top_50_pool, mode_label = cached
+        else:
+            source = "scored"
+            # El perfil incremental se arma (o se lee ya armado) en este proceso y viaja al worker
+            profile_view = None
+            if INCREMENTAL_PROFILES:
+                with span("profile_view"):
+                    profile_view = await asyncio.to_thread(profile_store.view, email, profile_name)
+            ranked, spans = await scoring_pool.run(score_profile, email, profile_name, profile_view)
+            metrics.observe(spans)
+            if ranked is None: raise HTTPException(status_code=500, detail="No se pudieron cargar las películas")
+            top_50_pool, mode_label = ranked
+            await asyncio.to_thread(recommendation_cache.put, email, profile_name, top_50_pool, mode_label)
+            if mode_label != "Cold Start":
+                print(f"✅ Recomendaciones generadas. Modo: {mode_label}")
+        # Campos de presentación de las 12 elegidas y conversión columnar, sólo con los campos pedidos
+        requested = parse_fields(fields)
+        with span("display_fields"):
+            chosen = await asyncio.to_thread(display_fields.attach, draw_sample(top_50_pool), requested)
+        with span("serialization"):
+            recommendations = frame_to_records(chosen, requested)
+            response = RESPONSE_FORMATS[response_format](
+                content={"email": email, "profile_name": profile_name, "recommendations": recommendations}
+            )
+        metrics.RECOMMENDATIONS.labels(mode_label, source).inc()
+        metrics.REQUEST_SECONDS.labels("recommendations", source).observe(time.perf_counter() - start)
+        return response
+    except HTTPException:
+        raise
+    except QueueFullError as e:
+        metrics.REJECTED.labels("recommendations").inc()
+        print(f"⏳ Request rechazado: {e}")
+        raise HTTPException(status_code=503, detail="Servicio saturado, reintentá en unos segundos", headers={"Retry-After": "1"})
     except Exception as e:
         print(f"Error: {str(e)}")
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Error al generar recomendaciones: {str(e)}")
 
+@app.post("/recommendations/batch")
+async def batch_recommendations(request: BatchRequest):
+    """Precalcula los pools de varios perfiles y los deja en el cache y en el almacén local"""
+    if len(request.profiles) > BATCH_MAX_PROFILES:
+        raise HTTPException(status_code=400, detail=f"Máximo {BATCH_MAX_PROFILES} perfiles por batch")
+    profiles = list(dict.fromkeys((p.email, p.profile_name) for p in request.profiles))
+    start = time.perf_counter()
+    try:
+        ranked, spans = await scoring_pool.run(score_batch, profiles)
+    except QueueFullError as e:
+        metrics.REJECTED.labels("batch").inc()
+        print(f"⏳ Batch rechazado: {e}")
+        raise HTTPException(status_code=503, detail="Servicio saturado, reintentá en unos segundos", headers={"Retry-After": "1"})
+    metrics.observe(spans)
+    if ranked is None: raise HTTPException(status_code=500, detail="No se pudieron cargar las películas")
+
+    def cache_pools():
+        for email, profile_name, pool, mode_label in ranked:
+            recommendation_cache.put(email, profile_name, pool, mode_label)
+    await asyncio.to_thread(cache_pools)
+    for _, _, _, mode_label in ranked:
+        metrics.RECOMMENDATIONS.labels(mode_label, "batch").inc()
+    stored = await asyncio.to_thread(pool_store.put_many, ranked)
+    metrics.REQUEST_SECONDS.labels("batch", "scored").observe(time.perf_counter() - start)
+    return {
+        "computed": len(ranked),
+        "stored": stored,
+        "results": [
+            {"email": email, "profile_name": profile_name, "mode": mode_label, "pool_size": len(pool)}
+            for email, profile_name, pool, mode_label in ranked
+        ],
+    }
+
+# --- ARRANQUE ---
+
+# Artefacto de arranque (build_artifact.py): snapshot e índices listos para abrir con mmap
+CATALOG_ARTIFACT_DIR = os.getenv("CATALOG_ARTIFACT_DIR", "/app/artifacts/catalog")
+# Objetivo de arranque en frío (inicio del proceso -> snapshot cargado); se avisa en el log si se excede
+READY_TARGET_SECONDS = float(os.getenv("READY_TARGET_SECONDS", "5"))
+startup = {"source": None, "ready_seconds": None, "mongo": None}
+
+def mark_ready(state):
+    """Listener del snapshot: registra cuánto tardó en quedar listo la primera vez"""
+    if startup["ready_seconds"] is not None or not state.loaded: return
+    source = startup["source"] = startup["source"] or "mongo"
+    seconds = time.time() - STARTED_AT
+    startup["ready_seconds"] = round(seconds, 3)
+    metrics.STARTUP_SECONDS.labels(source).set(seconds)
+    note = "" if seconds <= READY_TARGET_SECONDS else f" ⚠️ por encima del objetivo de {READY_TARGET_SECONDS:g}s"
+    print(f"🚀 Listo en {seconds:.2f}s desde el inicio del proceso ({source}){note}")
+
+snapshot.add_listener(mark_ready)
+
+def restore_artifact():
+    """Retoma el snapshot desde el artefacto precalculado; False si no hay uno utilizable"""
+    try:
+        artifact = load_artifact(CATALOG_ARTIFACT_DIR)
+        if artifact is None or not artifact.loaded: return False
+        # Tabla e interacciones incluidas: si el artefacto está incompleto se carga de Mongo
+        restored = artifact.snapshot_state()
+    except Exception as e:
+        print(f"⚠️ No se pudo leer el artefacto de arranque: {e}")
+        return False
+    # Con los índices del artefacto los listeners los encuentran al día y no reajustan nada
+    if artifact.plot_index is not None: plot_index_store.index = artifact.plot_index
+    if ANN_MODE and artifact.ann_index is not None: ann_index_store.adopt(artifact.ann_index, artifact.features)
+    startup["source"] = "artifact"
+    state = snapshot.restore(restored)
+    print(f"📂 Snapshot restaurado del artefacto {artifact.name}: {len(state.movies)} películas, {len(state.interactions)} interacciones")
+    return True
+
+def load_snapshot():
+    try:
+        state = snapshot.ensure_loaded()
+        print(f"📦 Snapshot cargado: {len(state.movies)} películas, {len(state.interactions)} interacciones")
+    except Exception as e:
+        print(f"❌ Error al cargar el snapshot inicial: {e}")
+
+def warm_up():
+    """Lo que no hace falta para aceptar conexiones: carga completa (sin artefacto), scikit-learn y
+    ping e índices de Mongo. Termina arrancando el refresco periódico del snapshot"""
+    # La carga va primero: el ping puede esperar hasta serverSelectionTimeoutMS sin aportar nada
+    if not snapshot.state.loaded: load_snapshot()
+    warm_imports()
+    try:
+        client.admin.command('ping')
+        startup["mongo"] = "ok"
+        print("✅ Conexión a MongoDB exitosa")
+    except Exception as e:
+        startup["mongo"] = f"error: {type(e).__name__}"
+        print(f"❌ Error al conectar con MongoDB: {e}")
+    try:
+        indexes = snapshot.source.ensure_indexes()
+        print(f"🗂️ Índices de interacciones asegurados: {indexes}")
+    except Exception as e:
+        print(f"⚠️ No se pudieron asegurar los índices de interacciones: {e}")
+    snapshot.start()
+
+@app.on_event("startup")
+def start_snapshot():
+    # Los workers de proceso se crean antes de arrancar hilos en este proceso; en modo shared
+    # también antes de la carga, para que no hereden una copia del snapshot
+    if SHARED_CATALOG: scoring_pool.start()
+    restore_artifact()
+    if SCORING_EXECUTOR == "process" and not snapshot.state.loaded:
+        # Los workers heredan el snapshot del padre: sin artefacto se carga antes de crearlos
+        load_snapshot()
+    if not SHARED_CATALOG: scoring_pool.start()
+    # El servidor acepta conexiones ya: /health/ready responde 503 hasta que el snapshot esté cargado
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+@app.on_event("shutdown")
+def stop_snapshot():
+    snapshot.stop()
+    scoring_pool.shutdown()
+
+@app.get("/health/live")
+def liveness():
+    """El proceso responde; no depende de Mongo ni del snapshot"""
+    return {"status": "alive", "uptime_seconds": round(time.time() - STARTED_AT, 3)}
+
+@app.get("/health/ready")
+def readiness():
+    """200 cuando el snapshot está cargado y se puede puntuar; 503 mientras carga"""
+    state = snapshot.state
+    # mark_ready es el último listener: recién ahí los índices y el catálogo compartido tienen esta versión
+    ready = state.loaded and startup["ready_seconds"] is not None
+    body = {
+        "status": "ready" if ready else "loading",
+        "snapshot_version": state.version,
+        "source": startup["source"],
+        "ready_seconds": startup["ready_seconds"],
+        "ready_target_seconds": READY_TARGET_SECONDS,
+        "mongo": startup["mongo"],
+    }
+    return JSONResponse(status_code=200 if ready else 503, content=body)
+
+@app.get("/admin/snapshot")
+def snapshot_status():
+    return snapshot.stats()
+
+@app.post("/admin/snapshot/refresh")
+def snapshot_refresh():
+    try:
+        snapshot.refresh()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"No se pudo refrescar el snapshot: {str(e)}")
+    return snapshot.stats()
+
+@app.post("/cache/invalidate")
+def cache_invalidate(email: str = Query(...), profile_name: str = Query(None)):
+    """Hook para el opinion-service: descarta el pool cacheado tras una calificación nueva"""
+    pool_store.invalidate(email, profile_name)
+    return {"invalidated": recommendation_cache.invalidate(email, profile_name)}
+
+@app.post("/interactions")
+def ingest_interaction(event: InteractionEvent):
+    """Hook para el opinion-service: aplica la calificación al perfil incremental y descarta su pool cacheado"""
+    title = event.title_norm or normalize_text(event.movie_title)
+    stamp = event_stamp(event.timestamp or datetime.now(timezone.utc))
+    applied = profile_store.ingest([(event.user_id, event.profile_name, title, event.score, stamp)])
+    pool_store.invalidate(event.user_id, event.profile_name)
+    return {"applied": applied, "invalidated": recommendation_cache.invalidate(event.user_id, event.profile_name)}
+
+@app.get("/admin/profiles")
+def profiles_status(email: str = Query(None), profile_name: str = Query(None)):
+    """Estadísticas del almacén de perfiles, o el perfil armado de (email, profile_name)"""
+    if email is None or profile_name is None:
+        return {"incremental_profiles": INCREMENTAL_PROFILES, **profile_store.stats()}
+    summary = profile_store.summary(email, profile_name)
+    if summary is None: raise HTTPException(status_code=404, detail="Perfil no armado todavía")
+    return summary
+
+@app.get("/admin/cache")
+def cache_status():
+    return recommendation_cache.stats()
+
+@app.get("/admin/display")
+def display_status():
+    return display_fields.stats()
+
+@app.get("/admin/store")
+def store_status():
+    return pool_store.stats()
+
+@app.get("/admin/workers")
+def workers_status():
+    return scoring_pool.stats()
+
+@app.get("/admin/factors")
+def factors_status():
+    return {"collab_model": COLLAB_MODEL, **factor_store.stats()}
+
+@app.get("/admin/shared")
+def shared_status():
+    if shared_catalog is None:
+        raise HTTPException(status_code=404, detail="El catálogo compartido sólo existe con SCORING_EXECUTOR=process o shared")
+    return shared_catalog.stats()
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """Métricas en formato Prometheus: latencias por fase y por request, modos y tamaño del snapshot"""
+    body, content_type = metrics.render()
+    return Response(content=body, headers={"Content-Type": content_type})
+
 @app.get("/")
 def root():
     return {"message": "Recommendation Service Active"}
\ No newline at end of file
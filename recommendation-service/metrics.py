@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""Métricas Prometheus y tramos de tiempo por fase.
+
+`span("fase")` mide un bloque. Dentro de `traced(...)` los tramos se juntan en
+una lista que vuelve junto con el resultado: así funcionan igual con workers de
+proceso, cuyo registro de métricas no es el del proceso que expone /metrics. El
+proceso principal los registra con `observe(spans)`. Fuera de un `traced` (refresco
+del snapshot) se registran directo.
+
+Con PROFILE_DIR se perfila con cProfile una fracción de las requests
+(PROFILE_SAMPLE_RATE) y se guarda el volcado de las que superan PROFILE_SLOW_MS.
+"""
+
+import contextvars
+import cProfile
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Desde lecturas de cache (~1ms) hasta puntajes completos sobre catálogos grandes
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+PHASE_SECONDS = Histogram(
+    "recommendation_phase_seconds", "Duración de cada fase del cálculo de recomendaciones", ["phase"], buckets=BUCKETS,
+)
+REQUEST_SECONDS = Histogram(
+    "recommendation_request_seconds", "Duración de las requests por endpoint y origen del pool",
+    ["endpoint", "source"], buckets=BUCKETS,
+)
+RECOMMENDATIONS = Counter(
+    "recommendations_total", "Recomendaciones servidas por modo y origen del pool", ["mode", "source"],
+)
+REJECTED = Counter("recommendation_rejected_total", "Requests rechazadas por cola llena", ["endpoint"])
+CATALOG_SIZE = Gauge("recommendation_snapshot_size", "Tamaño del snapshot en memoria", ["kind"])
+SLOW_PROFILES = Counter("recommendation_slow_profiles_total", "Volcados de cProfile guardados")
+STARTUP_SECONDS = Gauge(
+    "recommendation_startup_seconds", "Segundos desde el inicio del proceso hasta tener el snapshot cargado", ["source"],
+)
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "")
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "500"))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "1.0"))
+
+_spans = contextvars.ContextVar("recommendation_spans", default=None)
+# cProfile no admite dos perfiles activos a la vez: se perfila una request por vez
+_profiling = threading.Lock()
+
+@contextmanager
+def span(phase):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        spans = _spans.get()
+        if spans is None: PHASE_SECONDS.labels(phase).observe(elapsed)
+        else: spans.append((phase, elapsed))
+
+def observe(spans):
+    for phase, seconds in spans:
+        PHASE_SECONDS.labels(phase).observe(seconds)
+
+def _profile_call(name, fn, args, kwargs):
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    try:
+        return profiler.runcall(fn, *args, **kwargs)
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if elapsed_ms >= PROFILE_SLOW_MS:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            stamp = f"{time.strftime('%Y%m%d-%H%M%S')}.{int(time.time() * 1000) % 1000:03d}"
+            path = os.path.join(PROFILE_DIR, f"{name}-{stamp}-{int(elapsed_ms)}ms-{os.getpid()}.prof")
+            profiler.dump_stats(path)
+            SLOW_PROFILES.inc()
+            print(f"🐢 Request lenta ({elapsed_ms:.0f}ms), perfil guardado en {path}")
+
+def traced(name, fn, *args, **kwargs):
+    """Ejecuta `fn` juntando sus tramos; devuelve (resultado, tramos)"""
+    spans = []
+    token = _spans.set(spans)
+    try:
+        sampled = PROFILE_DIR and random.random() < PROFILE_SAMPLE_RATE
+        if sampled and _profiling.acquire(blocking=False):
+            try:
+                result = _profile_call(name, fn, args, kwargs)
+            finally:
+                _profiling.release()
+        else:
+            result = fn(*args, **kwargs)
+        return result, tuple(spans)
+    finally:
+        _spans.reset(token)
+
+def watch_snapshot(snapshot):
+    """Tamaños del snapshot, leídos al momento de cada scrape"""
+    CATALOG_SIZE.labels("movies").set_function(lambda: len(snapshot.state.movies))
+    CATALOG_SIZE.labels("interactions").set_function(lambda: len(snapshot.state.interactions))
+    CATALOG_SIZE.labels("ratings").set_function(lambda: len(snapshot.state.table))
+
+def render():
+    """(cuerpo, content type) para el endpoint /metrics"""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""Índice TF-IDF persistente sobre las tramas del catálogo.
+
+El vectorizador se ajusta sobre todo el catálogo y después sólo se recalculan
+las tramas que cambian; se reajusta si cambia su configuración (max_features),
+si cambió una parte grande del catálogo desde el ajuste o si las tramas nuevas
+traen términos que el vocabulario no cubre. La matriz
+dispersa (filas normalizadas L2), el vocabulario y los idf se guardan en
+disco como `.npy` sin comprimir para poder abrirlos con mmap al arrancar.
+El perfil del usuario se proyecta sobre ese vocabulario fijo y el puntaje
+de trama es un único producto matriz-vector disperso.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from collections import Counter
+
+import numpy as np
+import scipy.sparse as sp
+# scikit-learn se importa recién al ajustar o proyectar (medio segundo menos de arranque)
+
+# Si cambió más de esta fracción de tramas desde el último ajuste conviene reajustar el vocabulario
+REFIT_FRACTION = 0.2
+# Deriva del vocabulario: si las tramas recalculadas desde el ajuste tienen esta proporción más de
+# términos fuera del vocabulario que una muestra de las que no cambiaron, ya no las representa y se reajusta
+OOV_DRIFT = 0.1
+# Términos contados antes de decidir por deriva (pocas tramas cortas dan proporciones ruidosas)
+OOV_MIN_TERMS = 1000
+# Tramas sin cambios que se cuentan como referencia
+OOV_SAMPLE = 500
+# Tope de vocabulario por defecto (PLOT_INDEX_MAX_FEATURES en el servicio)
+MAX_FEATURES = 2000
+
+def plot_hash(text):
+    """Huella estable (entre procesos) de una trama"""
+    return int.from_bytes(hashlib.blake2b(str(text).encode('utf-8'), digest_size=8).digest(), 'little')
+
+_analyzer = None
+
+def plot_terms(text):
+    """Términos de una trama contados con el mismo análisis que el vectorizador (minúsculas, sin stop words)"""
+    global _analyzer
+    if _analyzer is None:
+        from sklearn.feature_extraction.text import CountVectorizer
+        _analyzer = CountVectorizer(stop_words='english').build_analyzer()
+    return Counter(_analyzer(str(text)))
+
+class PlotTerms:
+    """Corpus de tramas ya contado: los términos sumados y el largo del texto concatenado.
+
+    Reemplaza al string del corpus donde se proyecta un perfil (PlotIndex.transform):
+    contar cada trama por separado y sumar da lo mismo que contar el texto unido con
+    espacios, sin guardar ni volver a recorrer el texto. No depende del vocabulario
+    del índice, así que sobrevive a un reajuste.
+    """
+
+    def __init__(self, counts, length):
+        self.counts = counts
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+class PlotIndex:
+    def __init__(self, keys, hashes, matrix, vocabulary, idf, max_features=MAX_FEATURES, drift=None):
+        self.keys = np.asarray(keys, dtype=object)
+        self.hashes = np.asarray(hashes, dtype=np.uint64)
+        self.matrix = matrix
+        self.vocabulary = vocabulary
+        self.idf = np.asarray(idf, dtype=np.float64)
+        # Tope configurado (no el tamaño del vocabulario que salió): un reajuste vuelve a usarlo
+        self.max_features = max_features
+        # Desde el último ajuste: filas recalculadas y términos (total y fuera del vocabulario) de sus tramas
+        self.drift = dict(drift or {'rows': 0, 'terms': 0, 'oov': 0})
+        self.row_of = {k: i for i, k in enumerate(self.keys)}
+        self._counter = None
+        self._catalog_rows = None
+        self._stamp = None
+
+    @classmethod
+    def fit(cls, keys, plots, max_features=MAX_FEATURES):
+        """Ajusta vocabulario e idf sobre todo el catálogo"""
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        plots = [str(p) for p in plots]
+        tfidf = TfidfVectorizer(stop_words='english', max_features=max_features)
+        matrix = tfidf.fit_transform(plots).astype(np.float64).tocsr()
+        vocabulary = {term: int(col) for term, col in tfidf.vocabulary_.items()}
+        return cls(keys, [plot_hash(p) for p in plots], matrix, vocabulary, tfidf.idf_, max_features=max_features)
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def stamp(self):
+        """Huella del contenido (filas, tramas, vocabulario e idf): igual sólo si las filas son las mismas,
+        también para el mismo índice leído de disco"""
+        if self._stamp is None:
+            digest = hashlib.blake2b(digest_size=12)
+            digest.update("\n".join(map(str, self.keys)).encode('utf-8'))
+            digest.update(np.ascontiguousarray(self.hashes).tobytes())
+            digest.update(json.dumps(self.vocabulary, sort_keys=True).encode('utf-8'))
+            digest.update(np.ascontiguousarray(self.idf).tobytes())
+            self._stamp = digest.hexdigest()
+        return self._stamp
+
+    def transform(self, texts):
+        """Proyecta textos sobre el vocabulario ajustado (TF-IDF + norma L2)"""
+        from sklearn.preprocessing import normalize
+        if self._counter is None:
+            from sklearn.feature_extraction.text import CountVectorizer
+            self._counter = CountVectorizer(stop_words='english', vocabulary=self.vocabulary)
+        texts = list(texts)
+        if any(isinstance(t, PlotTerms) for t in texts):
+            counts = self._count_terms(texts)
+        else:
+            counts = self._counter.transform([str(t) for t in texts])
+        return normalize(sp.csr_matrix(counts.multiply(self.idf)), norm='l2', copy=False)
+
+    def _count_terms(self, texts):
+        """Matriz de conteos (textos x vocabulario) admitiendo corpus ya contados (PlotTerms)"""
+        rows, cols, values = [], [], []
+        for i, text in enumerate(texts):
+            counts = text.counts if isinstance(text, PlotTerms) else plot_terms(text)
+            for term, count in counts.items():
+                col = self.vocabulary.get(term)
+                if col is not None and count > 0:
+                    rows.append(i)
+                    cols.append(col)
+                    values.append(count)
+        return sp.csr_matrix((np.asarray(values, dtype=np.int64), (rows, cols)), shape=(len(texts), len(self.idf)))
+
+    def scores(self, text):
+        """Similitud coseno entre `text` (o un corpus ya contado) y cada fila del índice"""
+        profile = self.transform([text])
+        return np.asarray((self.matrix @ profile.T).todense()).ravel()
+
+    def rows_for(self, keys):
+        """Posiciones en el índice para cada clave (-1 si no está indexada)"""
+        return np.fromiter((self.row_of.get(k, -1) for k in keys), dtype=np.int64, count=len(keys))
+
+    def catalog_rows(self, features):
+        """rows_for de todo el catálogo de `features`, calculado una vez por catálogo"""
+        cached = self._catalog_rows
+        if cached is None or cached[0] is not features:
+            cached = self._catalog_rows = (features, self.rows_for(features.titles))
+        return cached[1]
+
+    def _count_oov(self, plots):
+        """(términos, términos fuera del vocabulario) de `plots`, con el análisis del vectorizador"""
+        terms = oov = 0
+        for plot in plots:
+            for term, count in plot_terms(plot).items():
+                terms += count
+                if term not in self.vocabulary: oov += count
+        return terms, oov
+
+    def update(self, keys, plots, max_features=None):
+        """Devuelve un índice sincronizado con (keys, plots) recalculando sólo las tramas cambiadas.
+
+        Retorna (índice, filas_recalculadas). Se reajusta desde cero con `max_features` (por
+        defecto, el tope con el que se ajustó este índice) si ese tope no es el del ajuste, si
+        desde el ajuste cambió más de REFIT_FRACTION de las tramas o si las tramas nuevas ya
+        no caben en el vocabulario (OOV_DRIFT).
+        """
+        max_features = max_features or self.max_features
+        plots = [str(p) for p in plots]
+        hashes = np.fromiter((plot_hash(p) for p in plots), dtype=np.uint64, count=len(plots))
+        old_rows = self.rows_for(keys)
+        known = old_rows >= 0
+        unchanged = known.copy()
+        unchanged[known] = self.hashes[old_rows[known]] == hashes[known]
+
+        changed = np.flatnonzero(~unchanged)
+        if max_features != self.max_features:
+            return PlotIndex.fit(keys, plots, max_features=max_features), len(keys)
+        if len(changed) == 0 and len(keys) == len(self.keys):
+            return self, 0
+        rows = self.drift['rows'] + len(changed)
+        if rows > REFIT_FRACTION * max(len(keys), 1):
+            return PlotIndex.fit(keys, plots, max_features=max_features), len(keys)
+        terms, oov = self._count_oov(plots[i] for i in changed)
+        terms, oov = terms + self.drift['terms'], oov + self.drift['oov']
+        if terms >= OOV_MIN_TERMS:
+            kept = np.flatnonzero(unchanged)
+            sample_terms, sample_oov = self._count_oov(plots[i] for i in kept[::max(1, len(kept) // OOV_SAMPLE)])
+            if sample_terms and oov / terms - sample_oov / sample_terms > OOV_DRIFT:
+                return PlotIndex.fit(keys, plots, max_features=max_features), len(keys)
+
+        # Filas viejas reutilizadas tal cual; sólo las cambiadas pasan por el vectorizador
+        reuse = sp.csr_matrix((np.ones(unchanged.sum()), (np.flatnonzero(unchanged), old_rows[unchanged])),
+                              shape=(len(keys), len(self.keys)))
+        fresh = self.transform([plots[i] for i in changed]) if len(changed) else sp.csr_matrix((0, len(self.idf)))
+        place = sp.csr_matrix((np.ones(len(changed)), (changed, np.arange(len(changed)))),
+                              shape=(len(keys), len(changed)))
+        matrix = (reuse @ self.matrix + place @ fresh).tocsr()
+        drift = {'rows': rows, 'terms': terms, 'oov': oov}
+        return PlotIndex(keys, hashes, matrix, self.vocabulary, self.idf, max_features=max_features, drift=drift), len(changed)
+
+    # --- PERSISTENCIA ---
+
+    def save(self, directory):
+        """Escribe el índice en un directorio temporal y lo reemplaza de una vez"""
+        tmp = f"{directory}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        np.save(os.path.join(tmp, 'data.npy'), self.matrix.data)
+        np.save(os.path.join(tmp, 'indices.npy'), self.matrix.indices)
+        np.save(os.path.join(tmp, 'indptr.npy'), self.matrix.indptr)
+        np.save(os.path.join(tmp, 'idf.npy'), self.idf)
+        np.save(os.path.join(tmp, 'hashes.npy'), self.hashes)
+        with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({'shape': list(self.matrix.shape), 'vocabulary': self.vocabulary, 'keys': list(self.keys),
+                       'max_features': self.max_features, 'drift': self.drift}, f)
+
+        old = f"{directory}.old-{os.getpid()}"
+        if os.path.exists(directory): os.rename(directory, old)
+        os.rename(tmp, directory)
+        shutil.rmtree(old, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        mode = 'r' if mmap else None
+        arr = lambda name: np.load(os.path.join(directory, name), mmap_mode=mode)
+        with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        matrix = sp.csr_matrix((arr('data.npy'), arr('indices.npy'), arr('indptr.npy')), shape=tuple(meta['shape']), copy=False)
+        return cls(meta['keys'], arr('hashes.npy'), matrix, meta['vocabulary'], arr('idf.npy'),
+                   max_features=meta.get('max_features', MAX_FEATURES), drift=meta.get('drift'))
+
+class PlotIndexStore:
+    """Mantiene el índice vigente sincronizado con el snapshot y persistido en disco"""
+
+    def __init__(self, directory, max_features=MAX_FEATURES):
+        self.directory = directory
+        self.max_features = max_features
+        self.index = None
+
+    def sync(self, movies):
+        """Carga el índice de disco (si existe) y recalcula las filas cuyas tramas cambiaron"""
+        if movies.empty: return self.index
+        keys = movies['title_norm'].tolist()
+        plots = movies['plot'].fillna('').tolist()
+
+        index = self.index
+        if index is None and self.directory and os.path.exists(os.path.join(self.directory, 'meta.json')):
+            try:
+                index = PlotIndex.load(self.directory)
+                print(f"📂 Índice de tramas cargado de disco: {len(index)} filas")
+            except Exception as e:
+                print(f"⚠️ No se pudo leer el índice de tramas: {e}")
+
+        if index is None:
+            index, rebuilt = PlotIndex.fit(keys, plots, self.max_features), len(keys)
+        else:
+            index, rebuilt = index.update(keys, plots, max_features=self.max_features)
+
+        if rebuilt:
+            print(f"🧮 Índice de tramas: {rebuilt} filas recalculadas")
+            if self.directory:
+                try:
+                    index.save(self.directory)
+                except Exception as e:
+                    print(f"⚠️ No se pudo guardar el índice de tramas: {e}")
+        self.index = index
+        return index
+
+    def on_snapshot(self, state):
+        self.sync(state.movies)
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""Job offline: precalcula el pool de recomendaciones de todos los perfiles con interacciones.
+
+Carga el snapshot una sola vez, puntúa los perfiles por bloques con operaciones
+matriciales (batch.py) y escribe los pools en el almacén local que sirve el
+endpoint /recommendations. Pensado para correr antes de las horas pico:
+
+    docker compose exec recommendation-service python precompute.py
+    python precompute.py --store ./artifacts/recommendations.sqlite --limit 500
+"""
+
+import argparse
+import os
+import time
+
+from pymongo import MongoClient
+
+from batch import BatchScorer, all_profiles
+from factors import FactorModelStore
+from plot_index import PlotIndexStore
+from snapshot import CatalogSnapshot, MongoSource
+from store import PoolStore
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mongo-uri', default=os.getenv("MONGO_URI", "mongodb://mongodb:27017"))
+    parser.add_argument('--store', default=os.getenv("RECS_STORE_PATH", "/app/artifacts/recommendations.sqlite"))
+    parser.add_argument('--plot-index-dir', default=os.getenv("PLOT_INDEX_DIR", "/app/artifacts/plot_index"))
+    parser.add_argument('--factors-dir', default=os.getenv("FACTORS_DIR", "/app/artifacts/factors"))
+    parser.add_argument('--chunk-size', type=int, default=128, help='perfiles por bloque matricial')
+    parser.add_argument('--limit', type=int, help='sólo los primeros N perfiles')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    state = CatalogSnapshot(MongoSource(MongoClient(args.mongo_uri, serverSelectionTimeoutMS=5000))).load()
+    plot_index_store = PlotIndexStore(args.plot_index_dir, max_features=int(os.getenv("PLOT_INDEX_MAX_FEATURES", "2000")))
+    plot_index_store.sync(state.movies)
+    profiles = all_profiles(state)[:args.limit]
+    print(f"📦 Snapshot: {len(state.movies)} películas, {len(state.interactions)} interacciones, "
+          f"{len(profiles)} perfiles ({time.perf_counter() - start:.1f}s)")
+
+    store = PoolStore(args.store)
+    collab_model = os.getenv("COLLAB_MODEL", "hybrid")
+    factors = FactorModelStore(args.factors_dir).sync(state.features) if collab_model != "neighbors" else None
+    scorer = BatchScorer(state, plot_index=plot_index_store.index, chunk_size=args.chunk_size,
+                         factors=factors, use_neighbors=collab_model != "factors")
+    start = time.perf_counter()
+    written, pending = 0, []
+    for result in scorer.rank(profiles):
+        pending.append(result)
+        if len(pending) >= args.chunk_size:
+            written += store.put_many(pending)
+            pending = []
+    written += store.put_many(pending)
+    elapsed = time.perf_counter() - start
+    print(f"✅ {written} pools guardados en {args.store} ({elapsed:.1f}s, {written / max(elapsed, 1e-9):.0f} perfiles/s)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+"""Perfiles de gusto incrementales: cada calificación nueva actualiza el perfil sin releer el historial.
+
+Sin este módulo rank_movies arma el perfil en cada request recorriendo todo el
+historial: géneros y directores top, corpus de tramas y notas para el fold-in de
+factores. Acá cada perfil se arma una vez desde su historial (la primera vez que
+se pide) y después se mantiene con los eventos de calificación: los del refresco
+incremental del snapshot (state.changed_rows) y los que envía el opinion-service a
+POST /interactions. Cada evento suma (y, si es una recalificación, descuenta el
+aporte de la nota anterior) en contadores de géneros y directores, la suma de
+notas y los términos de las tramas que le encantaron: O(1) amortizado, sin
+recorrer otras calificaciones.
+
+El request lee una ProfileView ya lista, que viaja al worker de puntaje junto con
+el perfil pedido. Los empates de los contadores se resuelven como en
+build_taste_profile: gana el género (o director) de la calificación más reciente.
+"""
+
+import heapq
+import threading
+from collections import Counter, OrderedDict, namedtuple
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from plot_index import PlotTerms, plot_terms
+from scoring import TasteProfile
+
+# Umbrales de build_taste_profile: géneros y directores desde 7, tramas desde 8
+LIKE_MIN_SCORE, LOVE_MIN_SCORE = 7, 8
+TOP_GENRES, TOP_DIRECTORS = 5, 3
+
+# Calificación vigente de un título: nota, (marca de tiempo, orden de llegada) y aporte del título
+_Rating = namedtuple('_Rating', ['score', 'order', 'info'])
+
+class TitleInfo:
+    """Aporte de un título del catálogo a un perfil (el mismo para todos los perfiles que lo califican)"""
+    __slots__ = ('genres', 'directors', 'plot', '_terms')
+
+    def __init__(self, genres, directors, plot):
+        self.genres = genres
+        self.directors = directors
+        self.plot = plot
+        self._terms = None
+
+    @property
+    def terms(self):
+        """Términos de la trama, contados recién cuando a alguien le encanta el título"""
+        if self._terms is None: self._terms = plot_terms(self.plot)
+        return self._terms
+
+def event_stamp(value, default=0):
+    """Marca de tiempo de una calificación en nanosegundos UTC (`default` si no tiene)"""
+    if value is None or (not isinstance(value, (str, bytes)) and pd.isna(value)): return default
+    stamp = pd.Timestamp(value)
+    if stamp.tzinfo is not None: stamp = stamp.tz_convert('UTC').tz_localize(None)
+    return stamp.value
+
+def _top(counts, latest, n):
+    """Los `n` más contados; a igual cuenta, el de la calificación más reciente (como Counter.most_common
+    sobre el historial ordenado de más nuevo a más viejo)"""
+    return heapq.nsmallest(n, counts, key=lambda item: (-counts[item], tuple(-x for x in latest[item])))
+
+@dataclass(frozen=True)
+class ProfileView:
+    """Perfil listo para puntuar: lo que rank_movies sacaba del historial"""
+    titles: tuple
+    scores: np.ndarray
+    taste: TasteProfile
+    score_sum: float
+    scored: int
+
+    @property
+    def num_ratings(self):
+        return len(self.titles)
+
+    @property
+    def mean_score(self):
+        return self.score_sum / self.scored if self.scored else None
+
+class _Profile:
+    """Acumuladores de un perfil; la ProfileStore los modifica bajo su lock"""
+
+    def __init__(self):
+        self.ratings = {}
+        self.genres, self.directors = Counter(), Counter()
+        # Desempate: (marca, orden, -posición en la lista) de la calificación más reciente con cada género/director
+        self.genre_latest, self.director_latest = {}, {}
+        self._stale = set()
+        self.plot_counts = Counter()
+        self.plot_chars = 0
+        self.loved = 0
+        self.score_sum = 0.0
+        self.scored = 0
+        self._seq = 0
+        self._view = None
+
+    def apply(self, title, score, stamp, info):
+        """Aplica una calificación; False si ya había una igual o más nueva del mismo título"""
+        previous = self.ratings.get(title)
+        if previous is not None:
+            if stamp < previous.order[0] or (stamp == previous.order[0] and score == previous.score): return False
+            self._remove(previous)
+        self._seq += 1
+        rating = self.ratings[title] = _Rating(score, (stamp, self._seq), info)
+        self._add(rating)
+        self._view = None
+        return True
+
+    def _add(self, rating):
+        score = rating.score
+        if score == score:
+            self.score_sum += float(score)
+            self.scored += 1
+        if score >= LIKE_MIN_SCORE:
+            for counts, latest, items in ((self.genres, self.genre_latest, rating.info.genres),
+                                          (self.directors, self.director_latest, rating.info.directors)):
+                for pos, item in enumerate(items):
+                    counts[item] += 1
+                    key = rating.order + (-pos,)
+                    if item not in latest or key > latest[item]: latest[item] = key
+        if score >= LOVE_MIN_SCORE:
+            self.plot_counts.update(rating.info.terms)
+            self.plot_chars += len(rating.info.plot)
+            self.loved += 1
+
+    def _remove(self, rating):
+        score = rating.score
+        if score == score:
+            self.score_sum -= float(score)
+            self.scored -= 1
+        if score >= LIKE_MIN_SCORE:
+            for kind, counts, latest, items in (('genre', self.genres, self.genre_latest, rating.info.genres),
+                                                ('director', self.directors, self.director_latest, rating.info.directors)):
+                for item in items:
+                    counts[item] -= 1
+                    if counts[item] <= 0:
+                        del counts[item]
+                        latest.pop(item, None)
+                        self._stale.discard((kind, item))
+                    elif latest[item][:2] == rating.order:
+                        # Se fue la calificación que desempataba: se recalcula al leer
+                        self._stale.add((kind, item))
+        if score >= LOVE_MIN_SCORE:
+            self.plot_counts.subtract(rating.info.terms)
+            self.plot_counts = +self.plot_counts
+            self.plot_chars -= len(rating.info.plot)
+            self.loved -= 1
+
+    def _refresh_latest(self):
+        """Recalcula el desempate de los géneros/directores cuya calificación más reciente se reemplazó"""
+        for kind, item in self._stale:
+            latest = self.genre_latest if kind == 'genre' else self.director_latest
+            best = None
+            for rating in self.ratings.values():
+                if not rating.score >= LIKE_MIN_SCORE: continue
+                items = rating.info.genres if kind == 'genre' else rating.info.directors
+                if item in items:
+                    key = rating.order + (-items.index(item),)
+                    if best is None or key > best: best = key
+            latest[item] = best
+        self._stale.clear()
+
+    def view(self):
+        if self._view is None:
+            self._refresh_latest()
+            liked = [t for t, r in self.ratings.items() if r.score >= LIKE_MIN_SCORE]
+            # Las tramas se unían con un espacio: el largo del corpus cuenta los separadores
+            corpus = PlotTerms(dict(self.plot_counts), self.plot_chars + self.loved - 1) if self.loved else ""
+            taste = TasteProfile(_top(self.genres, self.genre_latest, TOP_GENRES),
+                                 _top(self.directors, self.director_latest, TOP_DIRECTORS), corpus, liked)
+            self._view = ProfileView(
+                titles=tuple(self.ratings),
+                scores=np.fromiter((float(r.score) for r in self.ratings.values()), dtype=np.float32, count=len(self.ratings)),
+                taste=taste, score_sum=self.score_sum, scored=self.scored,
+            )
+        return self._view
+
+class ProfileStore:
+    """Perfiles incrementales por (email, profile_name), con desalojo LRU.
+
+    `history(email, profile_name, state)` devuelve el historial del perfil ya cruzado
+    con el catálogo (como state.table) o None si no se pudo leer; se usa sólo para
+    armar un perfil la primera vez. Una recarga completa del snapshot descarta todo:
+    los perfiles se vuelven a armar a medida que se piden.
+    """
+
+    def __init__(self, history, max_profiles=50000):
+        self.history = history
+        self.max_profiles = max_profiles
+        self.state = None
+        self._profiles = OrderedDict()
+        # Perfiles que se están armando: los eventos que llegan mientras tanto se aplican al terminar
+        self._pending = {}
+        self._titles = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.builds = 0
+        self.events = 0
+        self.ignored = 0
+        self.evictions = 0
+        self.resets = 0
+
+    def _title_info(self, title):
+        """Géneros, directores y términos de trama de un título del catálogo vigente (None si no está)"""
+        info = self._titles.get(title)
+        if info is None and self.state is not None and self.state.features is not None:
+            row = self.state.features.row_of.get(title)
+            if row is None: return None
+            movie = self.state.movies.iloc[row]
+            genres = movie.get('formatted_genres')
+            genres = tuple(g.strip() for g in str(genres).split(',') if g.strip()) if pd.notna(genres) else ()
+            directors = movie.get('directors')
+            info = self._titles[title] = TitleInfo(genres, tuple(directors) if isinstance(directors, list) else (),
+                                                   str(movie.get('plot', '')))
+        return info
+
+    def _insert(self, key, profile):
+        self._profiles[key] = profile
+        while len(self._profiles) > self.max_profiles:
+            self._profiles.popitem(last=False)
+            self.evictions += 1
+
+    def _build(self, history):
+        """Perfil desde un historial cruzado con el catálogo, aplicado de la calificación más vieja a la más nueva"""
+        profile = _Profile()
+        if history is None or history.empty or 'title_norm' not in history.columns: return profile
+        score_col = 'user_score' if 'user_score' in history.columns else 'score'
+        if 'timestamp' in history.columns:
+            # El mismo orden que build_taste_profile (más nuevo primero, estable), recorrido al revés
+            history = history.sort_values('timestamp', ascending=False, kind='stable')
+            stamps = [event_stamp(t) for t in history['timestamp']]
+        else:
+            stamps = [0] * len(history)
+        titles, scores = history['title_norm'].tolist(), history[score_col].tolist()
+        for i in reversed(range(len(history))):
+            if not isinstance(titles[i], str): continue
+            info = self._title_info(titles[i])
+            if info is not None: profile.apply(titles[i], scores[i], stamps[i], info)
+        return profile
+
+    def view(self, email, profile_name):
+        """ProfileView del perfil, armándolo desde su historial si hace falta; None si no se puede"""
+        key = (email, profile_name)
+        with self._lock:
+            state = self.state
+            if state is None or not state.loaded: return None
+            profile = self._profiles.get(key)
+            if profile is not None:
+                self._profiles.move_to_end(key)
+                self.hits += 1
+                return profile.view()
+            generation = self._generation
+            # Si otro request ya lo está armando, éste arma su propia copia sin registrarla
+            owner = key not in self._pending
+            if owner: self._pending[key] = []
+
+        try:
+            history = self.history(email, profile_name, state)
+            profile = self._build(history) if history is not None else None
+        except Exception as e:
+            print(f"⚠️ No se pudo armar el perfil de {email}/{profile_name}: {e}")
+            profile = None
+
+        with self._lock:
+            # Tras una recarga completa el perfil armado puede ser de otro catálogo: no se registra
+            current = owner and generation == self._generation
+            events = self._pending.pop(key, None) if current else None
+            if profile is None: return None
+            self.builds += 1
+            if current:
+                for title, score, stamp, info in events or ():
+                    profile.apply(title, score, stamp, info)
+                self._insert(key, profile)
+            return profile.view()
+
+    def ingest(self, events):
+        """Aplica calificaciones (email, profile_name, title_norm, nota, marca de tiempo en ns).
+        Los perfiles que no están armados se ignoran: al armarse leen un historial que ya las incluye.
+        Devuelve cuántas cambiaron un perfil"""
+        applied = 0
+        with self._lock:
+            for email, profile_name, title, score, stamp in events:
+                key = (email, profile_name)
+                pending = self._pending.get(key)
+                profile = self._profiles.get(key)
+                if pending is None and profile is None: continue
+                info = self._title_info(title)
+                if info is None:
+                    self.ignored += 1
+                    continue
+                if pending is not None:
+                    pending.append((title, score, stamp, info))
+                elif profile.apply(title, score, stamp, info):
+                    applied += 1
+            self.events += applied
+        return applied
+
+    def on_snapshot(self, state):
+        with self._lock:
+            if state.changed_profiles is None or self.state is None:
+                # Carga completa o catálogo nuevo: los aportes de cada título pueden haber cambiado
+                self._profiles.clear()
+                self._pending.clear()
+                self._titles.clear()
+                self._generation += 1
+                self.resets += 1
+                self.state = state
+                return
+            self.state = state
+        rows = state.changed_rows
+        if rows is None or rows.empty: return
+        score_col = 'user_score' if 'user_score' in rows.columns else 'score'
+        stamps = [event_stamp(t) for t in rows['timestamp']] if 'timestamp' in rows.columns else [0] * len(rows)
+        self.ingest(zip(rows['user_id'], rows['profile_name'], rows['title_norm'], rows[score_col], stamps))
+
+    def summary(self, email, profile_name):
+        """Perfil armado (sin armarlo si no está), para inspección"""
+        with self._lock:
+            profile = self._profiles.get((email, profile_name))
+            view = profile.view() if profile is not None else None
+        if view is None: return None
+        return {
+            "ratings": view.num_ratings,
+            "mean_score": round(view.mean_score, 3) if view.mean_score is not None else None,
+            "top_genres": view.taste.top_genres,
+            "top_directors": view.taste.top_directors,
+            "liked": len(view.taste.liked_titles),
+            "plot_terms": len(view.taste.plot_corpus.counts) if view.taste.plot_corpus else 0,
+        }
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.builds
+            return {
+                "profiles": len(self._profiles),
+                "max_profiles": self.max_profiles,
+                "building": len(self._pending),
+                "titles": len(self._titles),
+                "hits": self.hits,
+                "builds": self.builds,
+                "hit_ratio": round(self.hits / total, 4) if total else None,
+                "events_applied": self.events,
+                "events_ignored": self.ignored,
+                "evictions": self.evictions,
+                "resets": self.resets,
+            }
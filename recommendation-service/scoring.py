@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""Piezas de la fórmula de recomendación compartidas por el puntaje online y el batch.
+
+El perfil de gustos (géneros, directores y trama) y la mezcla ponderada de los
+scores se definen una sola vez acá; rank_movies las aplica a un perfil y el
+modo batch a muchos perfiles a la vez con operaciones matriciales.
+"""
+
+from collections import Counter, namedtuple
+
+import numpy as np
+
+FINAL_COLUMNS = [
+    'movie_id_str', 'title', 'poster', 'plot', 'fullplot', 'cast', 'directors',
+    'writers', 'formatted_genres', 'imdb_rating', 'year', 'runtime', 'genres', 'imdb',
+    'predicted_score', 'match_reason', 'social_score_A', 'quality_score_B', 'bonus_score_C'
+]
+
+COLD_START_MIN_RATINGS = 10
+NEIGHBORS_MIN_RATINGS = 30
+POOL_SIZE = 50
+
+# Pesos de contenido: género, director, trama
+W_GENRE, W_DIRECTOR, W_PLOT = 0.3, 0.2, 0.5
+
+COMMUNITY_LABEL, FACTORS_LABEL, CONTENT_LABEL = "Tu Comunidad", "Perfiles Similares", "Tus Gustos"
+MIN_PLOT_CORPUS = 50
+
+TasteProfile = namedtuple('TasteProfile', ['top_genres', 'top_directors', 'plot_corpus', 'liked_titles'])
+
+def build_taste_profile(user_history):
+    """Géneros (top 5) y directores (top 3) de lo que calificó con 7+, y trama de lo que calificó con 8+"""
+    score_col = 'user_score' if 'user_score' in user_history.columns else 'score'
+    genres_col = 'genres' if 'genres' in user_history.columns else 'formatted_genres'
+    if 'timestamp' in user_history.columns:
+        # Lo más reciente primero: los empates de most_common no dependen de cómo se armó el historial
+        # (filtro sobre la tabla del snapshot, groupby del batch o agregación en Mongo)
+        user_history = user_history.sort_values('timestamp', ascending=False, kind='stable')
+
+    liked_movies = user_history[user_history[score_col] >= 7]
+    favorite_genres_list = []
+    for genres_str in liked_movies[genres_col].dropna():
+        favorite_genres_list.extend([genre.strip() for genre in str(genres_str).split(',') if genre.strip()])
+    top_genres = [g[0] for g in Counter(favorite_genres_list).most_common(5)] if favorite_genres_list else []
+
+    directors_list = []
+    if 'directors' in liked_movies.columns:
+        for d_list in liked_movies['directors']:
+            if isinstance(d_list, list): directors_list.extend(d_list)
+    top_directors = [d[0] for d in Counter(directors_list).most_common(3)] if directors_list else []
+
+    loved_movies = user_history[user_history[score_col] >= 8]
+    plot_corpus = " ".join(loved_movies['plot'].astype(str).tolist()) if 'plot' in loved_movies.columns else ""
+
+    liked_titles = liked_movies['title_norm'].tolist() if 'title_norm' in liked_movies.columns else []
+    return TasteProfile(top_genres, top_directors, plot_corpus, liked_titles)
+
+def mode_weights(has_neighbors, has_factors=False):
+    """(peso social, peso contenido, peso calidad, etiqueta del modo).
+    Sin vecinos, el término social puede venir del modelo de factores (factors.py)"""
+    if has_neighbors:
+        return 0.8, 0.15, 0.05, COMMUNITY_LABEL
+    if has_factors:
+        return 0.5, 0.35, 0.15, FACTORS_LABEL
+    return 0.0, 0.7, 0.3, CONTENT_LABEL
+
+def blend(score_social, score_genre, score_director, score_plot, score_quality, has_neighbors, has_factors=False):
+    """Puntaje final ponderado; acepta escalares o arreglos de igual forma"""
+    w_social, w_content, w_quality, _ = mode_weights(has_neighbors, has_factors)
+    content = (score_genre * W_GENRE) + (score_director * W_DIRECTOR) + (score_plot * W_PLOT)
+    return (score_social * w_social) + (content * w_content) + (score_quality * w_quality)
+
+def top_k(scores, k):
+    """Posiciones de los `k` puntajes más altos, de mayor a menor, sin ordenar el arreglo completo.
+    Los empates se resuelven por posición, igual que un ordenamiento estable de todo el arreglo"""
+    k = min(k, len(scores))
+    if k <= 0: return np.empty(0, dtype=np.int64)
+    kth = scores[np.argpartition(-scores, k - 1)[k - 1]]
+    above = np.flatnonzero(scores > kth)
+    top = np.concatenate([above, np.flatnonzero(scores == kth)[:k - len(above)]])
+    return top[np.argsort(-scores[top], kind='stable')]
+
+def match_reasons(score_social, score_director, score_plot, score_genre, mode_label):
+    conditions = [
+        (score_social > 0.7, 'A perfiles como el tuyo les gusta' if mode_label == FACTORS_LABEL else 'Tu comunidad la recomienda'),
+        (score_director > 0, 'De tu director favorito'),
+        (score_plot > 0.15, 'Trama similar a lo que ves'),
+        (score_genre > 0.5, 'De tus géneros top')
+    ]
+    return np.select([c[0] for c in conditions], [c[1] for c in conditions], default=f'Basado en {mode_label}')
@@ -0,0 +1,348 @@
+# -*- coding: utf-8 -*-
+"""Catálogo compartido entre workers de proceso (SCORING_EXECUTOR=process o shared) y artefacto precalculado.
+
+El proceso padre es el único que lee Mongo y arma el snapshot. Cada versión se
+publica en un directorio propio: las matrices (géneros, directores, rating,
+calificaciones en CSR y CSC, TF-IDF, embeddings ANN) como `.npy` sin comprimir
+y lo que son objetos Python (catálogo, vocabularios, claves) en pickles chicos.
+Los workers abren los `.npy` con mmap de solo lectura, así que las páginas son
+las mismas para todos (las del page cache) y la memoria no crece con la cantidad
+de workers. La tabla de interacciones sólo la carga un worker que la necesite
+(batch o historial sin Mongo).
+
+Un refresco incremental del snapshot (unas pocas calificaciones nuevas) no
+reescribe lo que no cambió: catálogo, features e índices se enlazan con hard
+links, la matriz de calificaciones se escribe de nuevo (arreglos, sin pickle) y
+la tabla y las interacciones se publican como la base anterior más un delta con
+las filas nuevas. Cada MAX_DELTAS refrescos, o tras una carga completa, se
+escriben enteras otra vez.
+
+El archivo CURRENT apunta a la versión vigente y se reemplaza con os.replace:
+un worker ve la versión anterior completa o la nueva completa, nunca una mezcla.
+Las versiones viejas se borran; en Linux un archivo borrado sigue válido para
+quien ya lo tiene mapeado.
+
+El mismo formato sirve de artefacto de arranque: build_artifact.py publica una
+versión completa (con las interacciones y el cursor del refresco incremental) y
+el servicio la restaura al iniciar en lugar de leer todo Mongo y reajustar los
+índices.
+"""
+
+import json
+import os
+import pickle
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from ann import IVFIndex
+from data import compact_table, dedupe_interactions
+from features import CatalogFeatures
+from metrics import span
+from plot_index import PlotIndex
+from snapshot import SnapshotState
+from social import RatingMatrix
+
+CURRENT = 'CURRENT'
+# Formato en disco: una versión escrita con otro formato no se abre
+ARTIFACT_FORMAT = 2
+# Deltas de tabla/interacciones acumulados antes de volver a escribir la base completa
+MAX_DELTAS = 30
+
+def _save_sparse(directory, prefix, matrix):
+    for part in ('data', 'indices', 'indptr'):
+        np.save(os.path.join(directory, f'{prefix}_{part}.npy'), getattr(matrix, part))
+
+def _load_sparse(directory, prefix, shape, kind=sp.csr_matrix):
+    arr = lambda part: np.load(os.path.join(directory, f'{prefix}_{part}.npy'), mmap_mode='r')
+    return kind((arr('data'), arr('indices'), arr('indptr')), shape=tuple(shape), copy=False)
+
+def _dump(path, obj):
+    with open(path, 'wb') as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+def _undump(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+# --- ESCRITURA DE CADA PARTE ---
+
+def _write_features(path, features):
+    os.makedirs(path)
+    _save_sparse(path, 'genres', features.genres)
+    _save_sparse(path, 'directors', features.directors)
+    np.save(os.path.join(path, 'imdb_rating.npy'), features.imdb_rating)
+    _dump(os.path.join(path, 'meta.pkl'), {
+        'titles': features.titles, 'genre_vocab': features.genre_vocab, 'director_vocab': features.director_vocab,
+        'genres_shape': features.genres.shape, 'directors_shape': features.directors.shape,
+    })
+
+def _read_features(path):
+    meta = _undump(os.path.join(path, 'meta.pkl'))
+    return CatalogFeatures(
+        titles=meta['titles'],
+        genres=_load_sparse(path, 'genres', meta['genres_shape']), genre_vocab=meta['genre_vocab'],
+        directors=_load_sparse(path, 'directors', meta['directors_shape']), director_vocab=meta['director_vocab'],
+        imdb_rating=np.load(os.path.join(path, 'imdb_rating.npy'), mmap_mode='r'),
+    )
+
+def _write_ratings(path, ratings):
+    os.makedirs(path)
+    _save_sparse(path, 'csr', ratings.csr)
+    _save_sparse(path, 'csc', ratings.csc)
+    _dump(os.path.join(path, 'meta.pkl'), {'profiles': ratings.profiles, 'items': ratings.items, 'shape': ratings.csr.shape})
+
+def _read_ratings(path):
+    meta = _undump(os.path.join(path, 'meta.pkl'))
+    csr = _load_sparse(path, 'csr', meta['shape'])
+    csc = _load_sparse(path, 'csc', meta['shape'], kind=sp.csc_matrix)
+    return RatingMatrix(meta['profiles'], meta['items'], csr, csc=csc)
+
+def _read_ann(path):
+    return IVFIndex.load(path)[0]
+
+def _write_frame(path, df):
+    """Base completa de una parte incremental (tabla o interacciones)"""
+    os.makedirs(path)
+    _dump(os.path.join(path, 'base.pkl'), df)
+
+def _deltas(path):
+    return sorted(f for f in os.listdir(path) if f.startswith('delta-'))
+
+def _write_delta(path, version, df):
+    _dump(os.path.join(path, f'delta-{version:09d}.pkl'), df)
+
+def _read_frame(path):
+    """Base más los deltas, combinados igual que en el refresco del snapshot"""
+    frame = _undump(os.path.join(path, 'base.pkl'))
+    deltas = [_undump(os.path.join(path, name)) for name in _deltas(path)]
+    if not deltas: return frame
+    return compact_table(dedupe_interactions(pd.concat([frame, *deltas], ignore_index=True)))
+
+# parte -> (archivo o directorio, escribir(ruta, objeto), leer(ruta))
+PARTS = {
+    'movies': ('movies.pkl', lambda path, df: _dump(path, df), _undump),
+    'features': ('features', _write_features, _read_features),
+    'ratings': ('ratings', _write_ratings, _read_ratings),
+    'plot_index': ('plot_index', lambda path, index: index.save(path), PlotIndex.load),
+    'ann_index': ('ann_index', lambda path, index: index.save(path), _read_ann),
+    'table': ('table', _write_frame, _read_frame),
+    'interactions': ('interactions', _write_frame, _read_frame),
+}
+# Se leen recién cuando alguien las usa
+LAZY_PARTS = ('table', 'interactions')
+# Partes que un refresco incremental publica como delta: parte -> filas nuevas en el estado
+DELTA_PARTS = {'table': 'changed_rows', 'interactions': 'changed_interactions'}
+
+def _link(source, target):
+    """Hard link de un archivo o de los archivos de un directorio (partes que no cambiaron)"""
+    if os.path.isdir(source):
+        os.makedirs(target)
+        for name in os.listdir(source):
+            os.link(os.path.join(source, name), os.path.join(target, name))
+    else:
+        os.link(source, target)
+
+def _size(path):
+    if os.path.isfile(path): return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+# --- PUBLICACIÓN (proceso padre) ---
+
+class SharedCatalog:
+    """Publica cada versión del snapshot en `directory` para que la lean los workers"""
+
+    def __init__(self, directory, keep=2, clear=True):
+        self.directory = directory
+        self.keep = max(1, keep)
+        self._lock = threading.Lock()
+        # parte -> (objeto publicado, ruta): si el objeto no cambió se enlaza en vez de reescribirlo
+        self._published = {}
+        # Versión del snapshot publicada por última vez: un delta sólo sigue a la versión anterior
+        self._state_version = None
+        self.version = None
+        self.published_at = None
+        self.publish_seconds = None
+        self.reused = []
+        # Para los workers el directorio es de este proceso: lo de una corrida anterior no sirve.
+        # El artefacto de arranque (clear=False) conserva la versión vigente hasta reemplazarla
+        if clear: shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+
+    def publish(self, state, plot_index=None, ann_index=None):
+        """Escribe la versión de `state` y la deja vigente. Devuelve el nombre de la versión"""
+        if not state.loaded or state.features is None: return None
+        with self._lock, span("shared_publish"):
+            start = time.perf_counter()
+            # Ordenable por fecha de publicación (la versión del snapshot reinicia con cada proceso)
+            name = f"v{int(time.time() * 1000):013d}-{state.version:06d}"
+            tmp = os.path.join(self.directory, f".{name}.tmp-{os.getpid()}")
+            shutil.rmtree(tmp, ignore_errors=True)
+            os.makedirs(tmp)
+
+            objects = {'movies': state.movies, 'features': state.features, 'ratings': state.ratings,
+                       'plot_index': plot_index, 'ann_index': ann_index, 'table': state.table,
+                       'interactions': state.interactions}
+            incremental = state.changed_profiles is not None and self._state_version == state.version - 1
+            reused, published = [], {}
+            for part, obj in objects.items():
+                if obj is None: continue
+                filename, write, _ = PARTS[part]
+                target = os.path.join(tmp, filename)
+                previous = self._published.get(part)
+                delta = getattr(state, DELTA_PARTS[part]) if part in DELTA_PARTS and incremental else None
+                if previous is not None and os.path.exists(previous[1]) and (
+                        previous[0] is obj or (delta is not None and len(_deltas(previous[1])) < MAX_DELTAS)):
+                    try:
+                        _link(previous[1], target)
+                        if previous[0] is obj:
+                            reused.append(part)
+                        else:
+                            _write_delta(target, state.version, delta)
+                            reused.append(f"{part}+delta")
+                    except OSError:
+                        shutil.rmtree(target, ignore_errors=True)
+                        write(target, obj)
+                else:
+                    write(target, obj)
+                published[part] = (obj, os.path.join(self.directory, name, filename))
+
+            # Cursor del refresco incremental (los _id pueden ser ObjectId: van en pickle)
+            _dump(os.path.join(tmp, 'cursor.pkl'), {'last_movie_id': state.last_movie_id, 'last_interaction_id': state.last_interaction_id})
+            with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+                json.dump({'format': ARTIFACT_FORMAT, 'version': state.version, 'parts': sorted(published),
+                           'loaded_at': state.loaded_at, 'published_at': time.time()}, f)
+            final = os.path.join(self.directory, name)
+            shutil.rmtree(final, ignore_errors=True)
+            os.rename(tmp, final)
+
+            # Cambio atómico de versión vigente
+            pointer = os.path.join(self.directory, f".{CURRENT}.tmp-{os.getpid()}")
+            with open(pointer, 'w', encoding='utf-8') as f:
+                f.write(name)
+            os.replace(pointer, os.path.join(self.directory, CURRENT))
+
+            self._published = published
+            self._state_version = state.version
+            self.version, self.reused = name, reused
+            self.published_at = time.time()
+            self.publish_seconds = time.perf_counter() - start
+            self._cleanup()
+            print(f"🗄️ Catálogo compartido {name} publicado en {self.publish_seconds:.2f}s (reutilizado: {reused or 'nada'})")
+            return name
+
+    def _cleanup(self):
+        versions = sorted(d for d in os.listdir(self.directory) if d.startswith('v'))
+        for old in versions[:-self.keep]:
+            shutil.rmtree(os.path.join(self.directory, old), ignore_errors=True)
+
+    def on_snapshot(self, state, plot_index=None, ann_index=None):
+        try:
+            self.publish(state, plot_index, ann_index)
+        except Exception as e:
+            print(f"⚠️ No se pudo publicar el catálogo compartido: {e}")
+
+    def stats(self):
+        current = os.path.join(self.directory, self.version) if self.version else None
+        return {
+            "directory": self.directory,
+            "version": self.version,
+            "age_seconds": round(time.time() - self.published_at, 3) if self.published_at else None,
+            "publish_seconds": round(self.publish_seconds, 3) if self.publish_seconds is not None else None,
+            "reused_parts": self.reused,
+            "bytes": _size(current) if current and os.path.exists(current) else 0,
+        }
+
+# --- LECTURA (workers) ---
+
+class StaleVersionError(Exception):
+    """La versión publicada se borró antes de que el worker terminara de leerla"""
+
+class SharedState:
+    """Versión publicada vista desde un worker; mismos atributos que SnapshotState para el puntaje"""
+
+    changed_profiles = None
+
+    def __init__(self, path, name):
+        self.path = path
+        self.name = name
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('format') != ARTIFACT_FORMAT:
+            raise ValueError(f"formato {meta.get('format')} (se espera {ARTIFACT_FORMAT})")
+        self.version = meta['version']
+        self.loaded_at = meta.get('loaded_at', meta['published_at'])
+        self.published_at = meta['published_at']
+        self.parts = set(meta['parts'])
+        self.movies = self._read('movies')
+        self.features = self._read('features')
+        self.ratings = self._read('ratings')
+        self.plot_index = self._read('plot_index')
+        self.ann_index = self._read('ann_index')
+        self._lazy = {}
+
+    def _read(self, part):
+        return PARTS[part][2](os.path.join(self.path, PARTS[part][0])) if part in self.parts else None
+
+    def _lazy_part(self, part):
+        if part not in self._lazy:
+            try:
+                value = self._read(part)
+            except OSError as e:
+                # Una tabla vacía puntuaría a todos como Cold Start: que el llamador relea CURRENT o use Mongo
+                raise StaleVersionError(f"La versión {self.name} del catálogo compartido ya no está: {e}") from e
+            self._lazy[part] = value if value is not None else pd.DataFrame()
+        return self._lazy[part]
+
+    @property
+    def loaded(self):
+        return self.movies is not None and not self.movies.empty
+
+    @property
+    def table(self):
+        """Tabla de interacciones, leída recién cuando un worker la usa"""
+        return self._lazy_part('table')
+
+    @property
+    def interactions(self):
+        return self._lazy_part('interactions')
+
+    def snapshot_state(self):
+        """SnapshotState completo para retomar el snapshot desde esta versión (refresco incremental incluido)"""
+        cursor = _undump(os.path.join(self.path, 'cursor.pkl'))
+        return SnapshotState(
+            movies=self.movies, interactions=self.interactions, table=self.table,
+            features=self.features, ratings=self.ratings, version=self.version,
+            last_movie_id=cursor['last_movie_id'], last_interaction_id=cursor['last_interaction_id'],
+            loaded_at=self.loaded_at, refreshed_at=self.published_at,
+        )
+
+def load_artifact(directory):
+    """Versión vigente del artefacto de arranque en `directory`, o None si no hay una utilizable"""
+    if not directory or not os.path.exists(os.path.join(directory, CURRENT)): return None
+    return SharedCatalogReader(directory).current()
+
+class SharedCatalogReader:
+    """Sigue a CURRENT y cambia de versión entre requests, nunca a mitad de uno"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.state = None
+
+    def current(self, empty=None):
+        try:
+            with open(os.path.join(self.directory, CURRENT), encoding='utf-8') as f:
+                name = f.read().strip()
+        except FileNotFoundError:
+            return self.state or empty
+        if self.state is None or self.state.name != name:
+            try:
+                self.state = SharedState(os.path.join(self.directory, name), name)
+            except Exception as e:
+                # Si la versión nueva no se puede abrir se sigue con la anterior
+                print(f"⚠️ No se pudo abrir la versión {name} del catálogo compartido: {e}")
+        return self.state or empty
@@ -0,0 +1,368 @@
+# -*- coding: utf-8 -*-
+"""Snapshot en memoria del catálogo y las interacciones.
+
+Se construye una vez al arrancar y se mantiene al día con un sondeo
+incremental por `_id` (las interacciones sólo se insertan, nunca se editan).
+Cada cierto tiempo se hace una resincronización completa para reflejar
+ediciones o borrados en el catálogo.
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field, replace
+
+import pandas as pd
+from bson import ObjectId
+
+from data import (
+    MOVIE_FIELDS, INTERACTION_FIELDS, DISPLAY_FIELDS, INTERACTION_INDEXES, history_pipeline,
+    build_movies_frame, build_interactions_frame, dedupe_interactions,
+    prepare_movies, prepare_data, compact_movies, compact_table,
+)
+from features import CatalogFeatures
+from metrics import span
+from social import RatingMatrix
+
+MONGO_DB = "movies_db"
+MONGO_INTERACTIONS_DB = "opiniones_db"
+# Documentos por lote del cursor (un round trip por lote en vez de los 101 iniciales + 4MB)
+FETCH_BATCH_SIZE = 5000
+
+# --- FUENTES DE DATOS ---
+
+class MongoSource:
+    """Lee películas e interacciones desde MongoDB"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def _fetch(self, collection, projection, after_id=None):
+        query = {'_id': {'$gt': after_id}} if after_id is not None else {}
+        return list(collection.find(query, projection).sort('_id', 1).batch_size(FETCH_BATCH_SIZE))
+
+    def fetch_movies(self, after_id=None):
+        return self._fetch(self.client[MONGO_DB]['movies'], MOVIE_FIELDS, after_id)
+
+    def fetch_interactions(self, after_id=None):
+        return self._fetch(self.client[MONGO_INTERACTIONS_DB]['interactions'], INTERACTION_FIELDS, after_id)
+
+    def fetch_history(self, user_id, profile_name):
+        """Última calificación por título de un perfil, agregada en el servidor"""
+        return list(self.client[MONGO_INTERACTIONS_DB]['interactions'].aggregate(history_pipeline(user_id, profile_name)))
+
+    def ensure_indexes(self):
+        """Crea los índices de interacciones que falten (create_index no hace nada si ya existen)"""
+        collection = self.client[MONGO_INTERACTIONS_DB]['interactions']
+        created = []
+        for keys, name in INTERACTION_INDEXES:
+            try:
+                created.append(collection.create_index(keys, name=name))
+            except Exception as e:
+                print(f"⚠️ No se pudo crear el índice {name}: {e}")
+        return created
+
+    def fetch_display(self, movie_ids):
+        """Campos de presentación de las películas pedidas por movie_id_str"""
+        keys = [ObjectId(i) if ObjectId.is_valid(i) else i for i in movie_ids]
+        projection = dict.fromkeys(DISPLAY_FIELDS, 1)
+        return list(self.client[MONGO_DB]['movies'].find({'_id': {'$in': keys}}, projection))
+
+def _project(doc, fields):
+    """Aplica una proyección de inclusión de Mongo (admite campos anidados 'a.b')"""
+    out = {}
+    for field in fields:
+        head, _, rest = field.partition('.')
+        if head not in doc: continue
+        if not rest: out[head] = doc[head]
+        elif isinstance(doc[head], dict) and rest in doc[head]: out.setdefault(head, {})[rest] = doc[head][rest]
+    return out
+
+class MemorySource:
+    """Fuente local en memoria: reemplaza a Mongo en pruebas y benchmarks (con las mismas proyecciones)"""
+
+    def __init__(self, movies=None, interactions=None):
+        self.movies = []
+        self.interactions = []
+        # Proyectados al agregarlos: en Mongo la proyección la hace el servidor, no la carga
+        self._projected = {'movies': [], 'interactions': []}
+        # Interacciones por (user_id, profile_name): lo que resuelve el índice en Mongo
+        self._by_profile = {}
+        for doc in movies or []: self.add_movie(doc)
+        for doc in interactions or []: self.add_interaction(doc)
+
+    def _append(self, kind, doc, projection):
+        docs = getattr(self, kind)
+        doc = dict(doc)
+        doc.setdefault('_id', docs[-1]['_id'] + 1 if docs else 1)
+        docs.append(doc)
+        self._projected[kind].append(_project(doc, projection))
+        return doc
+
+    def add_movie(self, doc):
+        return self._append('movies', doc, MOVIE_FIELDS)
+
+    def add_interaction(self, doc):
+        doc = self._append('interactions', doc, INTERACTION_FIELDS)
+        self._by_profile.setdefault((doc.get('user_id'), doc.get('profile_name')), []).append(self._projected['interactions'][-1])
+        return doc
+
+    def _after(self, kind, after_id):
+        docs = self._projected[kind]
+        if after_id is None: return list(docs)
+        return [d for d in docs if d['_id'] > after_id]
+
+    def fetch_movies(self, after_id=None):
+        return self._after('movies', after_id)
+
+    def fetch_interactions(self, after_id=None):
+        return self._after('interactions', after_id)
+
+    def fetch_history(self, user_id, profile_name):
+        # La deduplicación por título la completa build_interactions_frame, como con Mongo
+        return list(self._by_profile.get((user_id, profile_name), []))
+
+    def ensure_indexes(self):
+        return []
+
+    def fetch_display(self, movie_ids):
+        wanted = set(movie_ids)
+        return [_project(d, ('_id',) + DISPLAY_FIELDS) for d in self.movies if str(d['_id']) in wanted]
+
+# --- SNAPSHOT ---
+
+@dataclass(frozen=True)
+class SnapshotState:
+    """Vista inmutable del snapshot: los lectores toman una y no ven cambios a mitad de request"""
+    movies: pd.DataFrame
+    interactions: pd.DataFrame
+    table: pd.DataFrame
+    features: CatalogFeatures = None
+    ratings: RatingMatrix = None
+    # Perfiles (user_id, profile_name) que calificaron en el último refresco; None tras una carga completa
+    changed_profiles: frozenset = None
+    # Filas nuevas del table en el último refresco (ya cruzadas con el catálogo); None tras una carga completa
+    changed_rows: pd.DataFrame = None
+    # Interacciones nuevas del último refresco, como quedaron en `interactions`; None tras una carga completa
+    changed_interactions: pd.DataFrame = None
+    # Tras una carga completa: perfiles con interacciones posteriores al cursor del estado anterior, que el
+    # sondeo incremental no llegó a ver; None en la primera carga y en los refrescos incrementales
+    missed_profiles: frozenset = None
+    version: int = 0
+    last_movie_id: object = None
+    last_interaction_id: object = None
+    loaded_at: float = field(default_factory=time.time)
+    refreshed_at: float = field(default_factory=time.time)
+
+    @property
+    def loaded(self):
+        return not self.movies.empty
+
+EMPTY_STATE = SnapshotState(pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), loaded_at=0.0, refreshed_at=0.0)
+
+def _last_id(docs, current):
+    return docs[-1]['_id'] if docs else current
+
+def _profiles_after(docs, after_id):
+    """Perfiles de los documentos con `_id` posterior a `after_id` (vienen ordenados por `_id`)"""
+    profiles = set()
+    for doc in reversed(docs):
+        if doc['_id'] <= after_id: break
+        profiles.add((doc.get('user_id'), doc.get('profile_name')))
+    return frozenset(profiles)
+
+class CatalogSnapshot:
+    def __init__(self, source, refresh_interval=30.0, full_resync_interval=3600.0):
+        self.source = source
+        self.refresh_interval = refresh_interval
+        self.full_resync_interval = full_resync_interval
+        self.state = EMPTY_STATE
+        self._lock = threading.Lock()
+        self._initial = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """Registra `callback(state)`, que se invoca cada vez que cambia la versión del snapshot"""
+        self._listeners.append(callback)
+
+    def _publish(self, state):
+        for callback in self._listeners:
+            try:
+                callback(state)
+            except Exception as e:
+                print(f"⚠️ Error en listener del snapshot: {e}")
+
+    def load(self):
+        """Carga completa del catálogo y las interacciones"""
+        state = self._load()
+        self._publish(state)
+        return state
+
+    def ensure_loaded(self):
+        """Carga completa sólo si todavía no hay datos (quien llega durante una carga espera esa misma)"""
+        with self._initial:
+            if not self.state.loaded: self.load()
+        return self.state
+
+    def restore(self, state):
+        """Retoma el snapshot desde un estado ya armado (artefacto precalculado); el refresco sigue desde su cursor.
+
+        La resincronización completa se cuenta desde la restauración: con la fecha de
+        carga del artefacto, uno más viejo que `full_resync_interval` dispararía una
+        carga completa de Mongo en el primer sondeo.
+        """
+        state = replace(state, loaded_at=time.time())
+        with self._lock:
+            self.state = state
+        self._publish(state)
+        return state
+
+    def refresh(self):
+        """Aplica sólo los documentos nuevos desde el último `_id` visto"""
+        if not self.state.loaded:
+            return self.load()
+        previous = self.state.version
+        with span("snapshot_refresh"):
+            state = self._refresh()
+        if state.version != previous:
+            self._publish(state)
+        return state
+
+    def user_history(self, user_id, profile_name, state=None):
+        """Historial de un perfil leído de la fuente y cruzado con el catálogo del snapshot.
+
+        Devuelve las mismas columnas que `state.table` pero sin recorrer las
+        interacciones de otros perfiles. None si la fuente no responde (el llamador
+        filtra entonces la tabla del snapshot).
+        """
+        state = state or self.state
+        try:
+            docs = self.source.fetch_history(user_id, profile_name)
+        except Exception as e:
+            print(f"⚠️ No se pudo leer el historial de {user_id}/{profile_name}: {e}")
+            return None
+        history = build_interactions_frame(docs)
+        return prepare_data(state.movies, history) if not state.movies.empty else pd.DataFrame()
+
+    def _load(self):
+        with self._lock:
+            with span("mongo_load"):
+                movie_docs = self.source.fetch_movies()
+                interaction_docs = self.source.fetch_interactions()
+
+            with span("prepare_data"):
+                movies = build_movies_frame(movie_docs)
+                if not movies.empty: movies = compact_movies(prepare_movies(movies))
+                interactions = compact_table(build_interactions_frame(interaction_docs))
+                table = compact_table(prepare_data(movies, interactions.copy())) if not movies.empty else pd.DataFrame()
+            with span("snapshot_features"):
+                features = CatalogFeatures.from_movies(movies) if not movies.empty else None
+                ratings = RatingMatrix.from_table(table)
+
+            previous = self.state.last_interaction_id
+            missed = _profiles_after(interaction_docs, previous) if previous is not None else None
+            now = time.time()
+            self.state = SnapshotState(
+                movies=movies, interactions=interactions, table=table, features=features, ratings=ratings,
+                missed_profiles=missed, version=self.state.version + 1,
+                last_movie_id=_last_id(movie_docs, None),
+                last_interaction_id=_last_id(interaction_docs, None),
+                loaded_at=now, refreshed_at=now,
+            )
+            return self.state
+
+    def _refresh(self):
+        with self._lock:
+            state = self.state
+            with span("mongo_refresh"):
+                movie_docs = self.source.fetch_movies(state.last_movie_id)
+                interaction_docs = self.source.fetch_interactions(state.last_interaction_id)
+
+            if not movie_docs and not interaction_docs:
+                self.state = replace(state, refreshed_at=time.time())
+                return self.state
+
+            movies = state.movies
+            interactions = state.interactions
+            table = state.table
+            features = state.features
+            ratings = state.ratings
+
+            if movie_docs:
+                new_movies = build_movies_frame(movie_docs)
+                if not new_movies.empty:
+                    new_movies = compact_movies(prepare_movies(new_movies))
+                    # Ante títulos repetidos gana la película ya cargada
+                    movies = pd.concat([movies, new_movies], ignore_index=True)
+                    movies = movies.drop_duplicates(subset=['title_norm'], keep='first').reset_index(drop=True)
+                    features = CatalogFeatures.from_movies(movies)
+
+            if interaction_docs:
+                new_interactions = build_interactions_frame(interaction_docs)
+                interactions = compact_table(dedupe_interactions(pd.concat([interactions, new_interactions], ignore_index=True)))
+
+            if movie_docs:
+                # Películas nuevas pueden completar interacciones que antes no cruzaban: se recalcula la tabla
+                table = compact_table(prepare_data(movies, interactions.copy()))
+                ratings = RatingMatrix.from_table(table)
+                changed_profiles = changed_rows = changed_interactions = None
+            else:
+                new_rows = prepare_data(movies, new_interactions.copy())
+                table = compact_table(dedupe_interactions(pd.concat([table, new_rows], ignore_index=True)))
+                changed_rows = dedupe_interactions(new_rows)
+                changed_interactions = new_interactions
+                ratings = ratings.apply(changed_rows)
+                changed_profiles = frozenset(zip(new_interactions['user_id'], new_interactions['profile_name'])) \
+                    if {'user_id', 'profile_name'} <= set(new_interactions.columns) else frozenset()
+
+            self.state = replace(
+                state, movies=movies, interactions=interactions, table=table, features=features, ratings=ratings,
+                changed_profiles=changed_profiles, changed_rows=changed_rows,
+                changed_interactions=changed_interactions, missed_profiles=None, version=state.version + 1,
+                last_movie_id=_last_id(movie_docs, state.last_movie_id),
+                last_interaction_id=_last_id(interaction_docs, state.last_interaction_id),
+                refreshed_at=time.time(),
+            )
+            return self.state
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                if time.time() - self.state.loaded_at >= self.full_resync_interval:
+                    self.load()
+                else:
+                    self.refresh()
+            except Exception as e:
+                print(f"⚠️ Error al refrescar el snapshot: {e}")
+
+    def start(self):
+        """Inicia el refresco periódico en segundo plano"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="snapshot-refresh", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        state = self.state
+        now = time.time()
+        return {
+            "loaded": state.loaded,
+            "version": state.version,
+            "age_seconds": round(now - state.loaded_at, 3) if state.loaded else None,
+            "last_refresh_seconds": round(now - state.refreshed_at, 3) if state.loaded else None,
+            "movies": len(state.movies),
+            "interactions": len(state.interactions),
+            "table_rows": len(state.table),
+            "rating_matrix": {
+                "profiles": len(state.ratings.profiles), "titles": len(state.ratings.items), "nnz": state.ratings.nnz,
+            } if state.ratings is not None else None,
+            "memory_bytes": int(
+                state.movies.memory_usage(deep=True).sum() +
+                state.interactions.memory_usage(deep=True).sum() +
+                state.table.memory_usage(deep=True).sum()
+            ),
+        }
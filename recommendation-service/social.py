@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""Matriz dispersa perfil x título para la búsqueda de vecinos.
+
+Los perfiles (user_id, profile_name) y los títulos normalizados se codifican
+como enteros. La matriz se guarda en CSR (filas = perfiles) y CSC (columnas =
+títulos), así el costo de buscar vecinos depende de cuántas calificaciones
+tiene el usuario objetivo y de cuántas personas vieron esos títulos, no del
+total de interacciones.
+"""
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+def _concat_ranges(starts, lengths):
+    """Índices de todos los rangos [start, start + length) concatenados, sin bucles Python"""
+    total = int(lengths.sum())
+    if total == 0: return np.empty(0, dtype=np.int64)
+    shifts = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return np.arange(total, dtype=np.int64) + shifts
+
+class RatingMatrix:
+    def __init__(self, profiles, items, matrix, csc=None):
+        self.profiles = profiles
+        self.items = items
+        self.item_titles = np.empty(len(items), dtype=object)
+        self.item_titles[list(items.values())] = list(items.keys())
+        if csc is not None:
+            # Ya armada (p. ej. abierta con mmap desde el catálogo compartido): se usa tal cual
+            self.csr, self.csc = matrix, csc
+            return
+        self.csr = matrix.tocsr()
+        # Un cero explícito se confundiría con una nota
+        self.csr.eliminate_zeros()
+        self.csc = self.csr.tocsc()
+
+    @staticmethod
+    def _rows(table, score_col):
+        if table.empty or score_col not in table.columns:
+            return None
+        rows = table[['user_id', 'profile_name', 'title_norm', score_col]].dropna()
+        # La tabla ya viene con la calificación más reciente primero
+        return rows.drop_duplicates(subset=['user_id', 'profile_name', 'title_norm'], keep='first')
+
+    @classmethod
+    def from_table(cls, table, score_col='user_score'):
+        """Construye la matriz a partir de la tabla preparada del snapshot"""
+        rows = cls._rows(table, score_col)
+        if rows is None or rows.empty:
+            return cls({}, {}, sp.csr_matrix((0, 0), dtype=np.float32))
+
+        profile_codes, profile_keys = pd.factorize(pd.MultiIndex.from_arrays([rows['user_id'], rows['profile_name']]))
+        item_codes, item_keys = pd.factorize(rows['title_norm'])
+        matrix = sp.csr_matrix(
+            (rows[score_col].to_numpy(dtype=np.float32), (profile_codes, item_codes)),
+            shape=(len(profile_keys), len(item_keys)),
+        )
+        return cls(
+            {key: i for i, key in enumerate(profile_keys)},
+            {key: i for i, key in enumerate(item_keys)},
+            matrix,
+        )
+
+    def apply(self, table, score_col='user_score'):
+        """Devuelve una matriz nueva con las calificaciones de `table` agregadas (o reemplazadas)"""
+        rows = self._rows(table, score_col)
+        if rows is None or rows.empty:
+            return self
+
+        profiles = dict(self.profiles)
+        items = dict(self.items)
+        profile_codes = np.fromiter(
+            (profiles.setdefault(key, len(profiles)) for key in zip(rows['user_id'], rows['profile_name'])),
+            dtype=np.int64, count=len(rows),
+        )
+        item_codes = np.fromiter(
+            (items.setdefault(key, len(items)) for key in rows['title_norm']),
+            dtype=np.int64, count=len(rows),
+        )
+        shape = (len(profiles), len(items))
+
+        delta = sp.csr_matrix((rows[score_col].to_numpy(dtype=np.float32), (profile_codes, item_codes)), shape=shape)
+        previous = self.csr.copy()
+        previous.resize(shape)
+        # Las notas nuevas pisan a las anteriores del mismo (perfil, título)
+        overwritten = previous.multiply(delta > 0)
+        return RatingMatrix(profiles, items, (previous - overwritten + delta).tocsr())
+
+    @property
+    def nnz(self):
+        return self.csr.nnz
+
+    def neighbors(self, user_id, profile_name, tolerance=1, min_shared=5):
+        """Perfiles que calificaron al menos `min_shared` títulos en común a ±`tolerance` puntos"""
+        row = self.profiles.get((user_id, profile_name))
+        if row is None: return np.empty(0, dtype=np.int64)
+
+        start, end = self.csr.indptr[row], self.csr.indptr[row + 1]
+        items = self.csr.indices[start:end]
+        target_scores = self.csr.data[start:end]
+
+        starts = self.csc.indptr[items]
+        lengths = self.csc.indptr[items + 1] - starts
+        positions = _concat_ranges(starts, lengths)
+
+        raters = self.csc.indices[positions]
+        diffs = np.abs(self.csc.data[positions] - np.repeat(target_scores, lengths))
+        agree = raters[(diffs <= tolerance) & (raters != row)]
+
+        candidates, counts = np.unique(agree, return_counts=True)
+        return candidates[counts >= min_shared]
+
+    def social_scores(self, neighbor_rows, min_score=6):
+        """Promedio de las notas >= `min_score` de los vecinos, por título normalizado"""
+        if len(neighbor_rows) == 0: return pd.Series(dtype=np.float64)
+        block = self.csr[neighbor_rows]
+        keep = block.data >= min_score
+        cols = block.indices[keep]
+        if len(cols) == 0: return pd.Series(dtype=np.float64)
+        uniq, inverse = np.unique(cols, return_inverse=True)
+        sums = np.bincount(inverse, weights=block.data[keep])
+        counts = np.bincount(inverse)
+        return pd.Series(sums / counts, index=self.item_titles[uniq])
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""Almacén local (SQLite) de pools de recomendaciones precalculados.
+
+Lo escriben el job de precálculo (precompute.py) y el endpoint batch; el
+endpoint online lo consulta cuando el pool no está en el cache en memoria.
+Un perfil que califica algo nuevo pierde su entrada (hook del opinion-service
+o polling del snapshot) y las entradas vencen a las `max_age_seconds`.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+class PoolStore:
+    def __init__(self, path, max_age_seconds=24 * 3600.0):
+        self.path = path
+        self.max_age_seconds = max_age_seconds
+        self._conn = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return bool(self.path)
+
+    def _connection(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS pools ("
+                " email TEXT NOT NULL, profile_name TEXT NOT NULL, mode TEXT NOT NULL,"
+                " pool TEXT NOT NULL, computed_at REAL NOT NULL,"
+                " PRIMARY KEY (email, profile_name))"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _dumps(pool):
+        return pool.to_json(orient='split', index=False, default_handler=str)
+
+    @staticmethod
+    def _loads(payload):
+        data = json.loads(payload)
+        return pd.DataFrame(data['data'], columns=data['columns'])
+
+    def put_many(self, results):
+        """Guarda (email, profile_name, pool, modo) en una sola transacción; devuelve cuántos escribió"""
+        if not self.enabled: return 0
+        now = time.time()
+        rows = [(email, profile_name, mode_label, self._dumps(pool), now) for email, profile_name, pool, mode_label in results]
+        with self._lock:
+            conn = self._connection()
+            conn.executemany("INSERT OR REPLACE INTO pools VALUES (?, ?, ?, ?, ?)", rows)
+            conn.commit()
+        return len(rows)
+
+    def get(self, email, profile_name):
+        """Devuelve (pool, modo) si hay una entrada vigente; None si no"""
+        if not self.enabled: return None
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT mode, pool, computed_at FROM pools WHERE email = ? AND profile_name = ?", (email, profile_name)
+            ).fetchone()
+        if row is None or time.time() - row[2] > self.max_age_seconds:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self._loads(row[1]), row[0]
+
+    def invalidate(self, email, profile_name=None):
+        """Borra un perfil (o todos los perfiles de la cuenta si profile_name es None)"""
+        if not self.enabled: return 0
+        with self._lock:
+            conn = self._connection()
+            if profile_name is not None:
+                cursor = conn.execute("DELETE FROM pools WHERE email = ? AND profile_name = ?", (email, profile_name))
+            else:
+                cursor = conn.execute("DELETE FROM pools WHERE email = ?", (email,))
+            conn.commit()
+            return cursor.rowcount
+
+    def on_snapshot(self, state):
+        """Borra los perfiles que calificaron desde el último refresco.
+
+        Una recarga completa no vacía el almacén: los pools precalculados tienen que
+        sobrevivir a los reinicios del servicio y vencen solos por antigüedad. Sí borra
+        los perfiles que calificaron entre el último sondeo y la recarga, que ningún
+        refresco incremental informó.
+        """
+        profiles = state.changed_profiles if state.changed_profiles is not None else state.missed_profiles
+        for email, profile_name in profiles or ():
+            self.invalidate(email, profile_name)
+
+    def stats(self):
+        if not self.enabled: return {"enabled": False}
+        with self._lock:
+            entries, oldest = self._connection().execute("SELECT COUNT(*), MIN(computed_at) FROM pools").fetchone()
+        total = self.hits + self.misses
+        return {
+            "enabled": True,
+            "path": self.path,
+            "entries": entries,
+            "oldest_seconds": round(time.time() - oldest, 1) if oldest else None,
+            "max_age_seconds": self.max_age_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else None,
+        }
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""Referencia: el ranking original de recommend_movies (pandas fila a fila), sin el sorteo de las 12.
+
+Parte de los documentos crudos con la misma carga y el mismo cruce que tenía el
+servicio, así que no comparte código con el camino optimizado. La trama se deja
+afuera: el TF-IDF original se ajustaba por request sobre el corpus del usuario más
+los candidatos y sus valores no son comparables con los del índice precalculado.
+"""
+
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+def normalize_text(text):
+    if pd.isna(text): return ""
+    return str(text).lower().strip()
+
+def _format_genres(genres_data):
+    if isinstance(genres_data, list): return ', '.join(g for g in genres_data if g)
+    elif isinstance(genres_data, str): return genres_data
+    return None
+
+def load_frames(movie_docs, interaction_docs):
+    """(películas, interacciones cruzadas con el catálogo) como los armaba el servicio original"""
+    movies = pd.DataFrame(movie_docs)
+    movies['title_norm'] = movies['title'].apply(normalize_text)
+    movies = movies.drop_duplicates(subset=['title_norm'], keep='first')
+    movies['movie_id_str'] = movies['_id'].apply(str)
+    movies['imdb_rating'] = movies['imdb'].apply(lambda x: float(x['rating']) if isinstance(x, dict) and x.get('rating') is not None else None)
+    movies['formatted_genres'] = movies['genres'].apply(_format_genres)
+    movies['plot'] = movies['plot'].fillna('')
+    movies['directors'] = movies['directors'].apply(lambda x: x if isinstance(x, list) else [])
+
+    interactions = pd.DataFrame(interaction_docs)
+    interactions['title_norm'] = interactions['movie_title'].apply(normalize_text)
+    interactions = interactions.sort_values('timestamp', ascending=False)
+    interactions = interactions.drop_duplicates(subset=['user_id', 'profile_name', 'title_norm'], keep='first')
+
+    merged = pd.merge(
+        interactions,
+        movies[['title_norm', 'title', 'movie_id_str', 'imdb_rating', 'formatted_genres', 'plot', 'directors']],
+        on='title_norm', how='inner', suffixes=('_opin', ''),
+    )
+    merged = merged.rename(columns={'score': 'user_score', 'formatted_genres': 'genres'})
+    return movies, merged
+
+def rank_baseline(df_interactions, movies, email, profile_name):
+    """Candidatos ordenados por predicted_score y deduplicados por título, con la etiqueta del modo"""
+    user_history = df_interactions[
+        (df_interactions['user_id'] == email) & (df_interactions['profile_name'] == profile_name)
+    ]
+    # El original desempataba most_common por el orden de filas que dejaba el merge; acá, como en
+    # build_taste_profile, lo más reciente primero
+    user_history = user_history.sort_values('timestamp', ascending=False, kind='stable').reset_index(drop=True)
+    seen = set(user_history['title_norm'].dropna().unique()) if not user_history.empty else set()
+    num_ratings = len(user_history)
+
+    if num_ratings < 10:
+        unseen = movies[~movies['title_norm'].isin(seen)].copy()
+        unseen['predicted_score'] = (unseen['imdb_rating'].fillna(5.0) / 10.0).fillna(0.5)
+        unseen['match_reason'] = 'Tendencia Global'
+        ranked = unseen.sort_values(by='predicted_score', ascending=False)
+        return ranked.drop_duplicates(subset=['title_norm'], keep='first'), "Cold Start"
+
+    liked = user_history[user_history['user_score'] >= 7]
+    genres = []
+    for genres_str in liked['genres'].dropna():
+        genres.extend([g.strip() for g in str(genres_str).split(',') if g.strip()])
+    top_genres = [g[0] for g in Counter(genres).most_common(5)] if genres else []
+    directors = [d for d_list in liked['directors'] if isinstance(d_list, list) for d in d_list]
+    top_directors = [d[0] for d in Counter(directors).most_common(3)] if directors else []
+
+    candidates = movies[~movies['title_norm'].isin(seen)].copy()
+    candidates['formatted_genres'] = candidates['formatted_genres'].fillna('')
+    candidates['score_social'] = 0.0
+    has_enough_neighbors = False
+
+    if num_ratings >= 30:
+        user_rated = user_history[['title_norm', 'user_score']].copy()
+        user_rated.columns = ['join_title', 'target_user_score']
+        others = df_interactions[~((df_interactions['user_id'] == email) & (df_interactions['profile_name'] == profile_name))]
+        shared = pd.merge(user_rated, others[['title_norm', 'user_id', 'profile_name', 'user_score']],
+                          left_on='join_title', right_on='title_norm', how='inner')
+        if not shared.empty:
+            shared['diff'] = abs(shared['target_user_score'] - shared['user_score'])
+            counts = shared[shared['diff'] <= 1].groupby(['user_id', 'profile_name']).size().reset_index(name='count')
+            neighbors = counts[counts['count'] >= 5]
+            if not neighbors.empty:
+                has_enough_neighbors = True
+                keys = set(zip(neighbors['user_id'], neighbors['profile_name']))
+                is_neighbor = [k in keys for k in zip(df_interactions['user_id'], df_interactions['profile_name'])]
+                neighbor_data = df_interactions[is_neighbor]
+                good = neighbor_data[(~neighbor_data['title_norm'].isin(seen)) & (neighbor_data['user_score'] >= 6)]
+                social = good.groupby('title_norm')['user_score'].mean().reset_index()
+                social.columns = ['title_norm', 'social_score_A']
+                candidates = pd.merge(candidates, social, on='title_norm', how='left')
+                candidates['score_social'] = candidates['social_score_A'].fillna(0.0) / 10.0
+
+    user_genres = set(top_genres)
+    candidates['score_genre'] = candidates['formatted_genres'].apply(
+        lambda g: len({x.strip() for x in g.split(',')} & user_genres) / len(user_genres) if user_genres and isinstance(g, str) else 0.0)
+    candidates['score_director'] = candidates['directors'].apply(lambda x: 1.0 if any(d in top_directors for d in x) else 0.0)
+    candidates['score_plot'] = 0.0
+    candidates['score_quality'] = candidates['imdb_rating'].fillna(5.0) / 10.0
+
+    if has_enough_neighbors:
+        w_social, w_content, w_quality = 0.8, 0.15, 0.05
+        mode_label = "Tu Comunidad"
+    else:
+        w_social, w_content, w_quality = 0.0, 0.7, 0.3
+        mode_label = "Tus Gustos"
+
+    content = candidates['score_genre'] * 0.3 + candidates['score_director'] * 0.2 + candidates['score_plot'] * 0.5
+    candidates['predicted_score'] = candidates['score_social'] * w_social + content * w_content + candidates['score_quality'] * w_quality
+    conditions = [
+        (candidates['score_social'] > 0.7, 'Tu comunidad la recomienda'),
+        (candidates['score_director'] > 0, 'De tu director favorito'),
+        (candidates['score_plot'] > 0.15, 'Trama similar a lo que ves'),
+        (candidates['score_genre'] > 0.5, 'De tus géneros top'),
+    ]
+    candidates['match_reason'] = np.select([c[0] for c in conditions], [c[1] for c in conditions], default=f'Basado en {mode_label}')
+
+    ranked = candidates.sort_values(by='predicted_score', ascending=False)
+    return ranked.drop_duplicates(subset=['title_norm'], keep='first'), mode_label
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""Datos de prueba sobre MemorySource: catálogo y calificaciones sintéticas, sin Mongo.
+
+Las calificaciones salen de gustos por grupo de perfiles (con ±1 de ruido), así que
+hay perfiles con vecinos, perfiles sólo con historial y perfiles en cold start.
+"""
+
+import contextlib
+import datetime
+import io
+import os
+import random
+import sys
+
+import pytest
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Antes de importar main: sin artefactos en disco y con un Mongo inalcanzable
+os.environ.update(
+    MONGO_URI="mongodb://127.0.0.1:1", RECS_STORE_PATH="", PLOT_INDEX_DIR="", ANN_INDEX_DIR="",
+    FACTORS_DIR="", CATALOG_ARTIFACT_DIR="", SCORING_EXECUTOR="thread",
+)
+
+from snapshot import CatalogSnapshot, MemorySource
+
+GENRES = ["Drama", "Comedy", "Action", "Thriller", "Romance", "Horror", "Sci-Fi", "Crime", "Animation", "Family"]
+WORDS = ("love war family crime space robot detective murder journey friendship secret island city police "
+         "ghost dream king queen heist revenge school music ocean alien").split()
+START = datetime.datetime(2024, 1, 1)
+
+def make_movies(n=600, plots=True, seed=1):
+    rng = random.Random(seed)
+    return [{
+        "_id": i + 1, "title": f"Movie {i} {rng.choice(WORDS)}",
+        "genres": rng.sample(GENRES, rng.randint(1, 3)), "directors": [f"Director {rng.randint(0, 80)}"],
+        "plot": " ".join(rng.choice(WORDS) for _ in range(30)) if plots else "",
+        "fullplot": "", "cast": ["Actor"], "writers": ["Writer"], "poster": "poster.jpg", "year": 2000, "runtime": 100,
+        "imdb": {"rating": round(rng.uniform(3, 9.5), 1), "votes": rng.randint(10, 5000)},
+    } for i in range(n)]
+
+def make_interactions(movies, users=90, per=(3, 70), groups=3, seed=3):
+    rng = random.Random(seed)
+    pool = movies[:200]
+    taste = {g: {m["_id"]: rng.randint(1, 10) for m in pool} for g in range(groups)}
+    docs, k = [], 0
+    for u in range(users):
+        for movie in rng.sample(pool, rng.randint(*per)):
+            k += 1
+            score = min(10, max(1, taste[u % groups][movie["_id"]] + rng.choice([-1, 0, 0, 1])))
+            docs.append({"_id": 100000 + k, "user_id": f"u{u}@test.com", "profile_name": "main",
+                         "movie_title": movie["title"], "score": score, "timestamp": START + datetime.timedelta(seconds=k)})
+    return docs
+
+def rating(movie, user, score, seconds):
+    """Calificación nueva, posterior a todas las del fixture"""
+    return {"user_id": user, "profile_name": "main", "movie_title": movie["title"], "score": score,
+            "timestamp": START + datetime.timedelta(days=30, seconds=seconds)}
+
+def quiet(fn, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+@pytest.fixture
+def movies():
+    return make_movies()
+
+@pytest.fixture
+def source(movies):
+    return MemorySource(movies, make_interactions(movies))
+
+@pytest.fixture
+def snapshot(source):
+    snapshot = CatalogSnapshot(source)
+    quiet(snapshot.load)
+    return snapshot
+
+@pytest.fixture(scope="session")
+def main_module():
+    return quiet(__import__, "main")
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""Vencimiento por TTL y desalojo LRU del cache de pools."""
+
+from types import SimpleNamespace
+
+import pandas as pd
+
+import cache as cache_module
+from cache import RecommendationCache
+
+def make_pool(rows=5):
+    return pd.DataFrame({'movie_id_str': [str(i) for i in range(rows)], 'predicted_score': [0.5] * rows})
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+def test_ttl_expiry(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(time=clock.time))
+    cache = RecommendationCache(ttl_seconds=60)
+    cache.put("a@test.com", "main", make_pool(), "Tus Gustos")
+
+    clock.now += 59
+    pool, mode_label = cache.get("a@test.com", "main")
+    assert mode_label == "Tus Gustos" and len(pool) == 5
+
+    clock.now += 2
+    assert cache.get("a@test.com", "main") is None
+    assert cache.stats()["entries"] == 0 and cache.stats()["bytes"] == 0
+
+def test_lru_by_entries():
+    cache = RecommendationCache(max_entries=2)
+    cache.put("a@test.com", "main", make_pool(), "Tus Gustos")
+    cache.put("b@test.com", "main", make_pool(), "Tus Gustos")
+    # Leer "a" la vuelve la más reciente: se desaloja "b"
+    assert cache.get("a@test.com", "main") is not None
+    cache.put("c@test.com", "main", make_pool(), "Tus Gustos")
+    assert cache.get("b@test.com", "main") is None
+    assert cache.get("a@test.com", "main") is not None
+    assert cache.get("c@test.com", "main") is not None
+    assert cache.stats()["evictions"] == 1
+
+def test_lru_by_bytes():
+    size = RecommendationCache._size(make_pool())
+    cache = RecommendationCache(max_bytes=2 * size)
+    for email in ("a@test.com", "b@test.com", "c@test.com"):
+        cache.put(email, "main", make_pool(), "Tus Gustos")
+    stats = cache.stats()
+    assert stats["entries"] == 2 and stats["bytes"] == 2 * size
+    assert cache.get("a@test.com", "main") is None
+
+    # Un pool que solo supera el presupuesto no se guarda ni desaloja a nadie
+    cache.put("d@test.com", "main", make_pool(500), "Tus Gustos")
+    assert cache.get("d@test.com", "main") is None
+    assert cache.stats()["entries"] == 2
+
+def test_replace_keeps_byte_count():
+    cache = RecommendationCache()
+    cache.put("a@test.com", "main", make_pool(), "Tus Gustos")
+    cache.put("a@test.com", "main", make_pool(), "Tu Comunidad")
+    assert cache.stats()["bytes"] == RecommendationCache._size(make_pool())
+    assert cache.get("a@test.com", "main")[1] == "Tu Comunidad"
+
+def test_invalidate_and_clear():
+    cache = RecommendationCache()
+    for email, profile_name in (("a@test.com", "main"), ("a@test.com", "kids"), ("b@test.com", "main")):
+        cache.put(email, profile_name, make_pool(), "Tus Gustos")
+
+    assert cache.invalidate("a@test.com", "kids") == 1
+    assert cache.invalidate("a@test.com", "kids") == 0
+    cache.put("a@test.com", "kids", make_pool(), "Tus Gustos")
+    # Sin profile_name se invalidan todos los perfiles de la cuenta
+    assert cache.invalidate("a@test.com") == 2
+    assert cache.get("b@test.com", "main") is not None
+
+    cache.clear()
+    assert cache.stats()["entries"] == 0 and cache.stats()["bytes"] == 0
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""El ranking optimizado (online y batch) contra el recommend_movies original."""
+
+import numpy as np
+import pytest
+
+from baseline_ranking import load_frames, rank_baseline
+from batch import all_profiles, rank_profiles
+from conftest import make_interactions, make_movies, quiet
+from plot_index import PlotIndex
+from profiles import ProfileStore
+from scoring import POOL_SIZE, top_k
+from snapshot import CatalogSnapshot, MemorySource
+
+@pytest.fixture(scope="module")
+def catalog():
+    # Sin tramas: el TF-IDF del original se ajustaba por request y no es comparable
+    movies = make_movies(plots=False)
+    interactions = make_interactions(movies)
+    snapshot = CatalogSnapshot(MemorySource(movies, interactions))
+    state = quiet(snapshot.load)
+    return state, load_frames(movies, interactions)
+
+@pytest.fixture(scope="module")
+def plotted():
+    """Catálogo con tramas y el índice precalculado con el que puntúan tanto el online como el batch"""
+    movies = make_movies()
+    state = quiet(CatalogSnapshot(MemorySource(movies, make_interactions(movies))).load)
+    return state, PlotIndex.fit(state.movies['title_norm'].tolist(), state.movies['plot'].tolist())
+
+def pick_profiles(state):
+    """Un perfil por modo: cold start (< 10), sólo gustos (10-29) y con comunidad (30+)"""
+    counts = state.table.groupby(['user_id', 'profile_name'], observed=True).size()
+    return [counts[(counts >= low) & (counts < high)].index[0] for low, high in ((1, 10), (10, 30), (30, 10 ** 6))]
+
+def by_id(pool):
+    return dict(zip(pool['movie_id_str'].astype(str), pool['predicted_score'].astype(float)))
+
+def assert_same_pool(pool, reference):
+    """Mismos puntajes que el original para cada película del pool, y el mismo multiconjunto de los 50
+    mejores (entre puntajes empatados el original no define orden, así que las elegidas pueden variar)"""
+    expected = reference.head(POOL_SIZE)
+    np.testing.assert_allclose(np.sort(pool['predicted_score'].astype(float).to_numpy()),
+                               np.sort(expected['predicted_score'].astype(float).to_numpy()), atol=1e-6)
+    scores = by_id(reference)
+    reasons = dict(zip(reference['movie_id_str'].astype(str), reference['match_reason']))
+    for movie_id, score in by_id(pool).items():
+        assert score == pytest.approx(scores[movie_id], abs=1e-6)
+    for movie_id, reason in zip(pool['movie_id_str'].astype(str), pool['match_reason']):
+        assert reason == reasons[movie_id]
+
+def test_rank_movies_matches_baseline(catalog, main_module):
+    state, (movies, table) = catalog
+    labels = []
+    for email, profile_name in pick_profiles(state):
+        pool, mode_label = quiet(main_module.rank_movies, state.table, state.movies, email, profile_name,
+                                 features=state.features, ratings=state.ratings)
+        reference, expected_label = rank_baseline(table, movies, email, profile_name)
+        assert mode_label == expected_label
+        assert len(pool) == POOL_SIZE
+        assert_same_pool(pool, reference)
+        labels.append(mode_label)
+    assert labels == ["Cold Start", "Tus Gustos", "Tu Comunidad"]
+
+def test_profile_view_ranks_like_history(catalog, main_module):
+    state, _ = catalog
+    store = ProfileStore(lambda email, profile_name, s: s.table[
+        (s.table['user_id'] == email) & (s.table['profile_name'] == profile_name)])
+    store.on_snapshot(state)
+    for email, profile_name in pick_profiles(state):
+        expected, expected_label = quiet(main_module.rank_movies, state.table, state.movies, email, profile_name,
+                                         features=state.features, ratings=state.ratings)
+        view = store.view(email, profile_name)
+        pool, mode_label = quiet(main_module.rank_movies, state.table, state.movies, email, profile_name,
+                                 features=state.features, ratings=state.ratings, profile_view=view)
+        assert mode_label == expected_label
+        assert by_id(pool) == pytest.approx(by_id(expected))
+
+def test_batch_matches_online(plotted, main_module):
+    state, plot_index = plotted
+    profiles = list(dict.fromkeys(pick_profiles(state) + all_profiles(state)[:20]))
+    results = quiet(rank_profiles, state, profiles, plot_index=plot_index, chunk_size=7)
+    assert [(email, name) for email, name, _, _ in results] == profiles
+    assert {mode_label for _, _, _, mode_label in results} == {"Cold Start", "Tus Gustos", "Tu Comunidad"}
+    for email, profile_name, pool, mode_label in results:
+        expected, expected_label = quiet(main_module.rank_movies, state.table, state.movies, email, profile_name,
+                                         plot_index=plot_index, features=state.features, ratings=state.ratings)
+        assert mode_label == expected_label
+        assert by_id(pool) == pytest.approx(by_id(expected))
+
+def test_batch_without_plots(catalog, main_module):
+    # Sin tramas no hay vocabulario que ajustar: el batch puntúa igual que el online, sin término de trama
+    state, _ = catalog
+    for email, profile_name, pool, mode_label in quiet(rank_profiles, state, pick_profiles(state)):
+        expected, expected_label = quiet(main_module.rank_movies, state.table, state.movies, email, profile_name,
+                                         features=state.features, ratings=state.ratings)
+        assert mode_label == expected_label
+        assert by_id(pool) == pytest.approx(by_id(expected))
+
+def test_top_k_matches_stable_sort():
+    rng = np.random.default_rng(7)
+    scores = rng.integers(0, 20, size=500).astype(float) / 20
+    for k in (1, 12, 50, 500, 600):
+        assert top_k(scores, k).tolist() == np.argsort(-scores, kind='stable')[:k].tolist()
+    assert top_k(scores, 0).size == 0
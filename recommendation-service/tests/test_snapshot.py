@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""Sondeo incremental del snapshot e invalidación de los pools guardados."""
+
+import time
+from dataclasses import replace
+
+import pandas as pd
+
+from cache import RecommendationCache
+from conftest import quiet, rating
+from snapshot import CatalogSnapshot
+from store import PoolStore
+
+POOL = pd.DataFrame({'movie_id_str': ['1', '2'], 'predicted_score': [0.9, 0.8]})
+
+def fill(target, profiles):
+    for email, profile_name in profiles:
+        if isinstance(target, PoolStore):
+            target.put_many([(email, profile_name, POOL, "Tus Gustos")])
+        else:
+            target.put(email, profile_name, POOL, "Tus Gustos")
+
+def test_refresh_reports_changed_profiles(snapshot, source, movies):
+    before = snapshot.state
+    source.add_interaction(rating(movies[300], "u1@test.com", 9, 1))
+    state = quiet(snapshot.refresh)
+    assert state.version == before.version + 1
+    assert state.changed_profiles == frozenset({("u1@test.com", "main")})
+    assert len(state.table) == len(before.table) + 1
+    assert state.last_interaction_id > before.last_interaction_id
+
+    # Sin documentos nuevos no cambia la versión
+    assert quiet(snapshot.refresh).version == state.version
+
+def test_refresh_invalidates_only_changed_profiles(snapshot, source, movies, tmp_path):
+    cache = RecommendationCache()
+    store = PoolStore(str(tmp_path / "pools.sqlite"))
+    snapshot.add_listener(cache.on_snapshot)
+    snapshot.add_listener(store.on_snapshot)
+    profiles = [("u1@test.com", "main"), ("u2@test.com", "main")]
+    fill(cache, profiles)
+    fill(store, profiles)
+
+    source.add_interaction(rating(movies[300], "u1@test.com", 9, 1))
+    quiet(snapshot.refresh)
+    assert cache.get("u1@test.com", "main") is None
+    assert store.get("u1@test.com", "main") is None
+    assert cache.get("u2@test.com", "main") is not None
+    assert store.get("u2@test.com", "main") is not None
+
+def test_new_movie_clears_cache(snapshot, source, movies):
+    cache = RecommendationCache()
+    snapshot.add_listener(cache.on_snapshot)
+    fill(cache, [("u1@test.com", "main"), ("u2@test.com", "main")])
+    source.add_movie(dict(movies[0], _id=10 ** 6, title="Brand New Movie"))
+    state = quiet(snapshot.refresh)
+    assert state.changed_profiles is None
+    assert cache.stats()["entries"] == 0
+
+def test_full_reload_invalidates_missed_profiles(snapshot, source, movies, tmp_path):
+    store = PoolStore(str(tmp_path / "pools.sqlite"))
+    snapshot.add_listener(store.on_snapshot)
+    fill(store, [("u1@test.com", "main"), ("u2@test.com", "main")])
+
+    # Calificación que ningún sondeo incremental vio antes de la recarga completa
+    source.add_interaction(rating(movies[300], "u1@test.com", 9, 1))
+    state = quiet(snapshot.load)
+    assert state.missed_profiles == frozenset({("u1@test.com", "main")})
+    assert store.get("u1@test.com", "main") is None
+    assert store.get("u2@test.com", "main") is not None
+
+def test_restore_counts_age_from_restore(snapshot, source):
+    # Artefacto armado hace diez días: restaurarlo no debe disparar una recarga completa en el primer sondeo
+    artifact = replace(snapshot.state, loaded_at=time.time() - 10 * 24 * 3600)
+    before = time.time()
+    state = CatalogSnapshot(source).restore(artifact)
+    assert state.loaded_at >= before
+    assert state.version == artifact.version
+    assert state.last_interaction_id == artifact.last_interaction_id
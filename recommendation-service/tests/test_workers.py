@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""Límite de cola del pool de puntajes y el 503 del endpoint."""
+
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from conftest import make_interactions, make_movies, quiet
+from snapshot import MemorySource
+from workers import QueueFullError, ScoringPool
+
+def test_queue_limit_rejects():
+    async def scenario():
+        pool = ScoringPool(kind="thread", workers=1, queue_limit=1)
+        release = threading.Event()
+        running = asyncio.create_task(pool.run(release.wait))
+        await asyncio.sleep(0.05)
+        # Uno corriendo y uno esperando: el tercero no entra
+        waiting = asyncio.create_task(pool.run(lambda: "ok"))
+        await asyncio.sleep(0.05)
+        assert (pool.active, pool.waiting) == (1, 1)
+        with pytest.raises(QueueFullError):
+            await pool.run(lambda: "rejected")
+        release.set()
+        assert await running is True
+        assert await waiting == "ok"
+        stats = pool.stats()
+        pool.shutdown()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats["rejected"] == 1 and stats["completed"] == 2
+    assert stats["active"] == 0 and stats["waiting"] == 0
+
+@pytest.fixture
+def service(main_module, monkeypatch):
+    """main con un snapshot en memoria; sin el context manager de TestClient no corre el arranque (Mongo)"""
+    movies = make_movies(200)
+    monkeypatch.setattr(main_module.snapshot, "source", MemorySource(movies, make_interactions(movies)))
+    quiet(main_module.snapshot.load)
+    main_module.recommendation_cache.clear()
+    return main_module
+
+def test_endpoint_returns_503_when_queue_is_full(service, monkeypatch):
+    saturated = ScoringPool(kind="thread", workers=1, queue_limit=0)
+    monkeypatch.setattr(service, "scoring_pool", saturated)
+    response = TestClient(service.app).get("/recommendations", params={"email": "u1@test.com", "profile_name": "main"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert saturated.rejected == 1
+    saturated.shutdown()
+
+def test_endpoint_scores_with_free_queue(service, monkeypatch):
+    pool = ScoringPool(kind="thread", workers=1, queue_limit=4)
+    monkeypatch.setattr(service, "scoring_pool", pool)
+    response = TestClient(service.app).get("/recommendations", params={"email": "u1@test.com", "profile_name": "main"})
+    assert response.status_code == 200
+    assert len(response.json()["recommendations"]) == 12
+    pool.shutdown()
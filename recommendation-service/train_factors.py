@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""Job offline: entrena el modelo de factores latentes (ALS implícito) sobre las interacciones.
+
+Carga el snapshot una vez, factoriza la matriz perfil x título (factors.py) y
+deja los factores de los títulos en FACTORS_DIR. El servicio detecta el modelo
+nuevo en el próximo request o refresco del snapshot, sin reiniciar. Los perfiles
+nuevos o con calificaciones recientes no necesitan reentrenar: su vector se
+arma en línea con su historial. Pensado para correr periódicamente:
+
+    docker compose exec recommendation-service python train_factors.py
+    python train_factors.py --out ./artifacts/factors --factors 32 --iterations 15
+"""
+
+import argparse
+import os
+import time
+
+from pymongo import MongoClient
+
+from factors import FactorModel
+from snapshot import CatalogSnapshot, MongoSource
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mongo-uri', default=os.getenv("MONGO_URI", "mongodb://mongodb:27017"))
+    parser.add_argument('--out', default=os.getenv("FACTORS_DIR", "/app/artifacts/factors"))
+    parser.add_argument('--factors', type=int, default=16, help='dimensiones latentes')
+    parser.add_argument('--regularization', type=float, default=1.0)
+    parser.add_argument('--alpha', type=float, default=20.0, help='escala de la confianza de cada calificación')
+    parser.add_argument('--iterations', type=int, default=10)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    state = CatalogSnapshot(MongoSource(MongoClient(args.mongo_uri, serverSelectionTimeoutMS=5000))).load()
+    ratings = state.ratings
+    print(f"📦 Snapshot: {ratings.csr.shape[0]} perfiles x {ratings.csr.shape[1]} títulos, "
+          f"{ratings.nnz} calificaciones ({time.perf_counter() - start:.1f}s)")
+    if ratings.nnz == 0:
+        print("❌ No hay calificaciones: no se entrenó ningún modelo")
+        raise SystemExit(1)
+
+    start = time.perf_counter()
+    model = FactorModel.train(ratings, factors=args.factors, regularization=args.regularization,
+                              alpha=args.alpha, iterations=args.iterations)
+    elapsed = time.perf_counter() - start
+    model.save(args.out, {'trained_at': time.time(), 'profiles': ratings.csr.shape[0], 'ratings': int(ratings.nnz),
+                          'iterations': args.iterations, 'train_seconds': round(elapsed, 1)})
+    print(f"✅ Modelo de {model.dim} factores para {len(model)} títulos guardado en {args.out} ({elapsed:.1f}s)")
+
+if __name__ == '__main__':
+    main()
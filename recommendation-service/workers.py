@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""Pool de trabajo para el puntaje, con concurrencia acotada.
+
+El endpoint async no bloquea el event loop: el cálculo pesado (pandas, numpy,
+scipy) corre en un executor de hilos o de procesos. Un semáforo limita cuántos
+puntajes corren a la vez y, si la cola de espera supera el límite, el request
+se rechaza con 503 en lugar de dejar crecer la latencia sin techo.
+"""
+
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+class QueueFullError(Exception):
+    """La cola de puntajes está llena: el cliente debe reintentar más tarde"""
+
+class ScoringPool:
+    def __init__(self, kind="thread", workers=4, concurrency=None, queue_limit=32, initializer=None):
+        self.kind = kind
+        self.workers = workers
+        self.concurrency = concurrency or workers
+        self.queue_limit = queue_limit
+        self.initializer = initializer
+        self.executor = None
+        self._semaphore = None
+        self.waiting = 0
+        self.active = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def start(self):
+        if self.kind == "process":
+            # fork: los workers heredan el snapshot ya cargado (copy-on-write) y luego siguen lo que publica el padre
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("fork"),
+                initializer=self.initializer,
+            )
+            # Se levantan todos los workers ahora, antes de que el proceso padre arranque hilos
+            for future in [self.executor.submit(_noop) for _ in range(self.workers)]:
+                future.result()
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="scoring")
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, fn, *args, **kwargs):
+        """Ejecuta `fn` en el pool respetando el límite de concurrencia y de cola"""
+        if self.executor is None: self.start()
+        if self.waiting >= self.queue_limit:
+            self.rejected += 1
+            raise QueueFullError(f"Hay {self.waiting} requests esperando para puntuar")
+
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+        finally:
+            self.active -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    def stats(self):
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "concurrency": self.concurrency,
+            "queue_limit": self.queue_limit,
+            "active": self.active,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+def _noop():
+    return None
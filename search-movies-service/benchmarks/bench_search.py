@@ -0,0 +1,105 @@
+"""Benchmark del índice de búsqueda local sobre un catálogo sintético.
+
+Mide construcción, actualización incremental y latencia por tipo de consulta,
+comparado con un recorrido completo con regex sin anclar (lo que hace el
+$regex case-insensitive de movies-api sobre la colección, que no encuentra
+nada con errores de tipeo), y la latencia del
+autocompletado (/suggest) con y sin el LRU de prefijos.
+
+Uso (desde search-movies-service/):
+    python benchmarks/bench_search.py --titles 100000
+"""
+
+import argparse
+import os
+import random
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_index import SearchIndex
+from suggest import Suggester, SuggestCache
+
+WORDS = ("love war night dark city king queen last first star man woman day life world house game "
+         "dead blood road river home story time girl boy secret lost return rise fall ghost dream "
+         "amélie corazón señor niño película mañana canción éxito café noël").split()
+
+def synthetic(n, seed=11):
+    rng = random.Random(seed)
+    movies = []
+    for i in range(n):
+        words = rng.sample(WORDS, rng.randint(1, 4)) + [f"{rng.choice('bcdfgklmnprst')}{rng.choice('aeiou')}{rng.choice('lmnrst')}{i % 997}"]
+        rng.shuffle(words)
+        title = " ".join(w.capitalize() for w in words)
+        if rng.random() < 0.1: title += f" ({rng.randint(1920, 2020)})"
+        movies.append({"_id": f"{i:024x}", "title": title,
+                       "imdb": {"rating": round(rng.uniform(2, 9.5), 1), "votes": rng.randint(0, 500000)}})
+    return movies
+
+def regex_scan(movies, query, limit=20):
+    pattern = re.compile(re.escape(query), re.IGNORECASE)
+    return [m for m in movies if pattern.search(m["title"])][:limit]
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), sorted(samples)[int(0.95 * (len(samples) - 1))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--titles", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    movies = synthetic(args.titles)
+    start = time.perf_counter()
+    index = SearchIndex.build(movies)
+    print(f"Catálogo: {len(movies)} títulos | vocabulario: {len(index.vocabulary)} | construcción: {time.perf_counter() - start:.2f}s")
+
+    changed = random.Random(3).sample(movies, len(movies) // 100)
+    start = time.perf_counter()
+    for movie in changed:
+        index.upsert(dict(movie, title=movie["title"] + " Redux"))
+    print(f"Actualización incremental de {len(changed)} títulos: {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    queries = {
+        "prefijo 1-2 letras": ["l", "ki", "d", "co"],
+        "palabra completa": ["love", "queen", "ghost", "river"],
+        "varias palabras": ["dark city", "last king", "dream road"],
+        "con/sin acento": ["amelie", "Corazón", "cafe", "nino"],
+        "subcadena": ["ream", "ngdo", "ueen"],
+        "con errores de tipeo": ["gohst", "qeen rivr", "midnigt", "secert lsot"],
+    }
+    print(f"{'consulta':<22}{'índice p50':>12}{'p95':>8}{'regex p50':>12}{'p95':>8}")
+    for label, items in queries.items():
+        idx_p50, idx_p95 = timed(lambda: [index.search(q) for q in items], args.repeat)
+        rx_p50, rx_p95 = timed(lambda: [regex_scan(movies, q) for q in items], max(3, args.repeat // 10))
+        n = len(items)
+        print(f"{label:<22}{idx_p50 / n:>10.2f}ms{idx_p95 / n:>6.2f}ms{rx_p50 / n:>10.2f}ms{rx_p95 / n:>6.2f}ms")
+
+    start = time.perf_counter()
+    suggester = Suggester.build(movies)
+    print(f"\nAutocompletado: {len(suggester.words)} sufijos | construcción: {time.perf_counter() - start:.2f}s")
+    # Todos los prefijos que se generan al tipear cada consulta, letra por letra
+    typed = [q[:i] for items in queries.values() for q in items for i in range(1, len(q) + 1)]
+    cache = SuggestCache()
+
+    def cached(prefix):
+        value = cache.get(prefix)
+        if value is None:
+            value = suggester.suggest(prefix)
+            cache.put(prefix, value)
+        return value
+
+    for label, fn in (("sin cache", suggester.suggest), ("con LRU", cached)):
+        p50, p95 = timed(lambda: [fn(p) for p in typed], args.repeat)
+        print(f"{label:<22}{p50 * 1000 / len(typed):>10.1f}us{p95 * 1000 / len(typed):>8.1f}us por prefijo")
+
+if __name__ == "__main__":
+    main()
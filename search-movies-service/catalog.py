@@ -0,0 +1,155 @@
+import threading
+import time
+
+import requests
+
+import metrics
+from search_index import FUZZY_MAX_CANDIDATES, FUZZY_MAX_EDITS, SearchIndex, fold
+from suggest import Suggester, SuggestCache
+
+class SearchCatalog:
+    """Mantiene el índice de búsqueda sincronizado con el catálogo de movies-api.
+
+    El catálogo se pide con un GET condicional (If-None-Match); si cambió, se
+    comparan las películas por _id y sólo se reindexan las agregadas, editadas o
+    borradas. Si cambió demasiado, se construye un índice nuevo y se reemplaza.
+    El autocompletado se reconstruye aparte y se reemplaza en cada cambio.
+
+    El índice publicado nunca se modifica: los cambios chicos se aplican sobre una
+    copia que después lo reemplaza, así las búsquedas no toman ningún lock.
+    """
+
+    def __init__(self, url, session=None, refresh_seconds=300.0, retry_seconds=5.0, timeout=30.0, rebuild_ratio=0.2,
+                 fuzzy_max_edits=FUZZY_MAX_EDITS, fuzzy_max_candidates=FUZZY_MAX_CANDIDATES):
+        self.url = url
+        self.session = session or requests.Session()
+        self.refresh_seconds = refresh_seconds
+        self.retry_seconds = retry_seconds
+        self.timeout = timeout
+        self.rebuild_ratio = rebuild_ratio
+        self.fuzzy_max_edits = fuzzy_max_edits
+        self.fuzzy_max_candidates = fuzzy_max_candidates
+        self.index = None
+        self.suggester = None
+        self.suggest_cache = SuggestCache()
+        self.version = 0
+        self._lock = threading.Lock()
+        self.etag = None
+        self.loaded_at = None
+        self.checked_at = None
+        self.last_changes = 0
+        self.not_modified = 0
+        self.errors = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def loaded(self):
+        return self.index is not None
+
+    def sync(self, movies):
+        """Aplica el catálogo completo al índice; devuelve cuántas películas cambiaron"""
+        incoming = {SearchIndex.doc_id(m): m for m in movies}
+        current = self.index
+        if current is None:
+            with metrics.span("index_build"):
+                self.index = SearchIndex.build(movies)
+            self._rebuild_suggester(movies)
+            return len(incoming)
+
+        removed = [d for d in current.docs if d not in incoming]
+        changed = [m for d, m in incoming.items() if current.docs.get(d) != m]
+        total = len(removed) + len(changed)
+        if total > self.rebuild_ratio * max(len(current), 1):
+            # Muchos cambios: índice nuevo construido aparte y reemplazado de una vez
+            with metrics.span("index_build"):
+                self.index = SearchIndex.build(movies)
+        elif total:
+            with self._lock, metrics.span("index_update"):
+                updated = current.copy()
+                for doc_id in removed: updated.remove(doc_id)
+                for movie in changed: updated.upsert(movie)
+            self.index = updated
+        if total: self._rebuild_suggester(movies)
+        return total
+
+    def _rebuild_suggester(self, movies):
+        with metrics.span("suggest_build"):
+            suggester = Suggester.build(movies, version=self.version + 1)
+        self.suggester, self.version = suggester, suggester.version
+        self.suggest_cache.clear()
+
+    def refresh(self):
+        """Trae el catálogo si cambió y lo aplica; devuelve True si hubo cambios"""
+        headers = {"If-None-Match": self.etag} if self.etag else {}
+        response = metrics.timed_get(self.session, "catalog", self.url, headers=headers, timeout=self.timeout)
+        self.checked_at = time.time()
+        if response.status_code == 304:
+            self.not_modified += 1
+            return False
+        response.raise_for_status()
+
+        data = response.json()
+        movies = data.get("movies", []) if isinstance(data, dict) else data
+        start = time.perf_counter()
+        self.last_changes = self.sync(movies)
+        self.etag = response.headers.get("ETag")
+        self.loaded_at = self.checked_at
+        print(f"🔎 Índice de búsqueda: {len(self.index)} películas, {self.last_changes} cambios ({time.perf_counter() - start:.2f}s)")
+        return self.last_changes > 0
+
+    def search(self, query, offset=0, limit=20, fuzzy=True):
+        max_edits = self.fuzzy_max_edits if fuzzy else 0
+        # Referencia al índice vigente: sync lo reemplaza entero, nunca lo modifica
+        index = self.index
+        return index.search(query, offset=offset, limit=limit,
+                            max_edits=max_edits, max_candidates=self.fuzzy_max_candidates)
+
+    def suggest(self, query, k=10):
+        """Completaciones de título; los prefijos más pedidos se sirven desde el LRU"""
+        suggester = self.suggester
+        key = (suggester.version, fold(query), k)
+        suggestions = self.suggest_cache.get(key)
+        if suggestions is None:
+            suggestions = suggester.suggest(query, k)
+            self.suggest_cache.put(key, suggestions)
+        return suggestions
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+                wait = self.refresh_seconds
+            except Exception as e:
+                self.errors += 1
+                print(f"❌ No se pudo refrescar el índice de búsqueda: {e}")
+                # Hasta tener el primer índice se reintenta seguido
+                wait = self.refresh_seconds if self.loaded else self.retry_seconds
+            self._stop.wait(wait)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="search-index-refresh", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        index = self.index
+        now = time.time()
+        return {
+            "loaded": self.loaded,
+            "movies": len(index) if index is not None else 0,
+            "vocabulary": len(index.vocabulary) if index is not None else 0,
+            "version": self.version,
+            "fuzzy": {"max_edits": self.fuzzy_max_edits, "max_candidates": self.fuzzy_max_candidates},
+            "suggest_cache": self.suggest_cache.stats(),
+            "etag": self.etag,
+            "age_seconds": round(now - self.loaded_at, 1) if self.loaded_at else None,
+            "last_check_seconds": round(now - self.checked_at, 1) if self.checked_at else None,
+            "last_changes": self.last_changes,
+            "not_modified": self.not_modified,
+            "errors": self.errors,
+        }
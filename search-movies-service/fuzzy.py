@@ -0,0 +1,83 @@
+import heapq
+from collections import Counter
+
+def trigrams(word):
+    """Trigramas con relleno: 'casa' -> {'  c', ' ca', 'cas', 'asa', 'sa '}"""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def edit_distance(a, b, limit, prefix=False):
+    """Distancia de Damerau-Levenshtein (transposiciones adyacentes) de `a` a `b`, tope `limit` + 1.
+
+    Con `prefix=True` es la distancia al prefijo de `b` más parecido.
+    """
+    if len(a) - len(b) > limit or (not prefix and len(b) - len(a) > limit): return limit + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        # La transposición mira dos filas atrás: se corta cuando ninguna de las dos puede quedar en el límite
+        if min(current) > limit and min(previous) >= limit: return limit + 1
+        previous2, previous = previous, current
+    return min(min(previous) if prefix else previous[-1], limit + 1)
+
+def allowed_edits(token, max_edits):
+    """Presupuesto de errores según el largo: 0 hasta 3 letras, 1 hasta 7, después `max_edits`"""
+    if len(token) <= 3: return 0
+    if len(token) <= 7: return min(1, max_edits)
+    return max_edits
+
+class TrigramIndex:
+    """Trigramas de las palabras del vocabulario para generar candidatos con errores de tipeo.
+
+    Cada edición cambia a lo sumo 4 trigramas (3 una sustitución, 4 una
+    transposición), así que una palabra a `d` ediciones comparte al menos uno de
+    los 4*d+1 trigramas más raros de la consulta: sólo se recorren esas postings. Los candidatos se ordenan por
+    trigramas compartidos y se verifican con distancia de edición, con un tope de
+    candidatos para que el costo por consulta quede acotado.
+    """
+
+    def __init__(self):
+        self.postings = {}  # trigrama -> {palabra}
+
+    def copy(self):
+        clone = type(self)()
+        clone.postings = {gram: set(words) for gram, words in self.postings.items()}
+        return clone
+
+    def add(self, word):
+        for gram in trigrams(word):
+            self.postings.setdefault(gram, set()).add(word)
+
+    def remove(self, word):
+        for gram in trigrams(word):
+            words = self.postings.get(gram)
+            if words is None: continue
+            words.discard(word)
+            if not words: del self.postings[gram]
+
+    def matches(self, token, max_edits, max_candidates, prefix=False):
+        """{palabra: distancia} de las palabras a <= max_edits de `token`.
+
+        Con `prefix=True` se compara contra el comienzo de cada palabra (la última
+        palabra de la consulta puede estar a medio escribir).
+        """
+        if max_edits <= 0: return {}
+        grams = trigrams(token)
+        if prefix:
+            # El trigrama final con relleno no aparece si la palabra sigue
+            grams.discard(f"{token[-2:]} ")
+        rarest = sorted(grams, key=lambda g: len(self.postings.get(g, ())))[:4 * max_edits + 1]
+        shared = Counter()
+        for gram in rarest:
+            shared.update(self.postings.get(gram, ()))
+
+        found = {}
+        for word in heapq.nlargest(max_candidates, shared, key=shared.__getitem__):
+            distance = edit_distance(token, word, max_edits, prefix=prefix)
+            if distance <= max_edits: found[word] = distance
+        return found
@@ -1,8 +1,15 @@
+import os
+import time
+
 import requests
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
+import metrics
+from catalog import SearchCatalog
+from suggest import MAX_SUGGESTIONS
+
 app = FastAPI()
 
 # Configurar CORS
@@ -17,16 +24,57 @@ app.add_middleware(
 # URL del servicio Movies dentro de la red de Docker
 MOVIES_SERVICE_URL = "http://movies-api:8000"
 
+# Conexiones HTTP reutilizadas para los refrescos y el fallback
+session = requests.Session()
+
+# Índice invertido local sobre los títulos: las búsquedas no llegan a Mongo
+search_catalog = SearchCatalog(
+    os.getenv("MOVIES_CATALOG_URL", f"{MOVIES_SERVICE_URL}/movies/catalog"),
+    session=session,
+    refresh_seconds=float(os.getenv("SEARCH_REFRESH_SECONDS", "300")),
+    # Tolerancia a errores de tipeo: ediciones por palabra y candidatos verificados por palabra (acotan el costo)
+    fuzzy_max_edits=int(os.getenv("SEARCH_FUZZY_MAX_EDITS", "2")),
+    fuzzy_max_candidates=int(os.getenv("SEARCH_FUZZY_MAX_CANDIDATES", "50")),
+)
+metrics.watch_catalog(search_catalog)
+
+# Las sugerencias se pueden reutilizar en el navegador y en proxies mientras el catálogo no cambie
+SUGGEST_MAX_AGE_SECONDS = int(os.getenv("SUGGEST_MAX_AGE_SECONDS", "300"))
+
+@app.on_event("startup")
+def start_search_catalog():
+    search_catalog.start()
+
+@app.on_event("shutdown")
+def stop_search_catalog():
+    search_catalog.stop()
+
 @app.get("/search/{query}")
-def search_movies(query: str):
+def search_movies(query: str, page: int = Query(1, ge=1), page_size: int = Query(20, ge=1, le=100), fuzzy: bool = True):
     """
-    Busca películas por nombre actuando como intermediario
-    entre el frontend y el servicio movies-api.
+    Busca películas por nombre en el índice local (sin acentos, por prefijo de
+    palabra o subcadena), ordenadas por relevancia y popularidad, con paginación.
+    Si una palabra no aparece en ningún título se toleran errores de tipeo
+    ("godfater" -> "The Godfather"), salvo con fuzzy=false.
+    Mientras el índice no esté listo actúa como intermediario de movies-api.
     Elimina duplicados basándose en el título normalizado.
     """
+    start = time.perf_counter()
+    if search_catalog.loaded:
+        total, movies = search_catalog.search(query, offset=(page - 1) * page_size, limit=page_size, fuzzy=fuzzy)
+        metrics.REQUEST_SECONDS.labels("search", "index").observe(time.perf_counter() - start)
+        return {
+            "query": query,
+            "count": len(movies),
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "movies": movies
+        }
+
     try:
         # Llamar al endpoint de búsqueda del movies-api
-        response = requests.get(f"{MOVIES_SERVICE_URL}/movies/search/{query}")
+        response = metrics.timed_get(session, "search", f"{MOVIES_SERVICE_URL}/movies/search/{query}", timeout=10)
         response.raise_for_status()
         
         # Obtener los datos
@@ -47,6 +95,7 @@ def search_movies(query: str):
                 seen_titles.add(normalized_title)
                 unique_movies.append(movie)
         
+        metrics.REQUEST_SECONDS.labels("search", "upstream").observe(time.perf_counter() - start)
         # Retornar los resultados sin duplicados
         return {
             "query": query,
@@ -64,6 +113,36 @@ def search_movies(query: str):
             detail=f"Ocurrió un error inesperado: {str(e)}"
         )
 
+@app.get("/suggest")
+def suggest_titles(request: Request, q: str = Query(""), k: int = Query(8, ge=1, le=MAX_SUGGESTIONS)):
+    """Autocompletado: los `k` títulos más populares que completan `q`"""
+    start = time.perf_counter()
+    suggester = search_catalog.suggester
+    if suggester is None:
+        return JSONResponse({"query": q, "suggestions": []}, headers={"Cache-Control": "no-store"})
+
+    headers = {
+        "Cache-Control": f"public, max-age={SUGGEST_MAX_AGE_SECONDS}, stale-while-revalidate={SUGGEST_MAX_AGE_SECONDS * 2}",
+        # Sale del contenido del catálogo: no se repite tras un reinicio ni difiere entre réplicas
+        "ETag": f'W/"suggest-{suggester.fingerprint}"',
+    }
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        metrics.REQUEST_SECONDS.labels("suggest", "not_modified").observe(time.perf_counter() - start)
+        return Response(status_code=304, headers=headers)
+    response = JSONResponse({"query": q, "suggestions": search_catalog.suggest(q, k)}, headers=headers)
+    metrics.REQUEST_SECONDS.labels("suggest", "index").observe(time.perf_counter() - start)
+    return response
+
+@app.get("/admin/index")
+def index_status():
+    return search_catalog.stats()
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """Métricas en formato Prometheus: latencias de búsqueda, llamadas a movies-api y tamaño del índice"""
+    body, content_type = metrics.render()
+    return Response(content=body, headers={"Content-Type": content_type})
+
 @app.get("/")
 def root():
     return {"message": "Search Movies Service funcionando correctamente"}
@@ -0,0 +1,54 @@
+import time
+from contextlib import contextmanager
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+REQUEST_SECONDS = Histogram(
+    "search_movies_request_seconds", "Duración de /search y /suggest según quién respondió", ["endpoint", "source"],
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+PHASE_SECONDS = Histogram(
+    "search_movies_phase_seconds", "Duración de la sincronización del índice y del autocompletado", ["phase"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+UPSTREAM_SECONDS = Histogram(
+    "search_movies_upstream_seconds", "Duración de las llamadas a movies-api", ["call"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+UPSTREAM_RESPONSES = Counter(
+    "search_movies_upstream_responses_total", "Respuestas de movies-api por código (error = sin respuesta)", ["call", "status"],
+)
+INDEX_SIZE = Gauge("search_movies_index_size", "Tamaño del índice en memoria", ["kind"])
+SUGGEST_CACHE = Gauge("search_movies_suggest_cache", "Aciertos y fallos acumulados del LRU de sugerencias y entradas actuales", ["result"])
+
+@contextmanager
+def span(phase):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        PHASE_SECONDS.labels(phase).observe(time.perf_counter() - start)
+
+def timed_get(session, call, url, **kwargs):
+    """`session.get` registrando duración y código de respuesta de la llamada a movies-api"""
+    start = time.perf_counter()
+    status = "error"
+    try:
+        response = session.get(url, **kwargs)
+        status = str(response.status_code)
+        return response
+    finally:
+        UPSTREAM_SECONDS.labels(call).observe(time.perf_counter() - start)
+        UPSTREAM_RESPONSES.labels(call, status).inc()
+
+def watch_catalog(search_catalog):
+    """Tamaños del índice y estado del LRU, leídos al momento de cada scrape"""
+    INDEX_SIZE.labels("movies").set_function(lambda: search_catalog.stats()["movies"])
+    INDEX_SIZE.labels("vocabulary").set_function(lambda: search_catalog.stats()["vocabulary"])
+    SUGGEST_CACHE.labels("hits").set_function(lambda: search_catalog.suggest_cache.hits)
+    SUGGEST_CACHE.labels("misses").set_function(lambda: search_catalog.suggest_cache.misses)
+    SUGGEST_CACHE.labels("entries").set_function(lambda: search_catalog.suggest_cache.stats()["entries"])
+
+def render():
+    """(cuerpo, content type) para el endpoint /metrics"""
+    return generate_latest(), CONTENT_TYPE_LATEST
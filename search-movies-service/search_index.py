@@ -0,0 +1,287 @@
+import bisect
+import heapq
+import itertools
+import re
+import unicodedata
+
+from fuzzy import TrigramIndex, allowed_edits
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+_END = "\uffff"
+
+def fold(text):
+    """Minúsculas, sin acentos y sin puntuación: 'Amélie (2001)' -> 'amelie 2001'"""
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return _NON_ALNUM.sub(" ", text).strip()
+
+def tokenize(text):
+    return fold(text).split()
+
+def dedupe_key(title):
+    """Mismo criterio que el proxy original: minúsculas y sin espacios"""
+    return str(title).lower().replace(" ", "")
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+# Con menos caracteres sólo se busca por prefijo de palabra (casi todo título contiene "a")
+MIN_SUBSTRING_LENGTH = 3
+# Prefijos cortos con postings propias: son los más frecuentes al tipear y los más caros de unir
+SHORT_PREFIX = 2
+# Búsqueda con errores de tipeo: ediciones permitidas por palabra y candidatos verificados por palabra
+FUZZY_MAX_EDITS = 2
+FUZZY_MAX_CANDIDATES = 50
+# Más palabras desconocidas que esto ya no parece un error de tipeo
+FUZZY_MAX_TOKENS = 4
+
+class SearchIndex:
+    """Índice invertido en memoria sobre los títulos del catálogo.
+
+    Cada palabra del título (normalizada) apunta a las películas que la contienen.
+    El vocabulario se mantiene ordenado, así que las palabras que empiezan con un
+    prefijo son un rango contiguo que se ubica con bisect; los prefijos de 1 y 2
+    letras tienen postings propias. Los títulos completos también se guardan
+    ordenados para encontrar por bisect los que empiezan con la consulta.
+
+    Los títulos duplicados (misma clave de deduplicación) se indexan una sola vez:
+    sólo el de menor _id está en las postings.
+
+    Si alguna palabra de la consulta no es prefijo de ninguna del vocabulario, se
+    corrige contra el índice de trigramas del vocabulario (ver fuzzy.py).
+    """
+
+    def __init__(self):
+        self.docs = {}          # doc_id -> película
+        self.folded = {}        # doc_id -> título normalizado
+        self.rank_key = {}      # doc_id -> (-votos, -rating, largo del título, doc_id)
+        self.key_of = {}        # doc_id -> clave de deduplicación
+        self.by_key = {}        # clave de deduplicación -> {doc_id}
+        self.postings = {}      # palabra -> {doc_id}
+        self.prefixes = {}      # prefijo de 1..SHORT_PREFIX letras -> {doc_id}
+        self.vocabulary = []    # palabras ordenadas
+        self.trigrams = TrigramIndex()  # trigrama -> palabras del vocabulario
+        self.titles = []        # (título normalizado, doc_id) ordenados
+        self.order = []         # rank_key ordenados por popularidad
+        self._buffer = None     # (títulos concatenados, offsets, doc_ids) para subcadenas
+
+    @classmethod
+    def build(cls, movies):
+        index = cls()
+        for movie in movies:
+            index._add(movie, keep_sorted=False)
+        index.vocabulary.sort()
+        index.titles.sort()
+        index.order.sort()
+        return index
+
+    def __len__(self):
+        return len(self.docs)
+
+    def copy(self):
+        """Copia independiente para modificar sin tocar el índice que se está consultando"""
+        clone = type(self)()
+        for name in ("docs", "folded", "rank_key", "key_of"):
+            setattr(clone, name, dict(getattr(self, name)))
+        for name in ("by_key", "postings", "prefixes"):
+            setattr(clone, name, {key: set(docs) for key, docs in getattr(self, name).items()})
+        clone.vocabulary = list(self.vocabulary)
+        clone.trigrams = self.trigrams.copy()
+        clone.titles = list(self.titles)
+        clone.order = list(self.order)
+        return clone
+
+    @staticmethod
+    def doc_id(movie):
+        return str(movie.get("_id"))
+
+    # --- ALTAS Y BAJAS ---
+
+    @staticmethod
+    def _insert(items, value, keep_sorted):
+        if keep_sorted: bisect.insort(items, value)
+        else: items.append(value)
+
+    @staticmethod
+    def _delete(items, value):
+        del items[bisect.bisect_left(items, value)]
+
+    def _short_prefixes(self, tokens):
+        return {t[:n] for t in tokens for n in range(1, min(len(t), SHORT_PREFIX) + 1)}
+
+    def _index(self, doc_id, keep_sorted=True):
+        folded = self.folded[doc_id]
+        tokens = set(folded.split())
+        for token in tokens:
+            docs = self.postings.get(token)
+            if docs is None:
+                docs = self.postings[token] = set()
+                self._insert(self.vocabulary, token, keep_sorted)
+                self.trigrams.add(token)
+            docs.add(doc_id)
+        for prefix in self._short_prefixes(tokens):
+            self.prefixes.setdefault(prefix, set()).add(doc_id)
+        self._insert(self.titles, (folded, doc_id), keep_sorted)
+        self._insert(self.order, self.rank_key[doc_id], keep_sorted)
+        self._buffer = None
+
+    def _unindex(self, doc_id):
+        folded = self.folded[doc_id]
+        tokens = set(folded.split())
+        for token in tokens:
+            docs = self.postings[token]
+            docs.discard(doc_id)
+            if not docs:
+                del self.postings[token]
+                self._delete(self.vocabulary, token)
+                self.trigrams.remove(token)
+        for prefix in self._short_prefixes(tokens):
+            docs = self.prefixes[prefix]
+            docs.discard(doc_id)
+            if not docs: del self.prefixes[prefix]
+        self._delete(self.titles, (folded, doc_id))
+        self._delete(self.order, self.rank_key[doc_id])
+        self._buffer = None
+
+    def _add(self, movie, keep_sorted=True):
+        doc_id = self.doc_id(movie)
+        title = movie.get("title") or ""
+        folded = fold(title)
+        imdb = movie.get("imdb") if isinstance(movie.get("imdb"), dict) else {}
+        self.docs[doc_id] = movie
+        self.folded[doc_id] = folded
+        self.rank_key[doc_id] = (-_number(imdb.get("votes")), -_number(imdb.get("rating")), len(folded), doc_id)
+        self.key_of[doc_id] = key = dedupe_key(title)
+
+        group = self.by_key.setdefault(key, set())
+        canonical = min(group) if group else None
+        group.add(doc_id)
+        if canonical is None:
+            self._index(doc_id, keep_sorted)
+        elif doc_id < canonical:
+            self._unindex(canonical)
+            self._index(doc_id, keep_sorted)
+
+    def _remove(self, doc_id):
+        if doc_id not in self.docs: return
+        key = self.key_of[doc_id]
+        group = self.by_key[key]
+        was_canonical = min(group) == doc_id
+        if was_canonical: self._unindex(doc_id)
+        group.discard(doc_id)
+        if not group: del self.by_key[key]
+        elif was_canonical: self._index(min(group))
+        for mapping in (self.docs, self.folded, self.rank_key, self.key_of):
+            del mapping[doc_id]
+
+    def upsert(self, movie):
+        self._remove(self.doc_id(movie))
+        self._add(movie)
+
+    def remove(self, doc_id):
+        self._remove(doc_id)
+
+    # --- CONSULTAS ---
+
+    def _prefix_docs(self, prefix):
+        """Películas con alguna palabra que empieza con `prefix`"""
+        if len(prefix) <= SHORT_PREFIX: return self.prefixes.get(prefix, set())
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        end = bisect.bisect_left(self.vocabulary, prefix + _END, start)
+        if end - start == 1: return self.postings[self.vocabulary[start]]
+        return set().union(*(self.postings[t] for t in self.vocabulary[start:end]))
+
+    def _word_matches(self, tokens):
+        sets = sorted((self._prefix_docs(t) for t in set(tokens)), key=len)
+        if not sets[0]: return set()
+        return set(sets[0]).intersection(*sets[1:])
+
+    def _title_range(self, low, high):
+        start = bisect.bisect_left(self.titles, (low,))
+        end = bisect.bisect_left(self.titles, (high,), start)
+        return {doc_id for _, doc_id in self.titles[start:end]}
+
+    def _substring_matches(self, text):
+        """Películas cuyo título contiene `text` empezando a mitad de una palabra"""
+        if self._buffer is None:
+            offsets, doc_ids, position = [], [], 0
+            for folded, doc_id in self.titles:
+                offsets.append(position)
+                doc_ids.append(doc_id)
+                position += len(folded) + 1
+            self._buffer = ("\n".join(folded for folded, _ in self.titles), offsets, doc_ids)
+        buffer, offsets, doc_ids = self._buffer
+        # Sólo las coincidencias a mitad de palabra: las que empiezan una palabra ya
+        # están entre las coincidencias por prefijo
+        found = set()
+        for match in re.finditer(re.escape(text), buffer):
+            position = match.start()
+            if position and buffer[position - 1] not in " \n":
+                found.add(doc_ids[bisect.bisect_right(offsets, position) - 1])
+        return found
+
+    def _fuzzy_matches(self, tokens, max_edits, max_candidates):
+        """{doc_id: ediciones} de las películas que tienen todas las palabras, corrigiendo las desconocidas"""
+        unknown = {i for i, t in enumerate(tokens) if not self._prefix_docs(t)}
+        if not unknown or len(unknown) > FUZZY_MAX_TOKENS: return {}
+        distances = None
+        for i, token in enumerate(tokens):
+            if i not in unknown:
+                found = dict.fromkeys(self._prefix_docs(token), 0)
+            else:
+                budget = allowed_edits(token, max_edits)
+                # La última palabra puede estar a medio escribir: se compara con el comienzo
+                words = self.trigrams.matches(token, budget, max_candidates, prefix=i == len(tokens) - 1)
+                found = {}
+                for word, distance in sorted(words.items(), key=lambda item: item[1]):
+                    for doc_id in self.postings[word]:
+                        found.setdefault(doc_id, distance)
+            if distances is None:
+                distances = found
+            else:
+                distances = {d: e + found[d] for d, e in distances.items() if d in found}
+            if not distances: return {}
+        return distances
+
+    def _best(self, docs, count):
+        """Las `count` películas más populares de `docs`"""
+        if count <= 0 or not docs: return []
+        if len(docs) ** 2 > count * len(self.order):
+            # Conjunto grande: se recorre el orden global y en promedio se corta tras
+            # count * N / len(docs) pasos, menos que ordenar el conjunto
+            return list(itertools.islice((key[-1] for key in self.order if key[-1] in docs), count))
+        return heapq.nsmallest(count, docs, key=self.rank_key.__getitem__)
+
+    def search(self, query, offset=0, limit=20, max_edits=FUZZY_MAX_EDITS, max_candidates=FUZZY_MAX_CANDIDATES):
+        """(total, resultados) ordenados por relevancia y luego por popularidad.
+
+        Con `max_edits` = 0 no se corrigen errores de tipeo.
+        """
+        folded_query = fold(query)
+        tokens = folded_query.split()
+        if not tokens: return 0, []
+
+        words = self._word_matches(tokens)
+        exact = self._title_range(folded_query, folded_query + "\x00")
+        starts = self._title_range(folded_query, folded_query + _END)
+        substring = self._substring_matches(folded_query) if len(folded_query) >= MIN_SUBSTRING_LENGTH else set()
+        # Niveles de relevancia, del mejor al peor: título idéntico, título que empieza con
+        # la consulta, todas las palabras como prefijo de palabras del título y subcadena
+        # (lo que devolvía el $regex original)
+        tiers = [exact, starts - exact, words - starts, substring - words - starts]
+        matched = words | starts | substring
+
+        results = []
+        for docs in tiers:
+            results.extend(self._best(docs, offset + limit - len(results)))
+
+        # Último nivel: títulos con errores de tipeo, por ediciones y luego por rating
+        distances = self._fuzzy_matches(tokens, max_edits, max_candidates) if max_edits > 0 else {}
+        fuzzy = distances.keys() - matched
+        count = offset + limit - len(results)
+        if fuzzy and count > 0:
+            results.extend(heapq.nsmallest(count, fuzzy, key=lambda d: (distances[d], self.rank_key[d][1], self.rank_key[d])))
+        return len(matched) + len(fuzzy), [self.docs[d] for d in results[offset:]]
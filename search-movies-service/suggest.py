@@ -0,0 +1,135 @@
+import bisect
+import hashlib
+import heapq
+import itertools
+import json
+import threading
+from collections import OrderedDict
+
+from search_index import SearchIndex, dedupe_key, fold, _number, _END
+
+MAX_SUGGESTIONS = 20
+SUGGESTION_FIELDS = ("_id", "title", "year", "poster")
+
+def content_fingerprint(items):
+    """Hash estable de las sugerencias posibles, en el orden de popularidad en que se sirven"""
+    payload = json.dumps(items, sort_keys=True, default=str, ensure_ascii=False).encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=12).hexdigest()
+
+class Suggester:
+    """Autocompletado de títulos sobre arreglos ordenados.
+
+    Las películas se numeran por popularidad (0 = más votada). Se guardan dos
+    arreglos ordenados: los títulos normalizados y los sufijos que empiezan en una
+    palabra interna ('dark knight' y 'knight' para 'the dark knight'). Las
+    completaciones de un prefijo son un rango contiguo en cada arreglo; primero van
+    los títulos que empiezan con el prefijo y después los que lo tienen en otra
+    palabra, cada grupo por popularidad.
+    """
+
+    def __init__(self, items, folded, titles, title_owners, words, word_owners, version=None, fingerprint=None):
+        self.items = items                  # campos mínimos de cada película, por popularidad
+        self.folded = folded                # título normalizado de cada película
+        self.titles = titles                # títulos normalizados ordenados
+        self.title_owners = title_owners    # película de cada título
+        self.words = words                  # sufijos desde una palabra interna, ordenados
+        self.word_owners = word_owners      # película de cada sufijo
+        self.version = version
+        # Huella del contenido (títulos y orden por popularidad): igual entre reinicios y réplicas
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def build(cls, movies, version=None):
+        # Un título por clave de deduplicación (el de menor _id), como en el índice de búsqueda
+        canonical = {}
+        for movie in movies:
+            doc_id = SearchIndex.doc_id(movie)
+            key = dedupe_key(movie.get("title") or "")
+            if key not in canonical or doc_id < SearchIndex.doc_id(canonical[key]):
+                canonical[key] = movie
+
+        def popularity(movie):
+            imdb = movie.get("imdb") if isinstance(movie.get("imdb"), dict) else {}
+            return (-_number(imdb.get("votes")), -_number(imdb.get("rating")), len(movie.get("title") or ""))
+
+        ranked = sorted(canonical.values(), key=popularity)
+        items = [{f: (str(m.get(f)) if f == "_id" else m.get(f)) for f in SUGGESTION_FIELDS} for m in ranked]
+        folded = [fold(m.get("title") or "") for m in ranked]
+
+        titles = sorted((title, rank) for rank, title in enumerate(folded))
+        words = sorted(
+            (" ".join(parts[i:]), rank)
+            for rank, parts in enumerate(title.split() for title in folded)
+            for i in range(1, len(parts))
+        )
+        return cls(
+            items, folded,
+            [t for t, _ in titles], [r for _, r in titles],
+            [w for w, _ in words], [r for _, r in words],
+            version=version, fingerprint=content_fingerprint(items),
+        )
+
+    def __len__(self):
+        return len(self.items)
+
+    def _top(self, keys, owners, prefix, k, matches):
+        """Las `k` películas más populares del rango de `prefix` en `keys`"""
+        start = bisect.bisect_left(keys, prefix)
+        end = bisect.bisect_left(keys, prefix + _END, start)
+        if end - start == 0: return []
+        if (end - start) ** 2 > k * len(self.items):
+            # Rango grande: en el orden por popularidad aparecen pronto (k * N / rango pasos en promedio)
+            return list(itertools.islice((r for r, title in enumerate(self.folded) if matches(title)), k))
+        return list(dict.fromkeys(heapq.nsmallest(k * 2, owners[start:end])))[:k]
+
+    def suggest(self, query, k=10):
+        prefix = fold(query)
+        if not prefix: return []
+        starts = self._top(self.titles, self.title_owners, prefix, k, lambda title: title.startswith(prefix))
+        ranks = starts
+        if len(starts) < k:
+            inner = " " + prefix
+            chosen = set(starts)
+            more = self._top(self.words, self.word_owners, prefix, k + len(starts), lambda title: inner in title)
+            ranks = starts + [r for r in more if r not in chosen][:k - len(starts)]
+        return [self.items[r] for r in ranks]
+
+class SuggestCache:
+    """LRU de los prefijos más pedidos; se vacía cuando cambia el catálogo"""
+
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else None,
+        }